@@ -13,4 +13,19 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'DrGame.settings')
 
-application = get_asgi_application()
+# اپ Django باید قبل از import کردن consumerها (که مدل‌ها را import می‌کنند) ساخته شود
+django_asgi_app = get_asgi_application()
+
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+from channels.security.websocket import AllowedHostsOriginValidator  # noqa: E402
+
+from messenger.middleware import JWTAuthMiddlewareStack  # noqa: E402
+from messenger.routing import websocket_urlpatterns as messenger_websocket_urlpatterns  # noqa: E402
+from payments.routing import websocket_urlpatterns as payments_websocket_urlpatterns  # noqa: E402
+
+application = ProtocolTypeRouter({
+    'http': django_asgi_app,
+    'websocket': AllowedHostsOriginValidator(
+        JWTAuthMiddlewareStack(URLRouter(messenger_websocket_urlpatterns + payments_websocket_urlpatterns))
+    ),
+})
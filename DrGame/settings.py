@@ -40,6 +40,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     # local apps
     'accounts', 'management',
     'employees', 'storage',
@@ -52,6 +53,7 @@ INSTALLED_APPS = [
     'django_ratelimit', 'corsheaders',
     'drf_spectacular', 'django_redis',
     'storages', 'django_filters',
+    'channels',
 ]
 
 MIDDLEWARE = [
@@ -82,6 +84,24 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'DrGame.wsgi.application'
+ASGI_APPLICATION = 'DrGame.asgi.application'
+
+# لایه‌ی کانال برای WebSocket مسنجر؛ برای تست CHANNEL_LAYER_BACKEND=memory
+if os.getenv('CHANNEL_LAYER_BACKEND', 'redis') == 'memory':
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                'hosts': [os.environ.get('CHANNEL_REDIS_URL') or os.environ.get('REDIS_URL')],
+            },
+        },
+    }
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -166,6 +186,7 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(seconds=72600),
     'REFRESH_TOKEN_LIFETIME': timedelta(seconds=4320000),
     'ROTATE_REFRESH_TOKENS': True,
+    # لیست سیاه در Redis است (accounts/token_blacklist.py)، نه اپ token_blacklist خود simplejwt
     'BLACKLIST_AFTER_ROTATION': True,
     'AUTH_COOKIE': 'access_token',
     'AUTH_COOKIE_REFRESH': 'refresh_token',
@@ -223,6 +244,11 @@ AWS_S3_REGION_NAME = 'us-east-1'
 # FARAZ SMS Configuration
 FARAZ_URL = os.getenv("FARAZ_URL")
 FARAZ_API_KEY = os.getenv("FARAZ_API_KEY")
+IPPANEL_SEND_URL = os.getenv("IPPANEL_SEND_URL", "https://edge.ippanel.com/v1/api/send")
+IPPANEL_FROM_NUMBER = os.getenv("IPPANEL_FROM_NUMBER", "+983000505")
+IPPANEL_TIMEOUT = int(os.getenv("IPPANEL_TIMEOUT", "10"))
+# حداکثر گیرنده در هر درخواست ارسال
+IPPANEL_MAX_RECIPIENTS = int(os.getenv("IPPANEL_MAX_RECIPIENTS", "100"))
 
 # Zarrin Pall
 ZARINPAL_MERCHANT_ID = os.getenv("ZARINPAL_MERCHANT_ID")
@@ -247,3 +273,6 @@ TELEGRAM_TIMEOUT = int(os.getenv("TELEGRAM_TIMEOUT", "10"))
 FERNET_KEY = os.environ.get("FERNET_KEY")
 if not FERNET_KEY:
     raise ImproperlyConfigured("FERNET_KEY is required for TOTP encryption.")
+
+# مدت مجاز نگه داشتن اکانت گرفته‌شده توسط کارمند قبل از برگشت به صف (ثانیه)
+SONY_ACCOUNT_CLAIM_TIMEOUT = int(os.getenv("SONY_ACCOUNT_CLAIM_TIMEOUT", str(2 * 60 * 60)))
@@ -1,4 +1,4 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
 from .models import CustomUser, APIKey, MainManager, OTP
 
@@ -26,9 +26,15 @@ class CustomUserAdmin(UserAdmin):
 
 @admin.register(APIKey)
 class APIKeyAdmin(admin.ModelAdmin):
-    list_display = ('client_name', 'key', 'is_active', 'created_at')
+    list_display = ('client_name', 'prefix', 'is_active', 'created_at')
     list_filter = ('is_active',)
-    search_fields = ('client_name', 'key')
+    search_fields = ('client_name', 'prefix')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change:
+            # کلید خام ذخیره نمی‌شود و فقط همین یک بار نمایش داده می‌شود
+            self.message_user(request, f"API Key: {obj.raw_key}", messages.WARNING)
 
 
 @admin.register(MainManager)
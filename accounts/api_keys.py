@@ -0,0 +1,111 @@
+# accounts/api_keys.py
+import logging
+import os
+import threading
+import time
+
+from redis.exceptions import RedisError
+
+from accounts.models import APIKey
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+API_KEY_HEADER = 'X-API-Key'
+API_KEY_REVOKED_CHANNEL = 'api_keys:revoked'
+# حتی اگر پیام ابطال نرسد، کلید تأییدشده بیشتر از این مدت در حافظه نمی‌ماند
+API_KEY_CACHE_TTL = 60
+API_KEY_CACHE_SIZE = 1024
+LISTENER_RETRY_DELAY = 5
+
+
+class APIKeyVerifier:
+    """
+    تأیید API Key با کش داخل پروسه (key_hash -> زمان انقضا).
+    ابطال از طریق Redis pub/sub به همه‌ی پروسه‌ها می‌رسد و کلید از کش محلی حذف می‌شود.
+    """
+
+    def __init__(self, ttl=API_KEY_CACHE_TTL, max_size=API_KEY_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._verified = {}
+        self._lock = threading.Lock()
+        self._listener_pid = None
+
+    def is_valid(self, raw_key) -> bool:
+        if not raw_key:
+            return False
+        self._ensure_listener()
+        key_hash = APIKey.hash_key(raw_key)
+        now = time.monotonic()
+
+        expires_at = self._verified.get(key_hash)
+        if expires_at is not None and expires_at > now:
+            return True
+
+        if not APIKey.objects.filter(key_hash=key_hash, is_active=True).exists():
+            self.evict(key_hash)
+            return False
+
+        with self._lock:
+            if len(self._verified) >= self.max_size:
+                self._verified = {h: exp for h, exp in self._verified.items() if exp > now}
+                if len(self._verified) >= self.max_size:
+                    self._verified.clear()
+            self._verified[key_hash] = now + self.ttl
+        return True
+
+    def evict(self, key_hash) -> None:
+        with self._lock:
+            self._verified.pop(key_hash, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._verified.clear()
+
+    # ---------- pub/sub ----------
+    def _ensure_listener(self):
+        # بعد از fork (gunicorn) هر worker شنونده‌ی خودش را لازم دارد
+        pid = os.getpid()
+        if self._listener_pid == pid:
+            return
+        with self._lock:
+            if self._listener_pid == pid:
+                return
+            self._listener_pid = pid
+            self._verified.clear()
+        if get_redis() is None:
+            # بک‌اند کش Redis نیست؛ فقط TTL کش محلی ابطال را محدود می‌کند
+            return
+        thread = threading.Thread(target=self._listen, name='api-key-revocations', daemon=True)
+        thread.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(API_KEY_REVOKED_CHANNEL)
+                for message in pubsub.listen():
+                    data = message.get('data')
+                    if isinstance(data, bytes):
+                        data = data.decode()
+                    self.evict(data)
+            except RedisError:
+                logger.exception("API key revocation listener disconnected")
+            # ممکن است پیام ابطالی در زمان قطعی از دست رفته باشد
+            self.clear()
+            time.sleep(LISTENER_RETRY_DELAY)
+
+
+api_key_verifier = APIKeyVerifier()
+
+
+def publish_api_key_revoked(key_hash) -> None:
+    api_key_verifier.evict(key_hash)
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        redis.publish(API_KEY_REVOKED_CHANNEL, key_hash)
+    except RedisError:
+        logger.exception("Failed to publish API key revocation")
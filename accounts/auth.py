@@ -2,24 +2,30 @@ from rest_framework_simplejwt.authentication import JWTAuthentication
 from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
 from django.conf import settings
 
+from accounts.claims import validate_token_version
+from accounts.token_blacklist import token_blacklist
+
 
 class CustomJWTAuthentication(JWTAuthentication):
     def authenticate(self, request):
-        print(f"Request headers: {request.headers}")
         access_token = request.COOKIES.get(settings.SIMPLE_JWT['AUTH_COOKIE'])
-        print(f"Access token from cookie: {access_token}")
 
         if access_token:
             try:
                 validated_token = self.get_validated_token(access_token)
                 user = self.get_user(validated_token)
-                print(f"Valid token for user: {user.id}")
                 return (user, validated_token)
-            except (InvalidToken, AuthenticationFailed) as e:
-                print(f"Token validation error: {str(e)}")
+            except (InvalidToken, AuthenticationFailed):
                 return None
 
-        print("No cookie found, trying Bearer token...")
-        result = super().authenticate(request)
-        print(f"Bearer token result: {result}")
-        return result
\ No newline at end of file
+        # اگر کوکی نبود، هدر Authorization: Bearer
+        return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        # نسخه‌ی توکن روی همان ردیف کاربر است؛ ابطال بدون کوئری اضافه
+        validate_token_version(validated_token, user)
+        # access tokenهای خارج‌شده (logout)؛ معمولا فقط فیلتر بلوم داخل پروسه بدون Redis
+        if token_blacklist.is_revoked(validated_token.get('jti')):
+            raise InvalidToken("Token is blacklisted.")
+        return user
@@ -0,0 +1,147 @@
+# accounts/claims.py
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models import F
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import CustomUser
+
+# نقش‌ها به‌صورت بیت در claim «rl»
+ROLE_MAIN_MANAGER = 1 << 0
+ROLE_EMPLOYEE = 1 << 1
+ROLE_CUSTOMER = 1 << 2
+ROLE_REPAIRMAN = 1 << 3
+
+ROLE_RELATIONS = (
+    ('main_manager', ROLE_MAIN_MANAGER),
+    ('employee', ROLE_EMPLOYEE),
+    ('customer', ROLE_CUSTOMER),
+    ('repairman', ROLE_REPAIRMAN),
+)
+
+EMPLOYEE_PERMISSION_FIELDS = (
+    'has_access_to_organize_tasks',
+    'has_access_to_game_orders',
+    'has_access_to_product_order',
+    'has_access_to_repair_order',
+    'has_access_to_personal_account',
+    'has_access_to_all_accounts',
+    'has_access_to_add_accounts',
+    'has_access_to_transactions',
+    'has_access_to_customer_read',
+    'has_access_to_customer_write',
+    'has_access_to_employees_read',
+    'has_access_to_employees_write',
+    'has_access_to_repairmen_read',
+    'has_access_to_repairmen_write',
+    'has_access_to_docs_read',
+    'has_access_to_docs_write',
+    'has_access_to_assets_read',
+    'has_access_to_assets_write',
+    'has_access_to_products',
+    'has_access_to_game_store',
+    'has_access_to_blogs',
+    'has_access_to_messenger',
+    'has_access_to_reports',
+    'has_access_to_requests',
+)
+CUSTOMER_PERMISSION_FIELDS = (
+    'has_access_to_course',
+)
+# ترتیب بیت‌های claim «pm»؛ فقط به انتهای این لیست اضافه کنید تا توکن‌های صادرشده معتبر بمانند
+PERMISSION_FIELDS = EMPLOYEE_PERMISSION_FIELDS + CUSTOMER_PERMISSION_FIELDS
+PERMISSION_BITS = {field: 1 << index for index, field in enumerate(PERMISSION_FIELDS)}
+
+ROLES_CLAIM = 'rl'
+PERMISSIONS_CLAIM = 'pm'
+TOKEN_VERSION_CLAIM = 'tv'
+
+
+def permission_mask(fields) -> int:
+    """
+    ماسک بیتی لیستی از فیلدهای has_access_to_*؛ فیلد ناشناخته بیتی ندارد و هرگز برآورده نمی‌شود.
+    """
+    mask = 0
+    for field in fields:
+        mask |= PERMISSION_BITS.get(field, 1 << len(PERMISSION_FIELDS))
+    return mask
+
+
+def profile_permission_mask(profile) -> int:
+    if profile is None:
+        return 0
+    return permission_mask(field for field in PERMISSION_FIELDS if getattr(profile, field, False))
+
+
+def related_profile(user, relation):
+    # OneToOne معکوسی که وجود ندارد
+    try:
+        return getattr(user, relation)
+    except ObjectDoesNotExist:
+        return None
+
+
+def build_claims(user) -> dict:
+    """
+    نقش‌ها، مجوزها و نسخه‌ی توکن کاربر با یک کوئری (select_related روی همه‌ی پروفایل‌ها).
+    فقط هنگام صدور توکن اجرا می‌شود، نه در هر درخواست.
+    """
+    user = CustomUser.objects.select_related(*(relation for relation, _ in ROLE_RELATIONS)).get(pk=user.pk)
+    roles = 0
+    for relation, bit in ROLE_RELATIONS:
+        if related_profile(user, relation) is not None:
+            roles |= bit
+
+    # مدیر اصلی همه‌ی دسترسی‌ها را دارد و به بیت‌ها نیازی ندارد
+    profile = related_profile(user, 'employee') or related_profile(user, 'customer')
+    return {
+        ROLES_CLAIM: roles,
+        PERMISSIONS_CLAIM: profile_permission_mask(profile),
+        TOKEN_VERSION_CLAIM: user.token_version,
+    }
+
+
+def apply_claims(token, user):
+    for claim, value in build_claims(user).items():
+        token[claim] = value
+    return token
+
+
+def issue_tokens(user) -> RefreshToken:
+    """
+    RefreshToken با claimهای نقش و مجوز؛ access_token آن همین claimها را کپی می‌کند.
+    """
+    return apply_claims(RefreshToken.for_user(user), user)
+
+
+def validate_token_version(token, user) -> None:
+    """
+    توکن‌هایی که بعد از تغییر نقش/مجوز یا ابطال صادر نشده‌اند رد می‌شوند.
+    توکن‌های قدیمی بدون claim «tv» تا زمان انقضا پذیرفته می‌شوند.
+    """
+    version = token.get(TOKEN_VERSION_CLAIM)
+    if version is not None and version != user.token_version:
+        raise InvalidToken("Token has been revoked.")
+
+
+def token_roles(token):
+    """
+    نقش‌های داخل توکن یا None اگر توکن claim ندارد (در این صورت از دیتابیس چک می‌شود).
+    """
+    if token is None or not hasattr(token, 'get'):
+        return None
+    return token.get(ROLES_CLAIM)
+
+
+def token_permissions(token):
+    if token is None or not hasattr(token, 'get'):
+        return None
+    return token.get(PERMISSIONS_CLAIM)
+
+
+def bump_token_version(user_id) -> None:
+    """
+    همه‌ی access tokenهای صادرشده‌ی کاربر فورا باطل می‌شوند؛ کلاینت با refresh توکن تازه می‌گیرد.
+    """
+    if user_id:
+        CustomUser.objects.filter(pk=user_id).update(token_version=F('token_version') + 1)
@@ -0,0 +1,43 @@
+import hashlib
+
+from django.db import migrations, models
+
+
+def hash_existing_keys(apps, schema_editor):
+    APIKey = apps.get_model('accounts', 'APIKey')
+    for api_key in APIKey.objects.all():
+        api_key.key_hash = hashlib.sha256(api_key.key.encode()).hexdigest()
+        api_key.prefix = api_key.key[:10]
+        api_key.save(update_fields=['key_hash', 'prefix'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_customuser_token_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apikey',
+            name='key_hash',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.AddField(
+            model_name='apikey',
+            name='prefix',
+            field=models.CharField(default='', editable=False, max_length=10),
+            preserve_default=False,
+        ),
+        # کلیدهای موجود همان مقدار قبلی را نگه می‌دارند، فقط به‌صورت هش
+        migrations.RunPython(hash_existing_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='apikey',
+            name='key_hash',
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+        migrations.RemoveField(
+            model_name='apikey',
+            name='key',
+        ),
+    ]
@@ -1,14 +1,13 @@
+import hashlib
 import secrets
 import uuid
 from datetime import timedelta
 
-import requests
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
 from django.utils import timezone
 
-from DrGame import settings
 from accounts.manager import CustomUserManager
 
 
@@ -20,6 +19,8 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
     is_deleted = models.BooleanField(default=False)
     is_staff = models.BooleanField(default=False)
     is_superuser = models.BooleanField(default=False)
+    # با تغییر نقش یا دسترسی‌ها زیاد می‌شود؛ access tokenهای با نسخه‌ی قدیمی رد می‌شوند (accounts/claims.py)
+    token_version = models.PositiveIntegerField(default=0)
 
     objects = CustomUserManager()
 
@@ -46,67 +47,32 @@ class OTP(models.Model):
     code = models.CharField(max_length=5)  # برای OTP 8 رقمی
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
+    # حدس‌های اشتباه؛ فقط وقتی Redis نیست از این جدول استفاده می‌شود (accounts/otp_store.py)
+    attempts = models.PositiveSmallIntegerField(default=0)
 
     def is_valid(self):
         return timezone.now() <= self.expires_at
 
-    def send_otp(self, phone, otp_code):
-        url = "https://edge.ippanel.com/v1/api/send"
-        api_key = settings.FARAZ_API_KEY
-        phone = '+98' + phone[1:]  # فرمت شماره تلفن
-        headers = {
-            "Authorization": api_key,
-            "Content-Type": "application/json"
-        }
-        print(phone)
-        print(otp_code)
-        message = f"به دکتر گیم خوش آمدید\ncode : {otp_code}\n\nبزرگترین مرجع نصب بازی‌های کنسول در ایران\nـــــــ"
-        print(message)
-        payload = {
-            "sending_type": "webservice",
-            "from_number": "+983000505",  # شماره فرستنده
-            "message": message,
-            "params": {
-                "recipients": [phone, ]
-            }
-        }
-        try:
-            response = requests.post(url, json=payload, headers=headers, timeout=10)
-            print(f"Status Code: {response.status_code}")
-            print(f"Response Headers: {response.headers}")
-            print(f"Response Body: {response.text}")
-
-            try:
-                response_json = response.json()
-                print(f"Response JSON: {response_json}")
-
-                # گرفتن status از داخل meta
-                meta = response_json.get("meta", {})
-                status_ok = meta.get("status") is True
-
-                if status_ok:
-                    print(f"OTP for {phone}: {otp_code}")
-                    return True, "پیامک با موفقیت ارسال شد"
-                else:
-                    return False, f"خطا در ارسال پیامک: {meta.get('message', 'نامشخص')}"
-            except ValueError:
-                print("Response is not valid JSON")
-                return False, "خطا در ارسال پیامک: پاسخ API معتبر نیست"
-        except requests.exceptions.RequestException as e:
-            print(f"Request Error: {str(e)}")
-            return False, f"خطا در ارتباط با سرویس پیامک: {str(e)}"
-
 
 class APIKey(models.Model):
-    key = models.CharField(max_length=70, unique=True)
+    # خود کلید ذخیره نمی‌شود؛ فقط SHA-256 آن و چند کاراکتر اول برای شناسایی
+    key_hash = models.CharField(max_length=64, unique=True, editable=False)
+    prefix = models.CharField(max_length=10, editable=False)
     client_name = models.CharField(max_length=100)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.client_name} - {self.key[:10]}..."
+        return f"{self.client_name} - {self.prefix}..."
+
+    @staticmethod
+    def hash_key(raw_key) -> str:
+        return hashlib.sha256(raw_key.encode()).hexdigest()
 
     def save(self, *args, **kwargs):
-        if not self.key:
-            self.key = secrets.token_urlsafe(52)[:70]  # تولید رشته رندوم 70 کاراکتری
+        if not self.key_hash:
+            # کلید خام فقط همین یک بار روی نمونه در دسترس است (برای نمایش به سازنده)
+            self.raw_key = secrets.token_urlsafe(52)[:70]  # تولید رشته رندوم 70 کاراکتری
+            self.key_hash = self.hash_key(self.raw_key)
+            self.prefix = self.raw_key[:10]
         super().save(*args, **kwargs)
@@ -0,0 +1,164 @@
+# accounts/otp_store.py
+import secrets
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from accounts.models import OTP
+from utils.redis_client import get_redis
+
+OTP_LENGTH = 5
+OTP_TTL = 2 * 60
+# بعد از این تعداد حدس اشتباه کد حذف می‌شود و باید کد تازه گرفت
+OTP_MAX_ATTEMPTS = 5
+# حدس‌های اشتباه هر شماره در این بازه جمع می‌شوند و با گرفتن کد تازه صفر نمی‌شوند؛
+# بعد از رسیدن به سقف نه کد تازه صادر می‌شود نه کدی تأیید (تا پایان بازه)
+OTP_MAX_FAILURES = 10
+OTP_FAIL_WINDOW = 60 * 60
+OTP_KEY = "otp:{phone}"
+OTP_FAIL_KEY = "otp_fail:{phone}"
+
+# نتیجه‌ی verify
+OTP_VALID = 'valid'
+OTP_INVALID = 'invalid'
+OTP_EXPIRED = 'expired'
+OTP_LOCKED = 'locked'
+OTP_BLOCKED = 'blocked'
+
+# شمارش تلاش، مقایسه و حذف در یک عملیات اتمیک؛ کد فقط یک بار مصرف می‌شود
+# KEYS: کد، شمارنده‌ی خطای شماره — ARGV: کد ورودی، سقف تلاش هر کد، سقف خطای شماره، بازه‌ی شمارنده
+VERIFY_SCRIPT = """
+local failures = tonumber(redis.call('GET', KEYS[2]) or '0')
+if failures >= tonumber(ARGV[3]) then
+    redis.call('DEL', KEYS[1])
+    return -3
+end
+local code = redis.call('HGET', KEYS[1], 'code')
+if not code then
+    return -1
+end
+local attempts = redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+if code == ARGV[1] then
+    redis.call('DEL', KEYS[1], KEYS[2])
+    return 1
+end
+failures = redis.call('INCR', KEYS[2])
+if failures == 1 then
+    redis.call('EXPIRE', KEYS[2], ARGV[4])
+end
+if failures >= tonumber(ARGV[3]) then
+    redis.call('DEL', KEYS[1])
+    return -3
+end
+if attempts >= tonumber(ARGV[2]) then
+    redis.call('DEL', KEYS[1])
+    return -2
+end
+return 0
+"""
+_SCRIPT_RESULTS = {1: OTP_VALID, 0: OTP_INVALID, -1: OTP_EXPIRED, -2: OTP_LOCKED, -3: OTP_BLOCKED}
+
+
+class OTPBlocked(Exception):
+    """شماره به سقف حدس‌های اشتباه رسیده و تا پایان بازه کد تازه نمی‌گیرد."""
+
+
+def generate_code() -> str:
+    return str(secrets.randbelow(10 ** OTP_LENGTH)).zfill(OTP_LENGTH)
+
+
+def otp_sms_text(code) -> str:
+    return f"به دکتر گیم خوش آمدید\ncode : {code}\n\nبزرگترین مرجع نصب بازی‌های کنسول در ایران\nـــــــ"
+
+
+class RedisOTPStore:
+    """
+    هر شماره یک hash با TTL خود Redis (code, attempts)؛ بدون ردیف دیتابیس.
+    """
+
+    def __init__(self, redis):
+        self.redis = redis
+        self._verify = redis.register_script(VERIFY_SCRIPT)
+
+    def issue(self, user) -> str:
+        failures = self.redis.get(OTP_FAIL_KEY.format(phone=user.phone))
+        if failures is not None and int(failures) >= OTP_MAX_FAILURES:
+            raise OTPBlocked()
+        code = generate_code()
+        key = OTP_KEY.format(phone=user.phone)
+        pipe = self.redis.pipeline()
+        pipe.delete(key)
+        pipe.hset(key, mapping={'code': code, 'attempts': 0})
+        pipe.expire(key, OTP_TTL)
+        pipe.execute()
+        return code
+
+    def verify(self, user, code) -> str:
+        result = self._verify(
+            keys=[OTP_KEY.format(phone=user.phone), OTP_FAIL_KEY.format(phone=user.phone)],
+            args=[code, OTP_MAX_ATTEMPTS, OTP_MAX_FAILURES, OTP_FAIL_WINDOW],
+        )
+        return _SCRIPT_RESULTS[int(result)]
+
+
+class DatabaseOTPStore:
+    """
+    جایگزین روی جدول OTP وقتی کش Redis نیست (اجرای محلی و تست)؛ همان قواعد تلاش و یک‌بارمصرف.
+    شمارنده‌ی خطای هر شماره در کش پیش‌فرض جنگو نگه داشته می‌شود، چون ردیف OTP با هر کد تازه حذف می‌شود.
+    """
+
+    @staticmethod
+    def _failures_key(user) -> str:
+        return OTP_FAIL_KEY.format(phone=user.phone)
+
+    def _failures(self, user) -> int:
+        return cache.get(self._failures_key(user), 0)
+
+    def _add_failure(self, user) -> int:
+        key = self._failures_key(user)
+        # شروع بازه با اولین خطا، مثل INCR + EXPIRE در Redis
+        cache.add(key, 0, OTP_FAIL_WINDOW)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, OTP_FAIL_WINDOW)
+            return 1
+
+    def issue(self, user) -> str:
+        if self._failures(user) >= OTP_MAX_FAILURES:
+            raise OTPBlocked()
+        code = generate_code()
+        with transaction.atomic():
+            OTP.objects.filter(user=user).delete()
+            OTP.objects.create(user=user, code=code, expires_at=timezone.now() + timedelta(seconds=OTP_TTL))
+        return code
+
+    def verify(self, user, code) -> str:
+        with transaction.atomic():
+            otp = OTP.objects.select_for_update().filter(user=user).order_by('-created_at').first()
+            if self._failures(user) >= OTP_MAX_FAILURES:
+                if otp is not None:
+                    otp.delete()
+                return OTP_BLOCKED
+            if otp is None or not otp.is_valid():
+                return OTP_EXPIRED
+            if otp.code == code:
+                otp.delete()
+                cache.delete(self._failures_key(user))
+                return OTP_VALID
+            if self._add_failure(user) >= OTP_MAX_FAILURES:
+                otp.delete()
+                return OTP_BLOCKED
+            if otp.attempts + 1 >= OTP_MAX_ATTEMPTS:
+                otp.delete()
+                return OTP_LOCKED
+            OTP.objects.filter(pk=otp.pk).update(attempts=F('attempts') + 1)
+            return OTP_INVALID
+
+
+def get_otp_store():
+    redis = get_redis()
+    return RedisOTPStore(redis) if redis is not None else DatabaseOTPStore()
@@ -0,0 +1,40 @@
+# accounts/permission_cache.py
+from functools import lru_cache
+
+from django.core.cache import cache
+
+from accounts.claims import (
+    PERMISSIONS_CLAIM, ROLES_CLAIM, build_claims, token_permissions, token_roles,
+)
+from accounts.models import CustomUser
+
+# token_version جزو کلید است: با تغییر مجوزهای Employee/Customer نسخه بالا می‌رود (accounts/signals.py)
+# و هر دو لایه‌ی کش بدون پاک‌کردن صریح کهنه می‌شوند
+PERMISSION_MASK_KEY = "perm_mask:{user_id}:{version}"
+PERMISSION_MASK_TTL = 60 * 60
+LOCAL_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=LOCAL_CACHE_SIZE)
+def compiled_permissions(user_id, token_version) -> tuple:
+    """
+    (roles, permission_mask) کاربر؛ اول LRU همین پروسه، بعد Redis، در نهایت یک کوئری.
+    """
+    key = PERMISSION_MASK_KEY.format(user_id=user_id, version=token_version)
+    compiled = cache.get(key)
+    if compiled is None:
+        claims = build_claims(CustomUser(pk=user_id))
+        compiled = (claims[ROLES_CLAIM], claims[PERMISSIONS_CLAIM])
+        cache.set(key, compiled, PERMISSION_MASK_TTL)
+    return tuple(compiled)
+
+
+def request_permissions(request) -> tuple:
+    """
+    اگر توکن claim دارد همان (بدون هیچ کش و کوئری)، وگرنه از کش بالا.
+    """
+    roles, mask = token_roles(request.auth), token_permissions(request.auth)
+    if roles is not None and mask is not None:
+        return roles, mask
+    user = request.user
+    return compiled_permissions(user.pk, user.token_version)
@@ -4,6 +4,37 @@ from django.http import HttpResponseForbidden, HttpResponse
 from django.utils.decorators import method_decorator
 from functools import wraps
 
+from accounts.api_keys import API_KEY_HEADER, api_key_verifier
+from accounts.claims import (
+    ROLE_CUSTOMER, ROLE_EMPLOYEE, ROLE_MAIN_MANAGER, ROLE_REPAIRMAN, permission_mask, token_roles,
+)
+from accounts.permission_cache import request_permissions
+
+
+def has_role(request, role_bit, relation) -> bool:
+    """
+    نقش از claim «rl» توکن خوانده می‌شود (بدون کوئری)؛
+    برای توکن‌های بدون claim همان hasattr قبلی روی دیتابیس.
+    """
+    roles = token_roles(request.auth)
+    if roles is not None:
+        return bool(roles & role_bit)
+    return hasattr(request.user, relation)
+
+
+class HasValidAPIKey(BasePermission):
+    """
+    هدر X-API-Key باید یک کلید فعال باشد (تأیید با کش داخل پروسه، accounts/api_keys.py).
+    ویو می‌تواند پیام خطای خودش را با invalid_api_key_message تعیین کند.
+    """
+    message = "Invalid API Key"
+
+    def has_permission(self, request, view):
+        if api_key_verifier.is_valid(request.headers.get(API_KEY_HEADER)):
+            return True
+        # مستقیم raise می‌شود تا مثل قبل 403 با کلید error برگردد، نه 401
+        raise PermissionDenied({"error": getattr(view, 'invalid_api_key_message', self.message)})
+
 
 class IsCustomer(BasePermission):
     def has_permission(self, request, view):
@@ -14,23 +45,26 @@ class IsCustomer(BasePermission):
 
 class IsEmployee(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and hasattr(request.user, 'employee')
+        return request.user.is_authenticated and has_role(request, ROLE_EMPLOYEE, 'employee')
 
 
 class IsRepairman(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and hasattr(request.user, 'repairman')
+        return request.user.is_authenticated and has_role(request, ROLE_REPAIRMAN, 'repairman')
 
 
 class IsMainManager(BasePermission):
     def has_permission(self, request, view):
-        return request.user.is_authenticated and hasattr(request.user, 'main_manager')
+        return request.user.is_authenticated and has_role(request, ROLE_MAIN_MANAGER, 'main_manager')
 
 
 class IsSuperuserOrHasRole(BasePermission):
     def has_permission(self, request, view):
         if request.user.is_authenticated and request.user.is_superuser:
             return True
+        roles = token_roles(request.auth)
+        if roles is not None:
+            return bool(roles & (ROLE_CUSTOMER | ROLE_EMPLOYEE | ROLE_MAIN_MANAGER))
         return (hasattr(request.user, 'customer') or
                 hasattr(request.user, 'business_customer') or
                 hasattr(request.user, 'employee') or
@@ -39,6 +73,12 @@ class IsSuperuserOrHasRole(BasePermission):
 
 # permission decorator
 def restrict_access(*user_boolean_fields):
+    """
+    همه‌ی مجوزهای لازم یک‌بار به ماسک بیتی تبدیل می‌شوند و هر درخواست با یک AND بررسی می‌شود.
+    مدیر اصلی همیشه مجاز است؛ ماسک کارمند/مشتری از توکن یا کش (accounts/permission_cache.py) می‌آید.
+    """
+    required = permission_mask(user_boolean_fields)
+
     def decorator(view_class):
         original_initial = view_class.initial
 
@@ -47,33 +87,17 @@ def restrict_access(*user_boolean_fields):
             user = request.user
             if not user or not user.is_authenticated:
                 raise PermissionDenied("Access denied: user not authenticated.")
-            if hasattr(user, 'main_manager'):
-                print("hello")
-                return original_initial(self, request, *args, **kwargs)
-            if hasattr(user, 'employee'):
-                employee = request.user.employee
-                print("hello 2")
-                for field in user_boolean_fields:
-                    value = getattr(employee, field, None)
-                    print(f"{field}: {value}")
-
-                for field in user_boolean_fields:
-                    if not getattr(employee, field, False):
-                        raise PermissionDenied(f"Access denied: {field} is not True.")
 
+            roles, mask = request_permissions(request)
+            if roles & ROLE_MAIN_MANAGER:
                 return original_initial(self, request, *args, **kwargs)
-            if hasattr(user, 'customer'):
-                customer = request.user.customer
-                print("hello 3")
-                for field in user_boolean_fields:
-                    value = getattr(customer, field, None)
-                    print(f"{field}: {value}")
+            if not roles & (ROLE_EMPLOYEE | ROLE_CUSTOMER):
+                raise PermissionDenied("Access denied.")
+            if mask & required != required:
+                missing = next(field for field in user_boolean_fields if not mask & permission_mask([field]))
+                raise PermissionDenied(f"Access denied: {missing} is not True.")
 
-                for field in user_boolean_fields:
-                    if not getattr(customer, field, False):
-                        raise PermissionDenied(f"Access denied: {field} is not True.")
-
-                return original_initial(self, request, *args, **kwargs)
+            return original_initial(self, request, *args, **kwargs)
 
         view_class.initial = new_initial
         return view_class
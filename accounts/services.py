@@ -0,0 +1,80 @@
+# accounts/services.py
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+
+from accounts.claims import EMPLOYEE_PERMISSION_FIELDS, ROLE_RELATIONS, related_profile
+from accounts.models import CustomUser
+
+# v2: user_pic نام فایل است، نه آدرس
+USER_STATUS_CACHE_KEY = "user_status:v2:{user_id}"
+USER_STATUS_CACHE_TTL = 60 * 60  # یک ساعت؛ با سیگنال‌ها زودتر باطل می‌شود
+
+
+def _user_status_cache_key(user_id) -> str:
+    return USER_STATUS_CACHE_KEY.format(user_id=user_id)
+
+
+def _image_name(image):
+    # آدرس S3 امضاشده است و منقضی می‌شود؛ فقط نام فایل کش می‌شود و آدرس هنگام پاسخ ساخته می‌شود
+    return image.name if image else None
+
+
+def _resolve_user_status(user_id) -> dict:
+    """
+    نوع کاربر، نام نمایشی، عکس و دسترسی‌ها با یک کوئری (select_related روی همه‌ی پروفایل‌ها).
+    اولویت مثل قبل: مدیر اصلی، کارمند، تعمیرکار، مشتری.
+    """
+    user = CustomUser.objects.select_related(*(relation for relation, _ in ROLE_RELATIONS)).get(pk=user_id)
+    status = {
+        "is_authenticated": True,
+        "user_type": "none",
+        "employee_role": None,
+        "user_name": None,
+        "user_id": user.id,
+        "user_pic": None,
+        "employee_permissions": {},
+    }
+
+    main_manager = related_profile(user, 'main_manager')
+    employee = related_profile(user, 'employee')
+    repairman = related_profile(user, 'repairman')
+    customer = related_profile(user, 'customer')
+
+    if main_manager:
+        status.update(user_type="main_manager", user_name=main_manager.name)
+    elif employee:
+        status.update(
+            user_type="employee",
+            employee_role=employee.role,
+            user_pic=_image_name(employee.profile_picture),
+            user_name=f"{employee.first_name} {employee.last_name}",
+            employee_permissions={field: getattr(employee, field, False) for field in EMPLOYEE_PERMISSION_FIELDS},
+        )
+    elif repairman:
+        status.update(user_type="repairman", user_name=f"{repairman.first_name} {repairman.last_name}")
+    elif customer:
+        status.update(
+            user_type="customer",
+            user_name=customer.full_name,
+            user_pic=_image_name(customer.profile_pic),
+        )
+    return status
+
+
+def get_user_status(user) -> dict:
+    """
+    وضعیت کاربر برای UserStatusView؛ برای هر کاربر در Redis کش می‌شود.
+    """
+    key = _user_status_cache_key(user.id)
+    status = cache.get(key)
+    if status is None:
+        status = _resolve_user_status(user.id)
+        cache.set(key, status, USER_STATUS_CACHE_TTL)
+    if status["user_pic"]:
+        status = {**status, "user_pic": default_storage.url(status["user_pic"])}
+    return status
+
+
+def invalidate_user_status(user_id) -> None:
+    if user_id:
+        cache.delete(_user_status_cache_key(user_id))
@@ -0,0 +1,64 @@
+# accounts/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from accounts.api_keys import publish_api_key_revoked
+from accounts.claims import PERMISSION_FIELDS, bump_token_version, profile_permission_mask
+from accounts.models import APIKey, MainManager
+from accounts.services import invalidate_user_status
+from customers.models import Customer
+from employees.models import Employee, Repairman
+
+@receiver(post_init, sender=Employee)
+@receiver(post_init, sender=Customer)
+def remember_permission_mask(sender, instance, **kwargs):
+    # اگر فیلد مجوزی defer شده باشد خوانده نمی‌شود تا post_init کوئری نزند
+    if instance.get_deferred_fields() & set(PERMISSION_FIELDS):
+        instance._loaded_permission_mask = None
+        return
+    instance._loaded_permission_mask = profile_permission_mask(instance)
+
+
+@receiver(post_save, sender=Employee)
+@receiver(post_save, sender=Customer)
+def permissions_changed(sender, instance, created=False, **kwargs):
+    mask = profile_permission_mask(instance)
+    if created or mask != getattr(instance, '_loaded_permission_mask', None):
+        bump_token_version(instance.user_id)
+    instance._loaded_permission_mask = mask
+
+
+@receiver(post_save, sender=MainManager)
+@receiver(post_save, sender=Repairman)
+def role_added(sender, instance, created=False, **kwargs):
+    if created:
+        bump_token_version(instance.user_id)
+
+
+@receiver(post_delete, sender=MainManager)
+@receiver(post_delete, sender=Employee)
+@receiver(post_delete, sender=Customer)
+@receiver(post_delete, sender=Repairman)
+def role_removed(sender, instance, **kwargs):
+    bump_token_version(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=MainManager)
+@receiver([post_save, post_delete], sender=Employee)
+@receiver([post_save, post_delete], sender=Customer)
+@receiver([post_save, post_delete], sender=Repairman)
+def profile_changed(sender, instance, **kwargs):
+    # نام، عکس، نقش یا دسترسی‌ها ممکن است عوض شده باشد
+    invalidate_user_status(instance.user_id)
+
+
+@receiver(post_save, sender=APIKey)
+def api_key_saved(sender, instance, **kwargs):
+    if not instance.is_active:
+        transaction.on_commit(lambda: publish_api_key_revoked(instance.key_hash))
+
+
+@receiver(post_delete, sender=APIKey)
+def api_key_deleted(sender, instance, **kwargs):
+    transaction.on_commit(lambda: publish_api_key_revoked(instance.key_hash))
@@ -0,0 +1,74 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import OTP, CustomUser
+from accounts.otp_store import (
+    OTP_BLOCKED, OTP_EXPIRED, OTP_INVALID, OTP_LOCKED, OTP_MAX_ATTEMPTS, OTP_MAX_FAILURES, OTP_VALID,
+    DatabaseOTPStore, OTPBlocked,
+)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class DatabaseOTPStoreTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.store = DatabaseOTPStore()
+        self.user = CustomUser.objects.create(phone='09120000001')
+
+    def wrong_code(self, code):
+        return '00000' if code != '00000' else '11111'
+
+    def test_valid_code(self):
+        code = self.store.issue(self.user)
+        self.assertEqual(self.store.verify(self.user, code), OTP_VALID)
+
+    def test_wrong_code(self):
+        code = self.store.issue(self.user)
+        self.assertEqual(self.store.verify(self.user, self.wrong_code(code)), OTP_INVALID)
+        self.assertEqual(OTP.objects.get(user=self.user).attempts, 1)
+        # کد درست هنوز قبول می‌شود
+        self.assertEqual(self.store.verify(self.user, code), OTP_VALID)
+
+    def test_locked_after_max_attempts(self):
+        code = self.store.issue(self.user)
+        results = [self.store.verify(self.user, self.wrong_code(code)) for _ in range(OTP_MAX_ATTEMPTS)]
+        self.assertEqual(results, [OTP_INVALID] * (OTP_MAX_ATTEMPTS - 1) + [OTP_LOCKED])
+        self.assertFalse(OTP.objects.filter(user=self.user).exists())
+        self.assertEqual(self.store.verify(self.user, code), OTP_EXPIRED)
+
+    def test_expired_code(self):
+        code = self.store.issue(self.user)
+        OTP.objects.filter(user=self.user).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.store.verify(self.user, code), OTP_EXPIRED)
+
+    def test_single_use(self):
+        code = self.store.issue(self.user)
+        self.assertEqual(self.store.verify(self.user, code), OTP_VALID)
+        self.assertEqual(self.store.verify(self.user, code), OTP_EXPIRED)
+
+    def test_new_code_replaces_previous(self):
+        old = self.store.issue(self.user)
+        new = self.store.issue(self.user)
+        self.assertEqual(OTP.objects.filter(user=self.user).count(), 1)
+        if old != new:
+            self.assertEqual(self.store.verify(self.user, old), OTP_INVALID)
+        self.assertEqual(self.store.verify(self.user, new), OTP_VALID)
+
+    def test_failures_count_across_reissued_codes(self):
+        results = []
+        for _ in range(OTP_MAX_FAILURES // 2):
+            code = self.store.issue(self.user)
+            results += [self.store.verify(self.user, self.wrong_code(code)) for _ in range(2)]
+        self.assertEqual(results[-1], OTP_BLOCKED)
+        self.assertNotIn(OTP_BLOCKED, results[:-1])
+        with self.assertRaises(OTPBlocked):
+            self.store.issue(self.user)
+
+    def test_valid_code_resets_failures(self):
+        code = self.store.issue(self.user)
+        self.store.verify(self.user, self.wrong_code(code))
+        self.assertEqual(self.store.verify(self.user, code), OTP_VALID)
+        self.assertEqual(self.store._failures(self.user), 0)
@@ -0,0 +1,183 @@
+# accounts/token_blacklist.py
+import hashlib
+import logging
+import math
+import os
+import threading
+import time
+
+from django.core.cache import cache
+from redis.exceptions import RedisError
+
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+BLACKLIST_KEY_PREFIX = 'jwt_bl'
+BLACKLIST_CHANNEL = 'jwt_bl:revoked'
+# ظرفیت و نرخ خطای مثبت کاذب فیلتر بلوم داخل پروسه (حدود ۱۸۰KB)
+FILTER_CAPACITY = 100_000
+FILTER_ERROR_RATE = 0.001
+# کلیدهای منقضی‌شده از Redis پاک می‌شوند ولی از فیلتر بلوم نه؛ فیلتر هر چند ساعت از نو ساخته می‌شود
+FILTER_REBUILD_INTERVAL = 6 * 60 * 60
+LISTENER_RETRY_DELAY = 5
+
+
+class BloomFilter:
+    """
+    فیلتر بلوم ساده روی bytearray؛ «نیست» قطعی است و «هست» باید با Redis تأیید شود.
+    """
+
+    def __init__(self, capacity=FILTER_CAPACITY, error_rate=FILTER_ERROR_RATE):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        # double hashing: دو عدد ۶۴ بیتی از یک blake2b
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class TokenBlacklist:
+    """
+    لیست سیاه jti توکن‌ها در کش Redis؛ هر ورودی با پایان عمر خود توکن منقضی می‌شود.
+    فیلتر بلوم داخل پروسه بیشتر بررسی‌ها را بدون رفت‌وبرگشت به Redis جواب می‌دهد و
+    با pub/sub روی همه‌ی پروسه‌ها به‌روز می‌ماند. تا فیلتر آماده نشده (یا اتصال قطع است) مستقیم از کش خوانده می‌شود.
+    """
+
+    def __init__(self, prefix=BLACKLIST_KEY_PREFIX, channel=BLACKLIST_CHANNEL, capacity=FILTER_CAPACITY):
+        self.prefix = prefix
+        self.channel = channel
+        self.capacity = capacity
+        self._filter = BloomFilter(capacity)
+        self._ready = False
+        self._rebuild_buffer = None
+        self._lock = threading.Lock()
+        self._listener_pid = None
+
+    def _key(self, jti) -> str:
+        return f"{self.prefix}:{jti}"
+
+    def revoke(self, jti, exp) -> bool:
+        """
+        jti را تا زمان exp توکن باطل می‌کند. اگر قبلا باطل شده بود False (برای تشخیص استفاده‌ی دوباره در rotation).
+        """
+        if not jti:
+            return False
+        ttl = int(exp - time.time()) + 1 if exp else None
+        if ttl is not None and ttl <= 0:
+            return False
+        # cache.add همان SET NX EX است؛ دو درخواست هم‌زمان با یک توکن فقط یکی موفق می‌شوند
+        added = cache.add(self._key(jti), 1, ttl)
+        self._remember(jti)
+        if added:
+            self._publish(jti)
+        return added
+
+    def is_revoked(self, jti) -> bool:
+        if not jti:
+            return False
+        self._ensure_listener()
+        if self._ready and jti not in self._filter:
+            return False
+        return cache.get(self._key(jti)) is not None
+
+    # ---------- فیلتر بلوم ----------
+    def _remember(self, jti):
+        with self._lock:
+            self._filter.add(jti)
+            if self._rebuild_buffer is not None:
+                self._rebuild_buffer.append(jti)
+
+    def rebuild(self) -> int:
+        """
+        فیلتر را از کلیدهای زنده‌ی Redis از نو می‌سازد (ورودی‌های منقضی حذف می‌شوند).
+        اگر لیست سیاه از ظرفیت بیشتر شده باشد فیلتر بزرگ‌تر (با همان نرخ خطا) ساخته می‌شود.
+        """
+        with self._lock:
+            self._rebuild_buffer = []
+        try:
+            start = len(self.prefix) + 1
+            jtis = [key[start:] for key in cache.iter_keys(f"{self.prefix}:*")]
+        except BaseException:
+            with self._lock:
+                self._rebuild_buffer = None
+            raise
+
+        fresh = BloomFilter(max(self.capacity, 2 * len(jtis)))
+        for jti in jtis:
+            fresh.add(jti)
+        with self._lock:
+            # ابطال‌هایی که حین اسکن رسیدند
+            for jti in self._rebuild_buffer:
+                fresh.add(jti)
+            self._rebuild_buffer = None
+            self._filter = fresh
+            self._ready = True
+        return fresh.count
+
+    # ---------- pub/sub ----------
+    def _publish(self, jti):
+        redis = get_redis()
+        if redis is None:
+            return
+        try:
+            redis.publish(self.channel, jti)
+        except RedisError:
+            logger.exception("Failed to publish token revocation")
+
+    def _ensure_listener(self):
+        # بعد از fork (gunicorn) هر worker شنونده و فیلتر خودش را لازم دارد
+        pid = os.getpid()
+        if self._listener_pid == pid:
+            return
+        with self._lock:
+            if self._listener_pid == pid:
+                return
+            self._listener_pid = pid
+            self._ready = False
+        if get_redis() is None:
+            # بدون Redis فیلتر بین پروسه‌ها هماهنگ نمی‌ماند؛ همیشه از کش خوانده می‌شود
+            return
+        thread = threading.Thread(target=self._listen, name='token-blacklist', daemon=True)
+        thread.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                # اول subscribe بعد rebuild تا ابطالی بین این دو از دست نرود
+                pubsub.subscribe(self.channel)
+                self.rebuild()
+                rebuild_at = time.monotonic() + FILTER_REBUILD_INTERVAL
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message:
+                        data = message.get('data')
+                        self._remember(data.decode() if isinstance(data, bytes) else data)
+                    if time.monotonic() >= rebuild_at or self._filter.count > self._filter.capacity:
+                        self.rebuild()
+                        rebuild_at = time.monotonic() + FILTER_REBUILD_INTERVAL
+            except Exception:
+                # هر خطایی فیلتر را نامعتبر می‌کند، نه فقط قطع اتصال
+                logger.exception("Token blacklist listener stopped")
+            # ممکن است پیام ابطالی در زمان قطعی از دست رفته باشد
+            with self._lock:
+                self._ready = False
+            time.sleep(LISTENER_RETRY_DELAY)
+
+
+token_blacklist = TokenBlacklist()
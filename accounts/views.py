@@ -1,25 +1,29 @@
 # your_app/views.py
-import secrets
 from datetime import timedelta
 import requests
 from django.contrib.auth import authenticate
 from django.utils import timezone
 from drf_spectacular.utils import extend_schema
 from rest_framework import status
-from rest_framework.generics import get_object_or_404
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.throttling import AnonRateThrottle
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken, TokenError
 from DrGame import settings
 from accounts.auth import CustomJWTAuthentication
-from accounts.models import CustomUser, OTP, APIKey, MainManager
+from accounts.claims import apply_claims, issue_tokens
+from accounts.services import get_user_status
+from accounts.models import CustomUser, APIKey
+from accounts.otp_store import (
+    OTP_BLOCKED, OTP_LOCKED, OTP_TTL, OTP_VALID, OTPBlocked, get_otp_store, otp_sms_text,
+)
+from accounts.permissions import HasValidAPIKey
 from accounts.serializers import VerifyOTPSerializer, VerifyOTPResponseSerializer, RefreshTokenSerializer, \
     RefreshTokenResponseSerializer, RequestOTPSerializer, RequestOTPResponseSerializer
 from accounts.throttles import PhoneRateThrottle
-from customers.models import Customer
-from employees.models import Employee, Repairman
+from accounts.token_blacklist import token_blacklist
+from utils.sms_outbox import enqueue_otp
 
 
 class CreateAPIKeyView(APIView):
@@ -47,7 +51,7 @@ class CreateAPIKeyView(APIView):
 
         return Response(
             {
-                "api_key": api_key.key,
+                "api_key": api_key.raw_key,
                 "client_name": api_key.client_name
             },
             status=status.HTTP_201_CREATED
@@ -62,7 +66,8 @@ class CreateAPIKeyView(APIView):
 
 class RequestOTPView(APIView):
     throttle_classes = [AnonRateThrottle, PhoneRateThrottle]
-    permission_classes = [AllowAny]
+    permission_classes = [HasValidAPIKey]
+    invalid_api_key_message = "API Key نامعتبر است"
 
     @extend_schema(
         request=RequestOTPSerializer,
@@ -70,18 +75,11 @@ class RequestOTPView(APIView):
             200: RequestOTPResponseSerializer,
             400: RequestOTPResponseSerializer,
             403: RequestOTPResponseSerializer,
-            500: RequestOTPResponseSerializer
+            429: RequestOTPResponseSerializer,
         },
         description="ارسال درخواست OTP با شماره موبایل"
     )
     def post(self, request):
-        # (بقیه کد همونیه که فرستادی)
-        api_key = request.headers.get('X-API-Key')
-        if not api_key or not APIKey.objects.filter(key=api_key, is_active=True).exists():
-            return Response(
-                {"error": "API Key نامعتبر است"},
-                status=status.HTTP_403_FORBIDDEN
-            )
         phone = request.data.get('phone')
         if not phone:
             return Response(
@@ -91,17 +89,15 @@ class RequestOTPView(APIView):
         user = CustomUser.objects.filter(phone=phone).first()
         if not user:
             user = CustomUser.objects.create(phone=phone, is_active=False)
-        OTP.objects.filter(user=user).delete()
-        otp_code = str(secrets.randbelow(100000)).zfill(5)
-        print(otp_code)
-        expires_at = timezone.now() + timedelta(minutes=2)
-        otp = OTP.objects.create(user=user, code=otp_code, expires_at=expires_at)
-        success, message = otp.send_otp(phone=phone, otp_code=otp_code)
-        if not success:
+        try:
+            otp_code = get_otp_store().issue(user)
+        except OTPBlocked:
             return Response(
-                {"error": f"خطا در ارسال OTP: {message}"},
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+                {"error": "Too many failed attempts, try again later"},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
             )
+        # ارسال در ورکر send_sms_outbox؛ پاسخ منتظر IPPanel نمی‌ماند
+        enqueue_otp(phone, otp_sms_text(otp_code), timezone.now() + timedelta(seconds=OTP_TTL))
         return Response(
             {"message": "لطفاً کد OTP را وارد کنید"},
             status=status.HTTP_200_OK
@@ -110,7 +106,7 @@ class RequestOTPView(APIView):
 
 class VerifyOTPView(APIView):
     throttle_classes = [AnonRateThrottle]
-    permission_classes = [AllowAny]
+    permission_classes = [HasValidAPIKey]
 
     @extend_schema(
         request=VerifyOTPSerializer,
@@ -118,18 +114,12 @@ class VerifyOTPView(APIView):
             200: VerifyOTPResponseSerializer,
             400: VerifyOTPResponseSerializer,
             403: VerifyOTPResponseSerializer,
-            404: VerifyOTPResponseSerializer
+            404: VerifyOTPResponseSerializer,
+            429: VerifyOTPResponseSerializer
         },
         description="تأیید کد OTP و دریافت توکن‌های دسترسی"
     )
     def post(self, request):
-        # (بقیه کد همونیه که فرستادی)
-        api_key = request.headers.get('X-API-Key')
-        if not api_key or not APIKey.objects.filter(key=api_key, is_active=True).exists():
-            return Response(
-                {"error": "Invalid API Key"},
-                status=status.HTTP_403_FORBIDDEN
-            )
         phone = request.data.get('phone')
         code = request.data.get('code')
         if not phone or not code:
@@ -144,23 +134,26 @@ class VerifyOTPView(APIView):
                 {"error": "User not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
-        try:
-            otp = OTP.objects.filter(user=user).latest('created_at')
-            if otp.code != code or not otp.is_valid():
-                return Response(
-                    {"error": "Invalid or expired OTP"},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            otp.delete()
-            if not user.is_active:
-                user.is_active = True
-                user.save()
-        except OTP.DoesNotExist:
+        result = get_otp_store().verify(user, code)
+        if result == OTP_LOCKED:
             return Response(
-                {"error": "No OTP found"},
+                {"error": "Too many attempts, request a new OTP"},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+        if result == OTP_BLOCKED:
+            return Response(
+                {"error": "Too many failed attempts, try again later"},
+                status=status.HTTP_429_TOO_MANY_REQUESTS
+            )
+        if result != OTP_VALID:
+            return Response(
+                {"error": "Invalid or expired OTP"},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        refresh = RefreshToken.for_user(user)
+        if not user.is_active:
+            user.is_active = True
+            user.save()
+        refresh = issue_tokens(user)
         access_token = str(refresh.access_token)
         refresh_token = str(refresh)
         response = Response(
@@ -188,7 +181,7 @@ class VerifyOTPView(APIView):
 
 class RefreshTokenView(APIView):
     throttle_classes = [AnonRateThrottle]
-    permission_classes = [AllowAny]
+    permission_classes = [HasValidAPIKey]
 
     @extend_schema(
         request=RefreshTokenSerializer,
@@ -200,13 +193,6 @@ class RefreshTokenView(APIView):
         description="رفرش توکن برای دریافت توکن دسترسی جدید"
     )
     def post(self, request):
-        # (بقیه کد همونیه که فرستادی)
-        api_key = request.headers.get('X-API-Key')
-        if not api_key or not APIKey.objects.filter(key=api_key, is_active=True).exists():
-            return Response(
-                {"error": "Invalid API Key"},
-                status=status.HTTP_403_FORBIDDEN
-            )
         refresh_token = request.COOKIES.get('refresh_token')
         if not refresh_token:
             return Response(
@@ -215,7 +201,22 @@ class RefreshTokenView(APIView):
             )
         try:
             refresh = RefreshToken(refresh_token)
+            if token_blacklist.is_revoked(refresh.get('jti')):
+                raise TokenError("Token is blacklisted")
+            user = CustomUser.objects.filter(pk=refresh.get('user_id'), is_active=True).first()
+            if user is None:
+                raise TokenError("User not found or inactive")
+            # نقش‌ها و دسترسی‌ها و نسخه‌ی توکن هنگام refresh از نو خوانده می‌شوند
+            apply_claims(refresh, user)
             access_token = str(refresh.access_token)
+            if settings.SIMPLE_JWT['ROTATE_REFRESH_TOKENS']:
+                # توکن قبلی تا زمان انقضایش باطل می‌شود؛ اگر هم‌زمان یک‌بار مصرف شده باشد این درخواست رد می‌شود
+                if settings.SIMPLE_JWT['BLACKLIST_AFTER_ROTATION'] and \
+                        not token_blacklist.revoke(refresh.get('jti'), refresh.get('exp')):
+                    raise TokenError("Token is blacklisted")
+                refresh.set_jti()
+                refresh.set_exp()
+                refresh.set_iat()
             response = Response(
                 {"message": "Token refreshed successfully"},
                 status=status.HTTP_200_OK
@@ -247,19 +248,23 @@ class RefreshTokenView(APIView):
 
 class LogoutView(APIView):
     throttle_classes = [AnonRateThrottle]
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, HasValidAPIKey]
     authentication_classes = [CustomJWTAuthentication]
 
     def get(self, request):  # اضافه کردن متد GET
         return self.post(request)  # استفاده از منطق POST
 
     def post(self, request):
-        api_key = request.headers.get('X-API-Key')
-        if not api_key or not APIKey.objects.filter(key=api_key, is_active=True).exists():
-            return Response(
-                {"error": "Invalid API Key"},
-                status=status.HTTP_403_FORBIDDEN
-            )
+        # refresh token همین دستگاه و access token فعلی تا زمان انقضا باطل می‌شوند
+        refresh_token = request.COOKIES.get('refresh_token')
+        if refresh_token:
+            try:
+                refresh = RefreshToken(refresh_token)
+                token_blacklist.revoke(refresh.get('jti'), refresh.get('exp'))
+            except TokenError:
+                pass
+        if request.auth is not None:
+            token_blacklist.revoke(request.auth.get('jti'), request.auth.get('exp'))
 
         response = Response(
             {"message": "Logout successful"},
@@ -282,80 +287,5 @@ class UserStatusView(APIView):
                 status=200
             )
 
-        user = request.user
-        user_type = None
-        user_pic = None
-        employee_role = None
-        user_name = None
-        employee_permissions = {}
-
-        if MainManager.objects.filter(user=user).exists():
-            main_manager = get_object_or_404(MainManager, user=user)
-            user_type = "main_manager"
-            user_name = main_manager.name
-
-        elif Employee.objects.filter(user=user).exists():
-            user_type = "employee"
-            employee = get_object_or_404(Employee, user=user)
-            employee_role = employee.role
-            if employee.profile_picture:
-                user_pic = employee.profile_picture.url
-            user_name = f"{employee.first_name} {employee.last_name}"
-
-            permission_fields = [
-                "has_access_to_organize_tasks",
-                "has_access_to_game_orders",
-                "has_access_to_product_order",
-                "has_access_to_repair_order",
-                "has_access_to_personal_account",
-                "has_access_to_all_accounts",
-                "has_access_to_add_accounts",
-                "has_access_to_transactions",
-                "has_access_to_customer_read",
-                "has_access_to_customer_write",
-                "has_access_to_employees_read",
-                "has_access_to_employees_write",
-                "has_access_to_repairmen_read",
-                "has_access_to_repairmen_write",
-                "has_access_to_docs_read",
-                "has_access_to_docs_write",
-                "has_access_to_assets_read",
-                "has_access_to_assets_write",
-                "has_access_to_products",
-                "has_access_to_game_store",
-                "has_access_to_blogs",
-                "has_access_to_messenger",
-                "has_access_to_reports",
-                "has_access_to_requests"
-            ]
-
-            # پر کردن دیکشنری پرمیشن‌ها به صورت True/False
-            for field in permission_fields:
-                employee_permissions[field] = getattr(employee, field, False)
-
-        elif Repairman.objects.filter(user=user).exists():
-            user_type = "repairman"
-            repairman = get_object_or_404(Repairman, user=user)
-            user_name = f"{repairman.first_name} {repairman.last_name}"
-
-        elif Customer.objects.filter(user=user).exists():
-            user_type = "customer"
-            customer = get_object_or_404(Customer, user=user)
-            user_name = customer.full_name
-            if user.customer.profile_pic:
-                user_pic = user.customer.profile_pic.url
-        else:
-            user_type = "none"
-
-        return Response(
-            {
-                "is_authenticated": True,
-                "user_type": user_type,
-                "employee_role": employee_role,
-                "user_name": user_name,
-                "user_id": user.id,
-                "user_pic": user_pic,
-                "employee_permissions": employee_permissions,
-            },
-            status=200
-        )
+        # یک کوئری برای همه‌ی پروفایل‌ها و معمولا هیچ کوئری (کش با سیگنال‌ها باطل می‌شود)
+        return Response(get_user_status(request.user), status=200)
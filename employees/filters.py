@@ -1,10 +1,11 @@
 import django_filters
+from django.db.models import Count, Q
 
 from employees.models import EmployeeTask, EmployeeRequest
 from django_filters import rest_framework as filters
 
 from payments.models import Transaction, GameOrder, RepairOrder
-from storage.models import SonyAccount
+from storage.models import SonyAccount, SonyAccountGame, Game
 
 
 class EmployeeTaskFilter(filters.FilterSet):
@@ -90,6 +91,49 @@ class SonyAccountFilter(filters.FilterSet):
         fields = ['employee', 'status', 'is_owned']
 
 
+class GameAvailabilityFilter(filters.FilterSet):
+    # روی مقدار annotate‌شده‌ی available_accounts در EmployeeGameListCreate کار می‌کند
+    available_lt = filters.NumberFilter(field_name='available_accounts', lookup_expr='lt')
+    available_gte = filters.NumberFilter(field_name='available_accounts', lookup_expr='gte')
+
+    class Meta:
+        model = Game
+        fields = ['available_lt', 'available_gte']
+
+
+class SonyAccountFacetFilter(filters.FilterSet):
+    region = filters.ChoiceFilter(choices=SonyAccount._meta.get_field('region').choices)
+    plus = filters.BooleanFilter(field_name='plus')
+    status = filters.NumberFilter(field_name='status__id')
+    employee = filters.NumberFilter(field_name='employee__id')
+    is_owned = filters.BooleanFilter(field_name='is_owned')
+    available = filters.BooleanFilter(method='filter_available')
+    games = filters.BaseInFilter(method='filter_games')
+
+    class Meta:
+        model = SonyAccount
+        fields = ['region', 'plus', 'status', 'employee', 'is_owned', 'available', 'games']
+
+    def filter_available(self, queryset, name, value):
+        condition = Q(status__isnull=True) | Q(status__is_available=True)
+        return queryset.filter(condition) if value else queryset.exclude(condition)
+
+    def filter_games(self, queryset, name, value):
+        # اکانت باید همه‌ی بازی‌های خواسته‌شده را داشته باشد
+        game_ids = {int(game_id) for game_id in value if str(game_id).isdigit()}
+        if not game_ids:
+            return queryset
+        owners = (
+            SonyAccountGame.objects
+            .filter(game_id__in=game_ids, is_deleted=False)
+            .values('sony_account_id')
+            .annotate(matched=Count('game_id', distinct=True))
+            .filter(matched=len(game_ids))
+            .values('sony_account_id')
+        )
+        return queryset.filter(id__in=owners)
+
+
 class SonyAccountPersonalFilter(filters.FilterSet):
     status = filters.NumberFilter(field_name='status__id')
 
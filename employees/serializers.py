@@ -13,7 +13,7 @@ from payments.models import GameOrder, Transaction, Order, RepairOrder, PaymentM
 from payments.serializers import DeliveryManSerializer
 from storage.models import Game, SonyAccount, Product, ProductColor, ProductCategory, ProductCompany, \
     GameImage, DocCategory, Document, RealAssetsCategory, RealAssets, SonyAccountStatus, SonyAccountBank, \
-    SonyAccountGame
+    SonyAccountGame, GameAvailability
 
 
 class SoftDeleteSerializerMixin:
@@ -151,8 +151,16 @@ class EmployeeGameImageSerializer(SoftDeleteSerializerMixin, serializers.ModelSe
         exclude = ['game']
 
 
+class GameAvailabilitySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GameAvailability
+        fields = ['region', 'total_accounts', 'available_accounts', 'updated_at']
+
+
 class EmployeeGameSerializer(SoftDeleteSerializerMixin, serializers.ModelSerializer):
     game_images = EmployeeGameImageSerializer(many=True, required=False)
+    availability = GameAvailabilitySerializer(many=True, read_only=True)
+    available_accounts = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = Game
@@ -256,7 +264,7 @@ class EmployeeSonyAccountSerializer(SoftDeleteSerializerMixin, serializers.Model
     class Meta:
         model = SonyAccount
         fields = "__all__"
-        read_only_fields = ['is_deleted', 'created_at', 'updated_at']
+        read_only_fields = ['is_deleted', 'created_at', 'updated_at', 'claimed_at']
 
     def get_employee(self, obj):
         if obj.employee:
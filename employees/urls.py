@@ -49,6 +49,7 @@ urlpatterns = [
     # ==================== SonyAccounts Views ====================
     path('sony-accounts/new/', views.EmployeePanelGetNewSonyAccount.as_view(), name='sony-account-new'),
     path('sony-accounts/', views.EmployeePanelSonyAccountList.as_view(), name='sony-account-list'),
+    path('sony-accounts/search/', views.EmployeePanelSonyAccountFacetSearch.as_view(), name='sony-account-search'),
     path('sony-accounts/<int:pk>/', views.EmployeePanelSonyAccountDetail.as_view(), name='sony-account-detail'),
 
     # ==================== ProductOrders Views ====================
@@ -109,6 +110,11 @@ urlpatterns = [
     path('customer/<int:pk>/', views.CustomerDetail.as_view(), name='customer-detail'),
     path('customer/<int:pk>/deposit/', views.CustomerDeposit.as_view(), name='customer-deposit'),
     path('customer/send-sms-service/', views.CustomerSendSmsService.as_view(), name='customer-send-sms-service'),
+    path('customer/sms-campaign/', views.SmsCampaignListCreate.as_view(), name='sms-campaign-list-create'),
+    path('customer/sms-campaign/<int:pk>/', views.SmsCampaignDetail.as_view(), name='sms-campaign-detail'),
+    path('customer/sms-campaign/<int:pk>/recipients/', views.SmsCampaignRecipientList.as_view(),
+         name='sms-campaign-recipients'),
+    path('sms-outbox/', views.SmsOutboxList.as_view(), name='sms-outbox-list'),
 
     # ==================== GameStore Views ====================
     path('game/list-add/', views.EmployeeGameListCreate.as_view(), name='game-list-add'),
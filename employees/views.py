@@ -1,6 +1,6 @@
-import requests
 from django.core.exceptions import PermissionDenied
-from django.db.models import Q, Count, Sum
+from django.db.models import Q, Count, Sum, Prefetch
+from django.db.models.functions import Coalesce
 from django.utils.dateparse import parse_date
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, status, filters
@@ -9,13 +9,13 @@ from rest_framework.pagination import LimitOffsetPagination
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from DrGame import settings
 from accounts.auth import CustomJWTAuthentication
 from accounts.models import CustomUser
 from accounts.permissions import IsEmployee, restrict_access, IsMainManager, IsRepairman
 from customers.models import Customer
 from employees.filters import EmployeeTaskFilter, TransactionFilter, GameOrderFilter, RepairOrderFilter, \
-    SonyAccountFilter, SonyAccountPersonalFilter, EmployeeRequestFilter
+    SonyAccountFilter, SonyAccountPersonalFilter, EmployeeRequestFilter, SonyAccountFacetFilter, \
+    GameAvailabilityFilter
 from employees.models import EmployeeTask, Employee, Repairman, EmployeeRequest, EmployeeHire
 from employees.serializers import EmployeeGameSerializer, EmployeeGameOrderSerializer, \
     EmployeeSonyAccountSerializer, EmployeeTransactionSerializer, EmployeeProductSerializer, \
@@ -39,7 +39,13 @@ from payments.models import GameOrder, Transaction, Order, RepairOrder, PaymentM
     DeliveryMan, TelegramOrder, RepairOrderType
 from payments.serializers import DeliveryManSerializer, TransactionSerializer
 from storage.models import SonyAccount, SonyAccountGame, Product, ProductColor, ProductCategory, ProductCompany, Game, \
-    Document, DocCategory, RealAssets, RealAssetsCategory, SonyAccountStatus, SonyAccountBank
+    Document, DocCategory, RealAssets, RealAssetsCategory, SonyAccountStatus, SonyAccountBank, GameAvailability
+from utils.claims import claim_sony_account
+from utils.facets import get_facets
+from utils.models import SmsOutbox, SmsCampaign, SmsCampaignRecipient
+from utils.serializers import SmsOutboxSerializer, SmsCampaignSerializer, SmsCampaignRecipientSerializer
+from utils.sms_campaigns import create_campaign, recipients_of
+from utils.sms_outbox import enqueue_sms
 
 
 # Create your views here.
@@ -385,12 +391,8 @@ class EmployeePanelGetNewSonyAccount(generics.GenericAPIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # مرحله دوم: گرفتن قدیمی‌ترین اکانت بدون کارمند
-        oldest_account = SonyAccount.objects.filter(
-            employee__isnull=True,
-            is_deleted=False,
-            is_owned=False
-        ).order_by('created_at').first()
+        # مرحله دوم: گرفتن قدیمی‌ترین اکانت بدون کارمند (بدون رقابت بین درخواست‌های همزمان)
+        oldest_account = claim_sony_account(employee)
 
         if not oldest_account:
             return Response(
@@ -398,10 +400,6 @@ class EmployeePanelGetNewSonyAccount(generics.GenericAPIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        # اساین به کارمند
-        oldest_account.employee = employee
-        oldest_account.save()
-
         serializer = self.get_serializer(oldest_account)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -417,6 +415,39 @@ class EmployeePanelSonyAccountList(generics.ListAPIView):
     ordering_fields = ['created_at', 'amount']
 
 
+class EmployeePanelSonyAccountFacetSearch(generics.ListAPIView):
+    """
+    جستجوی اکانت‌ها با فیلترهای region, plus, status, employee, available, games=1,2
+    به همراه شمارش هر فیلتر (facets) روی نتایج
+    """
+    serializer_class = EmployeeSonyAccountSerializer
+    permission_classes = [IsEmployee | IsMainManager]
+    authentication_classes = [CustomJWTAuthentication]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = SonyAccountFacetFilter
+    pagination_class = LimitOffsetPagination
+
+    def get_queryset(self):
+        return SonyAccount.objects.filter(is_deleted=False).select_related('employee', 'status') \
+            .prefetch_related('games').order_by('-created_at')
+
+    def list(self, request, *args, **kwargs):
+        filterset = self.filterset_class(request.query_params, queryset=self.get_queryset(), request=request)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        queryset = filterset.qs
+        # کلید کش فست‌ها فقط از فیلترهای معتبر و پرشده ساخته می‌شود
+        facets = get_facets(queryset, {
+            name: value for name, value in filterset.form.cleaned_data.items() if value not in (None, '', [])
+        })
+
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        response = self.get_paginated_response(serializer.data)
+        response.data['facets'] = facets
+        return response
+
+
 class EmployeePanelSonyAccountDetail(generics.RetrieveUpdateDestroyAPIView):
     queryset = SonyAccount.objects.filter(is_deleted=False)
     serializer_class = EmployeeSonyAccountSerializer
@@ -786,6 +817,8 @@ class EmployeeDeposit(generics.GenericAPIView):
 
 class EmployeeSendSmsService(generics.GenericAPIView):
     serializer_class = SendSmsToEmployeeSerializer
+    permission_classes = [IsEmployee | IsMainManager]
+    authentication_classes = [CustomJWTAuthentication]
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
@@ -807,31 +840,14 @@ class EmployeeSendSmsService(generics.GenericAPIView):
             return Response({"detail": "هیچ شماره‌ای برای ارسال یافت نشد."},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        # ساخت بادی برای IPPanel
-        body = {
-            "sending_type": "webservice",
-            "from_number": "+983000505",  # شماره فرستنده
-            "message": message,
-            "params": {
-                "recipients": recipients
-            }
-        }
-        if send_time:
-            body["send_time"] = send_time.strftime("%Y-%m-%d %H:%M:%S")
-
-        # ارسال درخواست به IPPanel
-        headers = {
-            "Authorization": f"{settings.FARAZ_API_KEY}",
-            "Content-Type": "application/json"
-        }
-
-        response = requests.post("https://edge.ippanel.com/v1/api/send",
-                                 json=body, headers=headers)
-
-        if response.status_code == 200:
-            return Response(response.json(), status=status.HTTP_200_OK)
-        return Response({"detail": "خطا در ارسال پیامک", "response": response.text},
-                        status=response.status_code)
+        # ارسال توسط ورکر send_sms_outbox، در دسته‌های IPPANEL_MAX_RECIPIENTS تایی
+        messages = enqueue_sms(recipients, message, send_time=send_time,
+                               created_by=getattr(request.user, 'employee', None))
+        return Response({
+            "detail": "پیامک‌ها در صف ارسال قرار گرفتند.",
+            "recipients": len(recipients),
+            "outbox_ids": [sms.id for sms in messages],
+        }, status=status.HTTP_202_ACCEPTED)
 
 
 class EmployeeResumeList(generics.ListAPIView):
@@ -910,61 +926,114 @@ class CustomerDeposit(generics.GenericAPIView):
 
 
 class CustomerSendSmsService(generics.GenericAPIView):
+    """
+    پیامک به مشتریان انتخاب‌شده؛ به‌صورت کمپین ارسال می‌شود (وضعیت در customer/sms-campaign/<id>/)
+    """
     serializer_class = SendSmsSerializer
+    permission_classes = [IsEmployee | IsMainManager]
+    authentication_classes = [CustomJWTAuthentication]
 
     def post(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         data = serializer.validated_data
 
-        message = data['message']
-        customer_ids = data['customer_ids']
-        send_time = data.get('send_time')
-
-        # گرفتن شماره‌ها از مشتریان
-        recipients = []
-        customers = Customer.objects.filter(id__in=customer_ids).select_related('user')
-        for customer in customers:
-            if customer.user and customer.user.phone:
-                recipients.append(customer.user.phone)
-
-        if not recipients:
+        if not recipients_of(data['customer_ids']).exists():
             return Response({"detail": "هیچ شماره‌ای برای ارسال یافت نشد."},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        # ساخت بادی برای IPPanel
-        body = {
-            "sending_type": "webservice",
-            "from_number": "+983000505",  # شماره فرستنده
-            "message": message,
-            "params": {
-                "recipients": recipients
-            }
-        }
-        if send_time:
-            body["send_time"] = send_time.strftime("%Y-%m-%d %H:%M:%S")
+        campaign = create_campaign(data['message'], customer_ids=data['customer_ids'],
+                                   send_time=data.get('send_time'),
+                                   created_by=getattr(request.user, 'employee', None))
 
-        # ارسال درخواست به IPPanel
-        headers = {
-            "Authorization": f"{settings.FARAZ_API_KEY}",
-            "Content-Type": "application/json"
-        }
+        return Response({
+            "detail": "پیامک‌ها در صف ارسال قرار گرفتند.",
+            "campaign_id": campaign.id,
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class SmsCampaignListCreate(generics.ListCreateAPIView):
+    """
+    کمپین پیامک به مشتریان؛ بدون customer_ids به همه‌ی مشتریان ارسال می‌شود.
+    گیرنده‌ها در ورکر send_sms_outbox تکه‌تکه در صف قرار می‌گیرند.
+    """
+    serializer_class = SmsCampaignSerializer
+    permission_classes = [IsEmployee | IsMainManager]
+    authentication_classes = [CustomJWTAuthentication]
+    queryset = SmsCampaign.objects.order_by('-id')
+
+    def perform_create(self, serializer):
+        data = serializer.validated_data
+        serializer.instance = create_campaign(data['message'], customer_ids=data.get('customer_ids'),
+                                              send_time=data.get('send_time'),
+                                              created_by=getattr(self.request.user, 'employee', None))
+
+
+class SmsCampaignDetail(generics.RetrieveAPIView):
+    serializer_class = SmsCampaignSerializer
+    permission_classes = [IsEmployee | IsMainManager]
+    authentication_classes = [CustomJWTAuthentication]
+    queryset = SmsCampaign.objects.all()
+
+    def get_serializer_context(self):
+        return {**super().get_serializer_context(), 'with_progress': True}
+
+
+class SmsCampaignRecipientList(generics.ListAPIView):
+    """
+    نتیجه‌ی ارسال برای هر گیرنده (فیلتر با status)
+    """
+    serializer_class = SmsCampaignRecipientSerializer
+    permission_classes = [IsEmployee | IsMainManager]
+    authentication_classes = [CustomJWTAuthentication]
+    pagination_class = LimitOffsetPagination
 
-        response = requests.post("https://edge.ippanel.com/v1/api/send",
-                                 json=body, headers=headers)
+    def get_queryset(self):
+        queryset = SmsCampaignRecipient.objects.filter(campaign_id=self.kwargs['pk']).order_by('id')
+        status_filter = self.request.query_params.get('status')
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+        return queryset
+
+
+class SmsOutboxList(generics.ListAPIView):
+    """
+    وضعیت ارسال پیامک‌های گروهی (فیلتر با status)؛ ردیف‌های OTP نمایش داده نمی‌شوند
+    """
+    serializer_class = SmsOutboxSerializer
+    permission_classes = [IsEmployee | IsMainManager]
+    authentication_classes = [CustomJWTAuthentication]
+    pagination_class = LimitOffsetPagination
 
-        if response.status_code == 200:
-            return Response(response.json(), status=status.HTTP_200_OK)
-        return Response({"detail": "خطا در ارسال پیامک", "response": response.text},
-                        status=response.status_code)
+    def get_queryset(self):
+        queryset = SmsOutbox.objects.filter(kind='bulk').order_by('-id')
+        status_filter = self.request.query_params.get('status')
+        if status_filter:
+            queryset = queryset.filter(status=status_filter)
+        return queryset
 
 
 # ==================== GameStore Views ====================
 class EmployeeGameListCreate(generics.ListCreateAPIView):
+    """
+    لیست بازی‌ها به همراه تعداد اکانت‌های در دسترس (available_accounts)
+    فیلترها: region، available_lt، available_gte
+    """
     serializer_class = EmployeeGameSerializer
-    queryset = Game.objects.filter(is_deleted=False)
     permission_classes = [IsEmployee | IsMainManager]
     authentication_classes = [CustomJWTAuthentication]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = GameAvailabilityFilter
+
+    def get_queryset(self):
+        region = self.request.query_params.get('region')
+        availability = GameAvailability.objects.all()
+        if region:
+            availability = availability.filter(region=region)
+        available_filter = Q(availability__region=region) if region else Q()
+        return Game.objects.filter(is_deleted=False).annotate(
+            available_accounts=Coalesce(Sum('availability__available_accounts', filter=available_filter), 0)
+        ).prefetch_related(Prefetch('availability', queryset=availability), 'game_images')
 
 
 class EmployeeGameDetail(generics.RetrieveUpdateDestroyAPIView):
@@ -5,3 +5,5 @@ class HomeConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'home'
 
+    def ready(self):
+        from home import signals  # noqa: F401
@@ -2,7 +2,7 @@ from rest_framework import serializers
 from slugify import slugify
 
 from employees.serializers import EmployeeGameSerializer
-from payments.models import CourseOrder
+from home.services import get_request_course_access
 from storage.serializers import GameSerializer
 from .models import Cart, CartItem, BlogPost, AboutUs, ContactUs, ContactSubmission, Video, \
     Course, HomeBanner, GameCart, GameCartItem
@@ -298,6 +298,17 @@ class CourseListCreateSerializer(serializers.ModelSerializer):
         return course_obj
 
 
+class CourseListSerializer(serializers.ModelSerializer):
+    # نسخه‌ی سبک برای لیست دوره‌ها: به جای لیست ویدیوها فقط تعدادشان
+    videos_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Course
+        fields = ['title', 'slug', 'description', 'course_image',
+                  'price', 'status', 'videos_count', 'updated_at']
+        read_only_fields = fields
+
+
 class CourseRetrieveSerializer(serializers.ModelSerializer):
     videos = serializers.SerializerMethodField()
     has_purchased = serializers.SerializerMethodField()
@@ -308,22 +319,11 @@ class CourseRetrieveSerializer(serializers.ModelSerializer):
                   'status', 'updated_at', 'has_purchased']
 
     def get_has_purchased(self, obj):
-        request = self.context.get('request')
-        user = request.user if request else None
-
-        if user and user.is_staff:
-            return True
-        if user and user.is_authenticated:
-            return CourseOrder.objects.filter(
-                customer=user.customer,
-                payment_status='paid'
-            ).exists()
-        return False
+        return get_request_course_access(self.context.get('request'))
 
     def get_videos(self, obj):
-        has_purchased = self.get_has_purchased(obj)
         context = self.context.copy()
-        context['has_purchased'] = has_purchased
+        context['has_purchased'] = self.get_has_purchased(obj)
 
         return VideoSerializer(
             obj.videos.all(),
@@ -0,0 +1,72 @@
+# home/services.py
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef
+
+from customers.models import Customer
+from payments.models import CourseOrder
+
+COURSE_ACCESS_CACHE_KEY = "course_access:{user_id}"
+COURSE_ACCESS_CACHE_TTL = 60 * 60  # یک ساعت؛ با سیگنال‌ها زودتر باطل می‌شود
+
+
+def _course_access_cache_key(user_id) -> str:
+    return COURSE_ACCESS_CACHE_KEY.format(user_id=user_id)
+
+
+def _resolve_course_access(user) -> bool:
+    """
+    دسترسی مشتری به دوره را با یک کوئری حساب می‌کند:
+    has_access_to_course یا داشتن سفارش دوره‌ی پرداخت‌شده.
+    """
+    paid_orders = CourseOrder.objects.filter(
+        customer=OuterRef('pk'),
+        payment_status='paid',
+        is_deleted=False,
+    )
+    row = (
+        Customer.objects
+        .filter(user_id=user.id)
+        .annotate(has_paid_order=Exists(paid_orders))
+        .values_list('has_access_to_course', 'has_paid_order')
+        .first()
+    )
+    if not row:
+        return False
+    has_access, has_paid_order = row
+    return bool(has_access or has_paid_order)
+
+
+def get_course_access(user) -> bool:
+    """
+    دسترسی کاربر به ویدیوهای دوره.
+    نتیجه برای هر کاربر در Redis کش می‌شود.
+    """
+    if not user or not user.is_authenticated:
+        return False
+    if user.is_staff:
+        return True
+
+    key = _course_access_cache_key(user.id)
+    cached = cache.get(key)
+    if cached is not None:
+        return bool(cached)
+
+    has_access = _resolve_course_access(user)
+    cache.set(key, int(has_access), COURSE_ACCESS_CACHE_TTL)
+    return has_access
+
+
+def get_request_course_access(request) -> bool:
+    """
+    مثل get_course_access ولی در طول یک درخواست فقط یک بار حساب می‌شود.
+    """
+    if request is None:
+        return False
+    if not hasattr(request, '_course_access'):
+        request._course_access = get_course_access(getattr(request, 'user', None))
+    return request._course_access
+
+
+def invalidate_course_access(user_id) -> None:
+    if user_id:
+        cache.delete(_course_access_cache_key(user_id))
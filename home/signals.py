@@ -0,0 +1,22 @@
+# home/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from customers.models import Customer
+from home.services import invalidate_course_access
+from payments.models import CourseOrder
+
+
+@receiver(post_save, sender=Customer)
+def customer_course_access_changed(sender, instance, update_fields=None, **kwargs):
+    # فقط وقتی has_access_to_course ممکن است عوض شده باشد کش را پاک کن
+    if update_fields is not None and 'has_access_to_course' not in update_fields:
+        return
+    invalidate_course_access(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=CourseOrder)
+def course_order_changed(sender, instance, **kwargs):
+    if instance.customer_id:
+        user_id = Customer.objects.filter(pk=instance.customer_id).values_list('user_id', flat=True).first()
+        invalidate_course_access(user_id)
@@ -1,6 +1,6 @@
 from unicodedata import category
 
-from django.db.models import Prefetch
+from django.db.models import Prefetch, Count, Q
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics
 from rest_framework.filters import SearchFilter, OrderingFilter
@@ -19,9 +19,10 @@ from storage.models import Game, Product, ProductCategory
 from storage.serializers import GameSerializer, ProductSerializer, ProductCategorySerializer
 from .serializers import CartSerializer, UpdateBlogPostSerializer, \
     CreateBlogPostSerializer, AboutUsSerializer, ContactUsSerializer, ContactSubmissionSerializer, \
-    BlogPostDetailSerializer, BlogPostListSerializer, CourseRetrieveSerializer, \
+    BlogPostDetailSerializer, BlogPostListSerializer, CourseRetrieveSerializer, CourseListSerializer, \
     CourseListCreateSerializer, CourseUpdateSerializer, VideoSerializer, VideoCreateSerializer, VideoUpdateSerializer, \
     HomeBannerSerializer, CartItemWriteSerializer, GameCartSerializer, GameCartChoicesSerializer
+from .services import get_request_course_access
 from .models import Cart, CartItem, BlogPost, AboutUs, ContactUs, ContactSubmission, Course, \
     Video, HomeBanner, GameCart, GameCartItem
 
@@ -469,8 +470,10 @@ class ContactSubmissionCreateAPIView(generics.CreateAPIView):
 # Video Course
 
 class CourseListAPIView(generics.ListAPIView):
-    serializer_class = CourseListCreateSerializer
-    queryset = Course.objects.filter(status='published').prefetch_related('videos')
+    serializer_class = CourseListSerializer
+    queryset = Course.objects.filter(status='published').annotate(
+        videos_count=Count('videos', filter=Q(videos__status='published'))
+    )
     permission_classes = [AllowAny]
 
 
@@ -519,14 +522,16 @@ class VideoListAPIView(generics.ListAPIView):
             status='published'
         ).select_related('course').order_by('priority')
 
-        user = self.request.user
-        # بررسی اگر کاربر لاگین کرده و Customer هست
-        if hasattr(user, 'customer'):
-            customer = user.customer
-            if not customer.has_access_to_course:
-                return queryset.filter(priority=1)
+        # مشتری بدون دسترسی فقط ویدیوی اول را می‌بیند
+        if hasattr(self.request.user, 'customer') and not get_request_course_access(self.request):
+            return queryset.filter(priority=1)
         return queryset
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['has_purchased'] = get_request_course_access(self.request)
+        return context
+
 
 class VideoRetrieveAPIView(generics.RetrieveAPIView):
     serializer_class = VideoSerializer
@@ -539,13 +544,16 @@ class VideoRetrieveAPIView(generics.RetrieveAPIView):
             status='published'
         ).select_related('course').order_by('priority')
 
-        user = self.request.user
-        if hasattr(user, 'customer'):
-            customer = user.customer
-            if not customer.has_access_to_course:
-                return queryset.filter(priority=1)
+        # مشتری بدون دسترسی فقط ویدیوی اول را می‌بیند
+        if hasattr(self.request.user, 'customer') and not get_request_course_access(self.request):
+            return queryset.filter(priority=1)
         return queryset
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['has_purchased'] = get_request_course_access(self.request)
+        return context
+
 
 class VideoCreateAPIView(generics.CreateAPIView):
     serializer_class = VideoCreateSerializer
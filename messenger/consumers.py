@@ -0,0 +1,82 @@
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from messenger.models import Membership
+from messenger.presence import set_typing, touch_presence
+
+
+def room_group_name(room_id) -> str:
+    return f'messenger.room.{room_id}'
+
+
+class ChatRoomConsumer(AsyncJsonWebsocketConsumer):
+    """
+    اتصال زنده به یک روم: رویدادهای ایجاد/ویرایش/حذف پیام به اعضای روم فرستاده می‌شود.
+    ارسال پیام همچنان از طریق API انجام می‌شود.
+    پیام‌های کلاینت: {"type": "heartbeat"} (یا ping) برای حضور و {"type": "typing", "is_typing": bool}
+    """
+
+    async def connect(self):
+        self.user = self.scope.get('user')
+        self.room_id = int(self.scope['url_route']['kwargs']['pk'])
+        # فقط بعد از تأیید عضویت؛ disconnect با همین تشخیص می‌دهد اتصال پذیرفته شده بود
+        self.group_name = None
+
+        if not self.user or not self.user.is_authenticated:
+            await self.close(code=4401)
+            return
+        if not await self.is_member():
+            await self.close(code=4403)
+            return
+
+        self.group_name = room_group_name(self.room_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        await sync_to_async(touch_presence)(self.user.id)
+        await self.channel_layer.group_send(self.group_name, {
+            'type': 'presence.event', 'user_id': self.user.id, 'online': True,
+        })
+
+    async def disconnect(self, code):
+        if getattr(self, 'group_name', None):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            await self.broadcast_typing(False)
+
+    async def receive_json(self, content, **kwargs):
+        if not self.group_name:
+            return
+        message_type = content.get('type')
+        if message_type in ('ping', 'heartbeat'):
+            await sync_to_async(touch_presence)(self.user.id)
+            await self.send_json({'type': 'pong'})
+        elif message_type == 'typing':
+            await self.broadcast_typing(bool(content.get('is_typing', True)))
+
+    async def broadcast_typing(self, is_typing):
+        await sync_to_async(set_typing)(self.room_id, self.user.id, is_typing)
+        await self.channel_layer.group_send(self.group_name, {
+            'type': 'typing.event', 'user_id': self.user.id, 'is_typing': is_typing,
+        })
+
+    @database_sync_to_async
+    def is_member(self):
+        return Membership.objects.filter(chat_room_id=self.room_id, user_id=self.user.id).exists()
+
+    # ---------- رویدادهای گروه ----------
+    async def message_event(self, event):
+        await self.send_json({'type': event['event'], 'message': event['message']})
+
+    async def presence_event(self, event):
+        if event['user_id'] != self.user.id:
+            await self.send_json({'type': 'presence', 'user_id': event['user_id'], 'online': event['online']})
+
+    async def typing_event(self, event):
+        if event['user_id'] != self.user.id:
+            await self.send_json({'type': 'typing', 'user_id': event['user_id'], 'is_typing': event['is_typing']})
+
+    async def membership_removed(self, event):
+        # کاربر حذف‌شده از روم دیگر نباید پیامی بگیرد
+        if event['user_id'] == self.user.id:
+            await self.send_json({'type': 'membership.removed', 'room': self.room_id})
+            await self.close(code=4403)
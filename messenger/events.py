@@ -0,0 +1,40 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from messenger.consumers import room_group_name
+
+logger = logging.getLogger(__name__)
+
+
+def _group_send(room_id, payload):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(room_group_name(room_id), payload)
+    except Exception:
+        # قطع بودن Redis نباید ذخیره‌ی پیام را خراب کند
+        logger.exception("Failed to publish messenger event for room %s", room_id)
+
+
+def publish_message_event(message, event):
+    """
+    event: message.created / message.edited / message.deleted
+    بعد از commit فرستاده می‌شود تا کلاینت پیامی که هنوز ذخیره نشده را نبیند.
+    """
+    from messenger.serializers import MessageSerializer
+
+    payload = {
+        'type': 'message.event',
+        'event': event,
+        'message': MessageSerializer(message).data,
+    }
+    transaction.on_commit(lambda: _group_send(message.room_id, payload))
+
+
+def publish_membership_removed(room_id, user_id):
+    payload = {'type': 'membership.removed', 'user_id': user_id}
+    transaction.on_commit(lambda: _group_send(room_id, payload))
@@ -0,0 +1,89 @@
+from django.db.models import OuterRef, Q, Subquery
+
+from messenger.models import Membership, Message
+
+HISTORY_DEFAULT_LIMIT = 30
+HISTORY_MAX_LIMIT = 100
+
+_SENDER_PROFILES = ('sender__main_manager', 'sender__employee')
+
+
+class HistoryAnchorNotFound(Exception):
+    pass
+
+
+def _room_messages(room_id):
+    return Message.objects.filter(room_id=room_id).select_related(*_SENDER_PROFILES)
+
+
+def older_than(anchor_created_at, anchor_id) -> Q:
+    # کلید (created_at, id) تا پیام‌های هم‌زمان جا نیفتند یا تکرار نشوند
+    return Q(created_at__lt=anchor_created_at) | Q(created_at=anchor_created_at, id__lt=anchor_id)
+
+
+def newer_than(anchor_created_at, anchor_id) -> Q:
+    return Q(created_at__gt=anchor_created_at) | Q(created_at=anchor_created_at, id__gt=anchor_id)
+
+
+def _page(queryset, limit):
+    rows = list(queryset[:limit + 1])
+    return rows[:limit], len(rows) > limit
+
+
+def get_membership_with_anchor(room_id, user_id, anchor_id=None):
+    """
+    عضویت کاربر و created_at پیام لنگر با یک کوئری؛ None یعنی کاربر عضو نیست.
+    """
+    memberships = Membership.objects.filter(chat_room_id=room_id, user_id=user_id)
+    if anchor_id is not None:
+        memberships = memberships.annotate(
+            anchor_created_at=Subquery(
+                Message.objects.filter(room_id=OuterRef('chat_room_id'), id=anchor_id).values('created_at')[:1]
+            )
+        )
+    return memberships.first()
+
+
+def fetch_history(room_id, anchor_created_at=None, before=None, after=None, around=None,
+                  limit=HISTORY_DEFAULT_LIMIT) -> dict:
+    """
+    صفحه‌ای از تاریخچه‌ی پیام‌ها بر اساس لنگر (id پیام) به‌جای offset.
+    پیام‌ها از جدید به قدیم برگردانده می‌شوند.
+    - before: پیام‌های قدیمی‌تر از لنگر
+    - after: پیام‌های جدیدتر از لنگر
+    - around: خود پیام و نیمی از limit در هر طرف آن (برای پرش به پیام ریپلای‌شده)
+    - بدون لنگر: جدیدترین پیام‌ها
+    """
+    anchor_id = before or after or around
+    if anchor_id is not None and anchor_created_at is None:
+        raise HistoryAnchorNotFound(anchor_id)
+
+    messages = _room_messages(room_id)
+    newest_first = messages.order_by('-created_at', '-id')
+    oldest_first = messages.order_by('created_at', 'id')
+
+    if before is not None:
+        results, has_older = _page(newest_first.filter(older_than(anchor_created_at, before)), limit)
+        has_newer = True
+    elif after is not None:
+        newer, has_newer = _page(oldest_first.filter(newer_than(anchor_created_at, after)), limit)
+        results, has_older = newer[::-1], True
+    elif around is not None:
+        half = limit // 2
+        newer, has_newer = _page(
+            oldest_first.filter(Q(id=around) | newer_than(anchor_created_at, around)), limit - half
+        )
+        older, has_older = _page(newest_first.filter(older_than(anchor_created_at, around)), half)
+        results = newer[::-1] + older
+    else:
+        results, has_older = _page(newest_first, limit)
+        has_newer = False
+
+    return {
+        "results": results,
+        "has_older": has_older,
+        "has_newer": has_newer,
+        # برای درخواست صفحه‌ی بعد: ?before=oldest_id یا ?after=newest_id
+        "oldest_id": results[-1].id if results else None,
+        "newest_id": results[0].id if results else None,
+    }
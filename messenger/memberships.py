@@ -0,0 +1,44 @@
+from django.db import transaction
+
+from employees.models import Employee
+from messenger.models import Membership
+from messenger.unread import invalidate_unread
+
+MEMBERSHIP_BATCH_SIZE = 1000
+
+
+def employee_user_ids(employee_ids) -> dict:
+    """
+    نگاشت employee_id به user_id با یک کوئری؛ idهای نامعتبر در خروجی نیستند.
+    """
+    return dict(Employee.objects.filter(id__in=employee_ids).values_list('id', 'user_id'))
+
+
+def sync_memberships(chat_room, user_ids, is_muted=False) -> tuple:
+    """
+    اعضای روم (به جز owner) را با user_ids یکی می‌کند؛ فقط تفاوت‌ها نوشته می‌شوند:
+    یک bulk_create برای اعضای جدید و یک delete فیلترشده برای اعضای حذف‌شده.
+    خروجی: (added_user_ids, removed_user_ids)
+    """
+    desired = set(user_ids) - {chat_room.owner_id}
+    current = set(
+        Membership.objects.filter(chat_room=chat_room)
+        .exclude(user_id=chat_room.owner_id)
+        .values_list('user_id', flat=True)
+    )
+    added = desired - current
+    removed = current - desired
+
+    if removed:
+        # سیگنال post_delete برای هر عضو رویداد membership.removed را می‌فرستد
+        Membership.objects.filter(chat_room=chat_room, user_id__in=removed).delete()
+    if added:
+        Membership.objects.bulk_create(
+            [Membership(user_id=user_id, chat_room=chat_room, is_muted=is_muted) for user_id in added],
+            batch_size=MEMBERSHIP_BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        # bulk_create سیگنال post_save ندارد؛ شمارنده‌های خوانده‌نشده یک‌جا باطل می‌شوند
+        added_ids = list(added)
+        transaction.on_commit(lambda: invalidate_unread(added_ids))
+    return added, removed
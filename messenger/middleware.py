@@ -0,0 +1,43 @@
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from channels.sessions import CookieMiddleware
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed, TokenError
+
+from accounts.auth import CustomJWTAuthentication
+
+
+@database_sync_to_async
+def get_user_from_token(raw_token):
+    """
+    مثل CustomJWTAuthentication: توکن را اعتبارسنجی و کاربر را برمی‌گرداند.
+    """
+    authentication = CustomJWTAuthentication()
+    try:
+        validated_token = authentication.get_validated_token(raw_token)
+        return authentication.get_user(validated_token)
+    except (InvalidToken, AuthenticationFailed, TokenError):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    احراز هویت WebSocket با همان کوکی access_token (یا هدر Authorization: Bearer).
+    """
+
+    async def __call__(self, scope, receive, send):
+        scope = dict(scope)
+        raw_token = scope.get('cookies', {}).get(settings.SIMPLE_JWT['AUTH_COOKIE'])
+        if not raw_token:
+            headers = dict(scope.get('headers', []))
+            auth_header = headers.get(b'authorization', b'').decode()
+            if auth_header.startswith('Bearer '):
+                raw_token = auth_header[len('Bearer '):]
+
+        scope['user'] = await get_user_from_token(raw_token) if raw_token else AnonymousUser()
+        return await super().__call__(scope, receive, send)
+
+
+def JWTAuthMiddlewareStack(inner):
+    return CookieMiddleware(JWTAuthMiddleware(inner))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-19 17:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messenger', '0005_chatroom_last_activity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='membership',
+            name='last_read_message',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='messenger.message'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 5.2.3 on 2026-10-19 17:44
+
+import re
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import Value
+
+# کپی messenger.search در زمان این migration؛ تغییرات بعدی آن ماژول نباید اینجا اثر بگذارد
+SEARCH_CONFIG = 'simple'
+BACKFILL_CHUNK_SIZE = 2000
+
+_PERSIAN_TRANSLATION = str.maketrans({
+    'ي': 'ی',
+    'ى': 'ی',
+    'ك': 'ک',
+    'ة': 'ه',
+    'ۀ': 'ه',
+    '\u200c': ' ',
+    **{digit: str(i) for i, digit in enumerate('۰۱۲۳۴۵۶۷۸۹')},
+    **{digit: str(i) for i, digit in enumerate('٠١٢٣٤٥٦٧٨٩')},
+})
+_DIACRITICS = re.compile('[\u064b-\u065f\u0670\u0640]')
+
+
+def normalize_text(text):
+    if not text:
+        return ''
+    return _DIACRITICS.sub('', text.translate(_PERSIAN_TRANSLATION))
+
+
+def backfill_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Message = apps.get_model('messenger', 'Message')
+    rows = Message.objects.filter(is_deleted=False).exclude(text__isnull=True) \
+        .values_list('pk', 'text').iterator(chunk_size=BACKFILL_CHUNK_SIZE)
+    batch = []
+    for pk, text in rows:
+        normalized = normalize_text(text)
+        if not normalized:
+            continue
+        batch.append(Message(pk=pk, search_vector=SearchVector(Value(normalized), config=SEARCH_CONFIG)))
+        if len(batch) >= BACKFILL_CHUNK_SIZE:
+            # یک UPDATE برای هر دسته به جای یک UPDATE برای هر پیام
+            Message.objects.bulk_update(batch, ['search_vector'])
+            batch = []
+    if batch:
+        Message.objects.bulk_update(batch, ['search_vector'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messenger', '0006_membership_last_read_message'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='message',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_search_vector, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='message',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='message_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('text'), name='gin_trgm_ops'), name='message_text_trgm_idx'),
+        ),
+    ]
@@ -1,4 +1,8 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.db.models.functions import Upper
+from django.utils import timezone
 
 from DrGame import settings
 from accounts.models import CustomUser
@@ -31,6 +35,15 @@ class ChatRoom(models.Model):
         related_name='owned_rooms',  # همه‌ی روم‌هایی که کاربر مالک‌شان است
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    # آخرین پیام و زمان آخرین فعالیت؛ موقع ارسال پیام به‌روز می‌شوند (messenger/signals.py)
+    last_message = models.ForeignKey(
+        'Message',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    last_activity_at = models.DateTimeField(null=True, blank=True)
 
     # شرکت‌کنندگان: به‌صورت M2M از طریق Membership
     users = models.ManyToManyField(
@@ -43,9 +56,16 @@ class ChatRoom(models.Model):
         indexes = [
             models.Index(fields=['type']),
             models.Index(fields=['created_at']),
+            models.Index(fields=['-last_activity_at', '-id'], name='chatroom_activity_idx'),
         ]
         ordering = ['-created_at']  # روم‌های تازه‌تر بالاتر
 
+    def save(self, *args, **kwargs):
+        # روم تازه بدون پیام هم باید در ترتیب فعالیت جا داشته باشد
+        if self.last_activity_at is None:
+            self.last_activity_at = timezone.now()
+        super().save(*args, **kwargs)
+
     def __str__(self):
         # نمایش خوانا در ادمین
         base = self.name or f'Room-{self.pk}'
@@ -80,6 +100,14 @@ class Membership(models.Model):
     is_admin = models.BooleanField(default=False)   # مدیر روم؟
     is_muted = models.BooleanField(default=False)   # ساکت (برای channel معمولاً True)
     joined_at = models.DateTimeField(auto_now_add=True)
+    # آخرین پیامی که کاربر در این روم خوانده؛ پیام‌های با id بزرگ‌تر خوانده‌نشده‌اند
+    last_read_message = models.ForeignKey(
+        'Message',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
 
     class Meta:
         unique_together = ('user', 'chat_room')  # هر کاربر در هر روم فقط یک بار
@@ -118,11 +146,16 @@ class Message(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     is_edited = models.BooleanField(default=False)
     is_deleted = models.BooleanField(default=False)
+    # بردار جست‌وجو از متن نرمال‌شده (messenger/search.py)؛ با هر ذخیره‌ی پیام به‌روز می‌شود
+    search_vector = SearchVectorField(null=True, blank=True, editable=False)
 
     class Meta:
         ordering = ['-created_at']  # پیام‌های تازه‌تر اول
         indexes = [
             models.Index(fields=['room', 'created_at']),
+            GinIndex(fields=['search_vector'], name='message_search_vector_idx'),
+            # جست‌وجوی زیررشته (کد سفارش، بخشی از ایمیل اکانت)؛ icontains روی UPPER(text) از این ایندکس استفاده می‌کند
+            GinIndex(OpClass(Upper('text'), name='gin_trgm_ops'), name='message_text_trgm_idx'),
         ]
 
     def __str__(self):
@@ -0,0 +1,98 @@
+import logging
+import time
+
+from redis.exceptions import RedisError
+
+from messenger.models import Membership
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+PRESENCE_KEY = "messenger:presence:{user_id}"
+TYPING_KEY = "messenger:typing:{room_id}"
+# کلاینت هر ۲۰ ثانیه heartbeat می‌فرستد؛ بعد از ۶۰ ثانیه بی‌خبری کاربر آفلاین است
+PRESENCE_TTL = 60
+# وضعیت «در حال نوشتن» اگر تمدید نشود بعد از چند ثانیه خودش پاک می‌شود
+TYPING_TTL = 6
+
+
+def _presence_key(user_id) -> str:
+    return PRESENCE_KEY.format(user_id=user_id)
+
+
+def _typing_key(room_id) -> str:
+    return TYPING_KEY.format(room_id=room_id)
+
+
+def touch_presence(user_id) -> None:
+    """
+    heartbeat: کلید حضور کاربر با زمان آخرین فعالیت و انقضای PRESENCE_TTL
+    """
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        redis.set(_presence_key(user_id), int(time.time()), ex=PRESENCE_TTL)
+    except RedisError:
+        logger.exception("Failed to update presence for user %s", user_id)
+
+
+def set_typing(room_id, user_id, is_typing=True) -> None:
+    """
+    تایپ کردن در یک sorted set به ازای هر روم نگه داشته می‌شود؛ امتیاز هر عضو زمان انقضای آن است.
+    """
+    redis = get_redis()
+    if redis is None:
+        return
+    key = _typing_key(room_id)
+    try:
+        pipe = redis.pipeline()
+        if is_typing:
+            pipe.zadd(key, {str(user_id): time.time() + TYPING_TTL})
+            pipe.expire(key, TYPING_TTL)
+        else:
+            pipe.zrem(key, str(user_id))
+        pipe.execute()
+    except RedisError:
+        logger.exception("Failed to update typing state in room %s", room_id)
+
+
+def get_room_presence(room_id, user_ids=None, touch_user_id=None) -> dict:
+    """
+    حضور همه‌ی اعضای روم و کسانی که در حال نوشتن‌اند، با یک رفت‌وبرگشت به Redis (pipeline).
+    touch_user_id: heartbeat کاربر درخواست‌دهنده هم در همان pipeline ثبت می‌شود.
+    """
+    if user_ids is None:
+        user_ids = list(Membership.objects.filter(chat_room_id=room_id).values_list('user_id', flat=True))
+    members = {user_id: {"user_id": user_id, "online": False, "last_seen": None} for user_id in user_ids}
+    result = {"members": list(members.values()), "typing": []}
+
+    redis = get_redis()
+    if redis is None or not user_ids:
+        return result
+
+    now = time.time()
+    typing_key = _typing_key(room_id)
+    try:
+        pipe = redis.pipeline(transaction=False)
+        if touch_user_id is not None:
+            pipe.set(_presence_key(touch_user_id), int(now), ex=PRESENCE_TTL)
+        pipe.mget([_presence_key(user_id) for user_id in user_ids])
+        # ورودی‌های منقضی‌شده‌ی تایپ حذف و بقیه خوانده می‌شوند
+        pipe.zremrangebyscore(typing_key, '-inf', now)
+        pipe.zrange(typing_key, 0, -1)
+        replies = pipe.execute()
+    except RedisError:
+        logger.exception("Presence unavailable for room %s", room_id)
+        return result
+
+    last_seen_values, typing = replies[-3], replies[-1]
+    for user_id, last_seen in zip(user_ids, last_seen_values):
+        if last_seen is not None:
+            members[user_id]["online"] = True
+            members[user_id]["last_seen"] = int(last_seen)
+    if touch_user_id in members:
+        members[touch_user_id]["online"] = True
+        members[touch_user_id]["last_seen"] = int(now)
+    result["typing"] = [int(user_id) for user_id in typing if int(user_id) in members]
+    return result
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from messenger.consumers import ChatRoomConsumer
+
+websocket_urlpatterns = [
+    path('ws/messenger/chats/<int:pk>/', ChatRoomConsumer.as_asgi()),
+]
@@ -0,0 +1,123 @@
+import base64
+import html
+import re
+
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchVector
+from django.db import connection
+from django.db.models import Q, Value
+from django.utils.dateparse import parse_datetime
+
+from messenger.history import older_than
+from messenger.models import Membership, Message
+
+# پیکربندی simple: Postgres ریشه‌یاب فارسی ندارد، پس فقط نرمال‌سازی حروف انجام می‌شود
+SEARCH_CONFIG = 'simple'
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 50
+
+# متن پیام escape می‌شود و فقط تگ‌های هایلایت به حالت HTML برمی‌گردند
+_HIGHLIGHT_START = '<mark>'
+_HIGHLIGHT_STOP = '</mark>'
+
+_PERSIAN_TRANSLATION = str.maketrans({
+    'ي': 'ی',
+    'ى': 'ی',
+    'ك': 'ک',
+    'ة': 'ه',
+    'ۀ': 'ه',
+    '\u200c': ' ',  # نیم‌فاصله
+    **{digit: str(i) for i, digit in enumerate('۰۱۲۳۴۵۶۷۸۹')},
+    **{digit: str(i) for i, digit in enumerate('٠١٢٣٤٥٦٧٨٩')},
+})
+# اعراب و کشیده
+_DIACRITICS = re.compile('[\u064b-\u065f\u0670\u0640]')
+
+
+class InvalidSearchCursor(Exception):
+    pass
+
+
+def normalize_text(text) -> str:
+    """
+    یکسان‌سازی ی/ک عربی و فارسی، ارقام، نیم‌فاصله و حذف اعراب تا متن و عبارت جست‌وجو هم‌شکل شوند.
+    """
+    if not text:
+        return ''
+    return _DIACRITICS.sub('', text.translate(_PERSIAN_TRANSLATION))
+
+
+def refresh_search_vector(message) -> None:
+    """
+    بردار جست‌وجوی پیام از متن نرمال‌شده ساخته می‌شود؛ پیام حذف‌شده بردار ندارد.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    text = '' if message.is_deleted else normalize_text(message.text)
+    vector = SearchVector(Value(text), config=SEARCH_CONFIG) if text else None
+    Message.objects.filter(pk=message.pk).update(search_vector=vector)
+
+
+def encode_cursor(message) -> str:
+    raw = f'{message.created_at.isoformat()}|{message.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        created_at = parse_datetime(created_at)
+        pk = int(pk)
+    except (ValueError, UnicodeDecodeError):
+        raise InvalidSearchCursor(cursor)
+    if created_at is None:
+        raise InvalidSearchCursor(cursor)
+    return created_at, pk
+
+
+def render_snippet(headline) -> str:
+    return html.escape(headline or '') \
+        .replace(html.escape(_HIGHLIGHT_START), _HIGHLIGHT_START) \
+        .replace(html.escape(_HIGHLIGHT_STOP), _HIGHLIGHT_STOP)
+
+
+def search_messages(user_id, term, room_id=None, cursor=None, limit=SEARCH_DEFAULT_LIMIT) -> dict:
+    """
+    جست‌وجو در پیام‌های روم‌هایی که کاربر عضو آن‌هاست.
+    تطبیق کلمه با search_vector و تطبیق زیررشته با ایندکس trigram؛ نتایج از جدید به قدیم
+    و صفحه‌بندی با cursor روی (created_at, id).
+    """
+    normalized = normalize_text(term).strip()
+    query = SearchQuery(normalized, config=SEARCH_CONFIG, search_type='websearch')
+
+    substring_match = Q()
+    for variant in {term.strip(), normalized}:
+        substring_match |= Q(text__icontains=variant)
+
+    rooms = Membership.objects.filter(user_id=user_id).values('chat_room_id')
+    messages = Message.objects.filter(room_id__in=rooms, is_deleted=False)
+    if room_id is not None:
+        messages = messages.filter(room_id=room_id)
+    if cursor:
+        messages = messages.filter(older_than(*decode_cursor(cursor)))
+
+    messages = (
+        messages
+        .filter(Q(search_vector=query) | substring_match)
+        .select_related('room', 'sender__main_manager', 'sender__employee')
+        .annotate(headline=SearchHeadline(
+            'text', query,
+            config=SEARCH_CONFIG,
+            start_sel=_HIGHLIGHT_START,
+            stop_sel=_HIGHLIGHT_STOP,
+            max_words=25,
+            min_words=10,
+            max_fragments=2,
+        ))
+        .order_by('-created_at', '-id')
+    )
+    rows = list(messages[:limit + 1])
+    results = rows[:limit]
+    return {
+        "results": results,
+        "next_cursor": encode_cursor(results[-1]) if len(rows) > limit else None,
+    }
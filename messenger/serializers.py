@@ -3,7 +3,9 @@ from logging import lastResort
 from django.db import transaction
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
-from employees.models import Employee
+from .memberships import employee_user_ids, sync_memberships
+from .history import HISTORY_DEFAULT_LIMIT, HISTORY_MAX_LIMIT
+from .search import SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT, render_snippet
 from .models import ChatRoom, Membership, Message
 from django.contrib.auth import get_user_model
 
@@ -81,21 +83,22 @@ class ChatRoomSerializer(serializers.ModelSerializer):
     owner_full_name = serializers.SerializerMethodField()
     display_name = serializers.SerializerMethodField()
     last_message = serializers.SerializerMethodField()
+    unread_count = serializers.SerializerMethodField()
 
     class Meta:
         model = ChatRoom
         fields = [
             'id', 'name', 'display_name', 'type', 'owner',
-            'owner_full_name', 'created_at', 'members', 'last_message'
+            'owner_full_name', 'created_at', 'last_activity_at', 'members', 'last_message', 'unread_count'
         ]
-        read_only_fields = ['owner', 'created_at']
+        read_only_fields = ['owner', 'created_at', 'last_activity_at']
 
     def get_owner_full_name(self, obj: ChatRoom):
         return user_display_name(obj.owner)
 
     def get_last_message(self, obj: ChatRoom):
-        # به‌دلیل ordering=['-created_at']، آخرین پیام در QuerySet => first()
-        msg = obj.messages.first()
+        # last_message روی خود روم نگه داشته می‌شود (select_related در ChatRoomListView)
+        msg = obj.last_message
         if not msg:
             return None
         return LastMessageSerializer({
@@ -105,6 +108,10 @@ class ChatRoomSerializer(serializers.ModelSerializer):
             "created_at": msg.created_at,
         }).data
 
+    def get_unread_count(self, obj: ChatRoom):
+        # ChatRoomListView شمارنده‌های همه‌ی روم‌ها را یک‌جا در context می‌گذارد
+        return self.context.get('unread_counts', {}).get(obj.id, 0)
+
     def get_display_name(self, obj: ChatRoom):
         """
         برای pv نام «طرف مقابل» را نشان بده؛
@@ -119,10 +126,10 @@ class ChatRoomSerializer(serializers.ModelSerializer):
             return obj.name
 
         current_user = request.user
-        # همه‌ی اعضا به جز خود کاربر
-        other_members = obj.users.exclude(id=current_user.id)
-        if other_members.exists():
-            return user_display_name(other_members.first())
+        # همه‌ی اعضا به جز خود کاربر (از memberships پیش‌بارگذاری‌شده)
+        for membership in obj.memberships.all():
+            if membership.user_id != current_user.id:
+                return user_display_name(membership.user)
         # اگر تنها عضو مالک است:
         return user_display_name(current_user)
 
@@ -162,11 +169,22 @@ class ChatRoomCreateSerializer(serializers.ModelSerializer):
         if chat_type == ChatRoom.PV and len(attrs['member_ids']) != 1:
             raise serializers.ValidationError("Private chat (pv) must have exactly one Employee.")
 
+        # نگاشت Employee به کاربر با یک کوئری، قبل از هر نوشتنی
+        user_ids = employee_user_ids(attrs['member_ids'])
+        if len(user_ids) != len(attrs['member_ids']):
+            raise serializers.ValidationError("One or more Employee IDs are invalid.")
+
+        # قانون 3: حداقل یک عضو غیر از owner
+        if not set(user_ids.values()) - {owner.id}:
+            raise serializers.ValidationError("Chat room must have at least one member besides the owner.")
+        attrs['member_user_ids'] = list(user_ids.values())
+
         return attrs
 
     @transaction.atomic
     def create(self, validated_data):
-        member_ids = validated_data.pop('member_ids', [])
+        validated_data.pop('member_ids', None)
+        member_user_ids = validated_data.pop('member_user_ids')
         request = self.context['request']
         owner = request.user
 
@@ -174,27 +192,8 @@ class ChatRoomCreateSerializer(serializers.ModelSerializer):
         # مالک همیشه عضو و ادمین است
         Membership.objects.create(user=owner, chat_room=chat_room, is_admin=True, is_muted=False)
 
-        # کارمندان مورد نظر را (با select_related برای کارایی) بیاور
-        employees = Employee.objects.filter(id__in=member_ids).select_related('user')
-
-        # اگر تعداد واقعی پیدا شده کمتر از درخواست بود، ID نامعتبر داریم
-        if employees.count() != len(member_ids):
-            raise serializers.ValidationError("One or more Employee IDs are invalid.")
-
-        is_channel = chat_room.is_channel
-
-        for emp in employees:
-            # در channel اعضا به‌صورت پیش‌فرض mute می‌شوند
-            Membership.objects.create(
-                user=emp.user,
-                chat_room=chat_room,
-                is_muted=is_channel
-            )
-
-        # قانون 3: حداقل یک عضو غیر از owner
-        non_owner_count = chat_room.users.exclude(id=owner.id).count()
-        if non_owner_count == 0:
-            raise serializers.ValidationError("Chat room must have at least one member besides the owner.")
+        # همه‌ی اعضا با یک bulk_create؛ در channel اعضا به‌صورت پیش‌فرض mute می‌شوند
+        sync_memberships(chat_room, member_user_ids, is_muted=chat_room.is_channel)
 
         return chat_room
 
@@ -228,26 +227,17 @@ class ChatRoomUpdateSerializer(serializers.ModelSerializer):
         if member_ids is not None:
             # یکتا
             member_ids = list(dict.fromkeys(member_ids))
-            # حذف همه‌ی اعضا به جز owner
-            Membership.objects.filter(chat_room=instance).exclude(user=instance.owner).delete()
-
-            employees = Employee.objects.filter(id__in=member_ids).select_related('user')
-            if employees.count() != len(member_ids):
+            user_ids = employee_user_ids(member_ids)
+            if len(user_ids) != len(member_ids):
                 raise serializers.ValidationError("One or more Employee IDs are invalid.")
 
-            is_channel = instance.is_channel
-            for emp in employees:
-                Membership.objects.create(
-                    user=emp.user,
-                    chat_room=instance,
-                    is_muted=is_channel
-                )
-
             # چک حداقل یک عضو غیر owner
-            member_count = instance.users.exclude(id=instance.owner_id).count()
-            if member_count == 0:
+            if not set(user_ids.values()) - {instance.owner_id}:
                 raise serializers.ValidationError("Chat room must have at least one member besides the owner.")
 
+            # فقط تفاوت با اعضای فعلی نوشته می‌شود؛ عضویت‌های باقی‌مانده (و اشاره‌گر خواندن‌شان) دست نمی‌خورند
+            sync_memberships(instance, user_ids.values(), is_muted=instance.is_channel)
+
         instance.save()
         return instance
 
@@ -262,9 +252,10 @@ class MessageSerializer(serializers.ModelSerializer):
         model = Message
         fields = [
             'id', 'room', 'sender', 'sender_name', 'sender_profile', 'text',
-            'reply_to_id', 'created_at', 'is_edited', 'is_deleted'
+            'reply_to', 'reply_to_id', 'created_at', 'is_edited', 'is_deleted'
         ]
-        read_only_fields = ['sender', 'created_at', 'is_edited', 'is_deleted']
+        # reply_to فقط برای نمایش (پرش به پیام با ?around=)؛ ورودی همان reply_to_id است
+        read_only_fields = ['sender', 'reply_to', 'created_at', 'is_edited', 'is_deleted']
 
     def get_sender_profile(self, obj: Message):
         return employee_profile_url(obj.sender)
@@ -326,3 +317,50 @@ class MessageEditSerializer(serializers.ModelSerializer):
         instance.is_edited = True
         instance.save()
         return instance
+
+
+class MarkReadSerializer(serializers.Serializer):
+    # اگر خالی باشد تا آخرین پیام روم خوانده می‌شود
+    message_id = serializers.IntegerField(required=False, allow_null=True)
+
+
+class MessageHistoryQuerySerializer(serializers.Serializer):
+    # لنگرها id پیام هستند؛ حداکثر یکی از آن‌ها مجاز است
+    before = serializers.IntegerField(required=False, min_value=1)
+    after = serializers.IntegerField(required=False, min_value=1)
+    around = serializers.IntegerField(required=False, min_value=1)
+    limit = serializers.IntegerField(
+        required=False, min_value=1, max_value=HISTORY_MAX_LIMIT, default=HISTORY_DEFAULT_LIMIT
+    )
+
+    def validate(self, attrs):
+        anchors = [name for name in ('before', 'after', 'around') if attrs.get(name) is not None]
+        if len(anchors) > 1:
+            raise serializers.ValidationError("Only one of before, after or around can be used.")
+        return attrs
+
+
+class MessageSearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(min_length=2, max_length=200, trim_whitespace=True)
+    room = serializers.IntegerField(required=False, min_value=1)
+    cursor = serializers.CharField(required=False, allow_blank=True)
+    limit = serializers.IntegerField(
+        required=False, min_value=1, max_value=SEARCH_MAX_LIMIT, default=SEARCH_DEFAULT_LIMIT
+    )
+
+
+class MessageSearchResultSerializer(serializers.ModelSerializer):
+    room_name = serializers.CharField(source='room.name', read_only=True)
+    sender_name = serializers.SerializerMethodField()
+    snippet = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Message
+        fields = ['id', 'room', 'room_name', 'sender', 'sender_name', 'snippet', 'created_at']
+
+    def get_sender_name(self, obj: Message):
+        return user_display_name(obj.sender)
+
+    def get_snippet(self, obj: Message):
+        # متن escape شده و کلمات پیدا شده داخل <mark> هستند
+        return render_snippet(getattr(obj, 'headline', None) or obj.text)
@@ -0,0 +1,40 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from messenger.events import publish_message_event, publish_membership_removed
+from messenger.models import ChatRoom, Message, Membership
+from messenger.search import refresh_search_vector
+from messenger.unread import increment_unread, invalidate_unread
+
+
+@receiver(post_save, sender=Message)
+def message_saved(sender, instance, created=False, **kwargs):
+    if created:
+        event = 'message.created'
+        ChatRoom.objects.filter(pk=instance.room_id).update(
+            last_message=instance,
+            last_activity_at=instance.created_at,
+        )
+        transaction.on_commit(lambda: increment_unread(instance.room_id, instance.sender_id))
+    elif instance.is_deleted:
+        event = 'message.deleted'
+        # پیام حذف‌شده دیگر خوانده‌نشده حساب نمی‌شود؛ شمارنده‌ها از نو ساخته می‌شوند
+        member_ids = list(Membership.objects.filter(chat_room_id=instance.room_id).values_list('user_id', flat=True))
+        transaction.on_commit(lambda: invalidate_unread(member_ids))
+    else:
+        event = 'message.edited'
+    refresh_search_vector(instance)
+    publish_message_event(instance, event)
+
+
+@receiver(post_save, sender=Membership)
+def membership_saved(sender, instance, created=False, **kwargs):
+    if created:
+        transaction.on_commit(lambda: invalidate_unread([instance.user_id]))
+
+
+@receiver(post_delete, sender=Membership)
+def membership_deleted(sender, instance, **kwargs):
+    publish_membership_removed(instance.chat_room_id, instance.user_id)
+    transaction.on_commit(lambda: invalidate_unread([instance.user_id]))
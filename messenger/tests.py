@@ -1,3 +1,74 @@
-from django.test import TestCase
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.test import TransactionTestCase, override_settings
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from accounts.models import CustomUser
+from messenger.middleware import JWTAuthMiddlewareStack
+from messenger.models import ChatRoom, Membership, Message
+from messenger.routing import websocket_urlpatterns
+
+
+@override_settings(
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class ChatRoomConsumerTests(TransactionTestCase):
+    """
+    consumer با همان میدل‌ور JWT و channel layer داخل حافظه؛
+    TransactionTestCase چون consumer در thread دیگری به دیتابیس وصل می‌شود.
+    """
+
+    def setUp(self):
+        self.application = JWTAuthMiddlewareStack(URLRouter(websocket_urlpatterns))
+        self.member = CustomUser.objects.create(phone='09120000001')
+        self.outsider = CustomUser.objects.create(phone='09120000002')
+        self.room = ChatRoom.objects.create(name='room', type='group', owner=self.member)
+        Membership.objects.create(user=self.member, chat_room=self.room)
+
+    def communicator(self, user=None):
+        headers = []
+        if user is not None:
+            headers.append((b'cookie', f'access_token={AccessToken.for_user(user)}'.encode()))
+        return WebsocketCommunicator(self.application, f'/ws/messenger/chats/{self.room.id}/', headers=headers)
+
+    async def test_anonymous_is_rejected(self):
+        connected, code = await self.communicator().connect()
+        self.assertFalse(connected)
+        self.assertEqual(code, 4401)
+
+    async def test_non_member_is_rejected(self):
+        connected, code = await self.communicator(self.outsider).connect()
+        self.assertFalse(connected)
+        self.assertEqual(code, 4403)
+
+    async def test_member_receives_created_message(self):
+        communicator = self.communicator(self.member)
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+
+        message = await database_sync_to_async(Message.objects.create)(
+            room=self.room, sender=self.member, text='hello',
+        )
+        event = await communicator.receive_json_from()
+        self.assertEqual(event['type'], 'message.created')
+        self.assertEqual(event['message']['id'], message.id)
+        self.assertEqual(event['message']['text'], 'hello')
+        await communicator.disconnect()
+
+    async def test_heartbeat_gets_pong(self):
+        communicator = self.communicator(self.member)
+        await communicator.connect()
+        await communicator.send_json_to({'type': 'heartbeat'})
+        self.assertEqual(await communicator.receive_json_from(), {'type': 'pong'})
+        await communicator.disconnect()
+
+    async def test_removed_member_is_disconnected(self):
+        communicator = self.communicator(self.member)
+        await communicator.connect()
+
+        await database_sync_to_async(Membership.objects.filter(user=self.member).delete)()
+        self.assertEqual(await communicator.receive_json_from(),
+                         {'type': 'membership.removed', 'room': self.room.id})
+        self.assertEqual((await communicator.receive_output())['code'], 4403)
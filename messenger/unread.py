@@ -0,0 +1,132 @@
+import logging
+
+from django.db.models import Count, F, Q
+from redis.exceptions import RedisError
+
+from messenger.models import Membership, Message
+from utils.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+UNREAD_KEY = "messenger:unread:{user_id}"
+UNREAD_TTL = 60 * 60
+# در کانال‌های چندهزار نفره کلیدها در چند دسته به Redis فرستاده می‌شوند
+UNREAD_KEYS_CHUNK = 1000
+
+# فقط هش‌هایی که وجود دارند تغییر می‌کنند؛ وگرنه هش ناقص ساخته می‌شود
+_INCREMENT_IF_EXISTS = """
+for _, key in ipairs(KEYS) do
+    if redis.call('EXISTS', key) == 1 then
+        redis.call('HINCRBY', key, ARGV[1], 1)
+    end
+end
+"""
+_SET_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+end
+"""
+
+
+def _unread_key(user_id) -> str:
+    return UNREAD_KEY.format(user_id=user_id)
+
+
+def _chunks(keys):
+    for start in range(0, len(keys), UNREAD_KEYS_CHUNK):
+        yield keys[start:start + UNREAD_KEYS_CHUNK]
+
+
+def _unread_filter(user_id) -> Q:
+    # هر دو شرط روی یک join از memberships اعمال می‌شوند چون در یک Q هستند
+    return Q(room__memberships__user_id=user_id) & (
+        Q(room__memberships__last_read_message__isnull=True)
+        | Q(id__gt=F('room__memberships__last_read_message_id'))
+    )
+
+
+def count_unread_from_db(user_id, room_ids=None) -> dict:
+    """
+    تعداد پیام‌های خوانده‌نشده‌ی همه‌ی روم‌های کاربر با یک کوئری گروه‌بندی.
+    """
+    membership_rooms = Membership.objects.filter(user_id=user_id)
+    if room_ids is not None:
+        membership_rooms = membership_rooms.filter(chat_room_id__in=room_ids)
+    counts = {room_id: 0 for room_id in membership_rooms.values_list('chat_room_id', flat=True)}
+
+    messages = Message.objects.filter(_unread_filter(user_id), is_deleted=False).exclude(sender_id=user_id)
+    if room_ids is not None:
+        messages = messages.filter(room_id__in=room_ids)
+    for row in messages.values('room_id').annotate(count=Count('id')).order_by():
+        counts[row['room_id']] = row['count']
+    return counts
+
+
+def get_unread_counts(user_id) -> dict:
+    """
+    شمارنده‌ها از Redis خوانده می‌شوند؛ اگر نبودند یک بار از دیتابیس ساخته می‌شوند.
+    """
+    redis = get_redis()
+    if redis is None:
+        return count_unread_from_db(user_id)
+
+    key = _unread_key(user_id)
+    try:
+        cached = redis.hgetall(key)
+        if cached:
+            return {int(room_id): max(int(count), 0) for room_id, count in cached.items() if room_id != b'_'}
+
+        counts = count_unread_from_db(user_id)
+        pipe = redis.pipeline()
+        # فیلد '_' تا هش کاربری که هیچ رومی ندارد هم ساخته شود
+        pipe.hset(key, mapping={'_': 0, **{str(room_id): count for room_id, count in counts.items()}})
+        pipe.expire(key, UNREAD_TTL)
+        pipe.execute()
+        return counts
+    except RedisError:
+        logger.exception("Unread counters unavailable, falling back to database")
+        return count_unread_from_db(user_id)
+
+
+def increment_unread(room_id, sender_id) -> None:
+    """
+    بعد از ارسال پیام، شمارنده‌ی همه‌ی اعضا به جز فرستنده یکی زیاد می‌شود
+    (فقط برای کاربرانی که هش‌شان در کش هست).
+    """
+    redis = get_redis()
+    if redis is None:
+        return
+    user_ids = Membership.objects.filter(chat_room_id=room_id).exclude(user_id=sender_id) \
+        .values_list('user_id', flat=True)
+    keys = [_unread_key(user_id) for user_id in user_ids]
+    try:
+        for chunk in _chunks(keys):
+            redis.eval(_INCREMENT_IF_EXISTS, len(chunk), *chunk, str(room_id))
+    except RedisError:
+        logger.exception("Failed to increment unread counters for room %s", room_id)
+
+
+def reset_unread(user_id, room_id) -> int:
+    """
+    بعد از mark-read شمارنده‌ی این روم از دیتابیس دوباره حساب می‌شود.
+    """
+    count = count_unread_from_db(user_id, room_ids=[room_id]).get(room_id, 0)
+    redis = get_redis()
+    if redis is None:
+        return count
+    try:
+        redis.eval(_SET_IF_EXISTS, 1, _unread_key(user_id), str(room_id), count)
+    except RedisError:
+        logger.exception("Failed to reset unread counter for user %s", user_id)
+    return count
+
+
+def invalidate_unread(user_ids) -> None:
+    redis = get_redis()
+    if redis is None or not user_ids:
+        return
+    try:
+        for chunk in _chunks([_unread_key(user_id) for user_id in user_ids]):
+            redis.delete(*chunk)
+    except RedisError:
+        logger.exception("Failed to invalidate unread counters")
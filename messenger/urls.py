@@ -2,12 +2,14 @@ from django.urls import path
 from messenger.views import (
     ChatRoomListView, ChatRoomCreateView,
     ChatMessagesListView, SendMessageView,
-    DeleteMessageView, EditMessageView, ChatRoomDeleteView, RemoveMember, AddMember, EmployeeListView
+    DeleteMessageView, EditMessageView, ChatRoomDeleteView, RemoveMember, AddMember, EmployeeListView,
+    UnreadCountsView, MarkReadView, MessageSearchView, RoomPresenceView
 )
 
 urlpatterns = [
     # لیست چت‌های کاربر
     path('chats/', ChatRoomListView.as_view(), name='chat-list'),
+    path('chats/unread/', UnreadCountsView.as_view(), name='chat-unread-counts'),
     path('employee-list/', EmployeeListView.as_view(), name='employee-list'),
 
     # ایجاد چت جدید (فقط MainManager)
@@ -15,11 +17,17 @@ urlpatterns = [
 
     # لیست پیام‌های یک چت
     path('chats/<int:pk>/', ChatMessagesListView.as_view(), name='chat-messages'),
-    # لیست پیام‌های یک چت
+    # علامت خوانده‌شدن پیام‌ها
+    path('chats/<int:pk>/read/', MarkReadView.as_view(), name='chat-mark-read'),
+    # حضور آنلاین و تایپ اعضا
+    path('chats/<int:pk>/presence/', RoomPresenceView.as_view(), name='chat-presence'),
     path('chats/<int:pk>/remove/', ChatRoomDeleteView.as_view(), name='chatroom-delete'),
     path('chats/<int:pk>/add-member/', AddMember.as_view(), name='chatroom-add-member'),
     path('chats/<int:pk>/remove-member/', RemoveMember.as_view(), name='chatroom-remove-member'),
 
+    # جست‌وجو در پیام‌ها
+    path('messages/search/', MessageSearchView.as_view(), name='message-search'),
+
     # ارسال پیام
     path('messages/send/', SendMessageView.as_view(), name='send-message'),
 
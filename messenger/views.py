@@ -1,3 +1,4 @@
+from django.db.models import Prefetch, Q
 from django.shortcuts import get_object_or_404
 from rest_framework import generics, status
 from rest_framework.exceptions import PermissionDenied
@@ -9,8 +10,13 @@ from employees.serializers import EmployeeSerializer
 from messenger.models import ChatRoom, Message, Membership
 from messenger.serializers import (
     ChatRoomSerializer, ChatRoomCreateSerializer,
-    MessageSerializer, MessageEditSerializer, ChatRoomUpdateSerializer
+    MessageSerializer, MessageEditSerializer, ChatRoomUpdateSerializer, MarkReadSerializer,
+    MessageHistoryQuerySerializer, MessageSearchQuerySerializer, MessageSearchResultSerializer
 )
+from messenger.history import HistoryAnchorNotFound, fetch_history, get_membership_with_anchor
+from messenger.presence import get_room_presence
+from messenger.search import InvalidSearchCursor, search_messages
+from messenger.unread import get_unread_counts, reset_unread
 from accounts.permissions import IsMainManager, IsEmployee
 class ChatRoomListView(generics.ListAPIView):
     """
@@ -21,8 +27,30 @@ class ChatRoomListView(generics.ListAPIView):
     authentication_classes = [CustomJWTAuthentication]
 
     def get_queryset(self):
-        # related_name درست: memberships__user یا users
-        return ChatRoom.objects.filter(memberships__user=self.request.user).distinct()
+        # تعداد کوئری ثابت: پروفایل اعضا، مالک و آخرین پیام همه از قبل بارگذاری می‌شوند
+        user_profiles = ('main_manager', 'employee')
+        return (
+            ChatRoom.objects
+            .filter(id__in=Membership.objects.filter(user=self.request.user).values('chat_room_id'))
+            .select_related(
+                *(f'owner__{profile}' for profile in user_profiles),
+                *(f'last_message__sender__{profile}' for profile in user_profiles),
+            )
+            .prefetch_related(
+                Prefetch(
+                    'memberships',
+                    queryset=Membership.objects.select_related(
+                        *(f'user__{profile}' for profile in user_profiles)
+                    ).order_by('joined_at', 'id'),
+                )
+            )
+            .order_by('-last_activity_at', '-id')
+        )
+
+    def get_serializer_context(self):
+        ctx = super().get_serializer_context()
+        ctx['unread_counts'] = get_unread_counts(self.request.user.id)
+        return ctx
 
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
@@ -35,6 +63,77 @@ class ChatRoomListView(generics.ListAPIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class UnreadCountsView(generics.GenericAPIView):
+    """
+    تعداد پیام‌های خوانده‌نشده‌ی همه‌ی روم‌های کاربر: {room_id: count}
+    """
+    permission_classes = [IsEmployee | IsMainManager]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def get(self, request, *args, **kwargs):
+        counts = get_unread_counts(request.user.id)
+        return Response({
+            "total": sum(counts.values()),
+            "rooms": {str(room_id): count for room_id, count in counts.items()},
+        }, status=status.HTTP_200_OK)
+
+
+class MarkReadView(generics.GenericAPIView):
+    """
+    علامت‌گذاری پیام‌های روم به‌عنوان خوانده‌شده تا message_id (یا تا آخرین پیام)
+    اشاره‌گر فقط رو به جلو حرکت می‌کند.
+    """
+    serializer_class = MarkReadSerializer
+    permission_classes = [IsEmployee | IsMainManager]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        membership = Membership.objects.filter(chat_room_id=kwargs['pk'], user=request.user).first()
+        if not membership:
+            raise PermissionDenied("You are not a member of this chat.")
+
+        message_id = serializer.validated_data.get('message_id')
+        messages = Message.objects.filter(room_id=membership.chat_room_id)
+        if message_id:
+            if not messages.filter(id=message_id).exists():
+                return Response({"detail": "Message not found in this chat."}, status=status.HTTP_404_NOT_FOUND)
+        else:
+            message_id = messages.order_by('-id').values_list('id', flat=True).first()
+
+        if message_id:
+            Membership.objects.filter(pk=membership.pk).filter(
+                Q(last_read_message__isnull=True) | Q(last_read_message_id__lt=message_id)
+            ).update(last_read_message_id=message_id)
+
+        last_read_message_id = Membership.objects.filter(pk=membership.pk) \
+            .values_list('last_read_message_id', flat=True).first()
+        unread = reset_unread(request.user.id, membership.chat_room_id)
+        return Response({
+            "last_read_message_id": last_read_message_id,
+            "unread_count": unread,
+        }, status=status.HTTP_200_OK)
+
+
+class RoomPresenceView(generics.GenericAPIView):
+    """
+    حضور اعضای روم و کسانی که در حال نوشتن‌اند (برای کلاینت‌های بدون WebSocket)
+    همین درخواست heartbeat کاربر هم حساب می‌شود.
+    """
+    permission_classes = [IsEmployee | IsMainManager]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def get(self, request, *args, **kwargs):
+        user_ids = list(Membership.objects.filter(chat_room_id=kwargs['pk']).values_list('user_id', flat=True))
+        if request.user.id not in user_ids:
+            get_object_or_404(ChatRoom, pk=kwargs['pk'])
+            raise PermissionDenied("You are not a member of this chat.")
+        presence = get_room_presence(kwargs['pk'], user_ids=user_ids, touch_user_id=request.user.id)
+        return Response(presence, status=status.HTTP_200_OK)
+
+
 class ChatRoomCreateView(generics.CreateAPIView):
     """
     ایجاد چت جدید (فقط MainManager می‌تواند بسازد)
@@ -75,28 +174,70 @@ class ChatRoomDeleteView(generics.DestroyAPIView):
 
 class ChatMessagesListView(generics.ListAPIView):
     """
-    لیست پیام‌های یک چت خاص (فقط اعضای چت دسترسی دارند)
-    اگر پیام وجود نداشت پیام اطلاع‌رسانی می‌دهد
+    تاریخچه‌ی پیام‌های یک چت (فقط اعضای چت دسترسی دارند)
+    صفحه‌بندی با لنگر به‌جای offset: ?before=<id> / ?after=<id> / ?around=<id> و ?limit=
+    عضویت و لنگر با یک کوئری و صفحه‌ی پیام‌ها با یک کوئری روی ایندکس (room, created_at)
     """
     serializer_class = MessageSerializer
     permission_classes = [IsEmployee | IsMainManager]
     authentication_classes = [CustomJWTAuthentication]
 
-    def get_queryset(self):
-        chat_id = self.kwargs['pk']
-        chat = get_object_or_404(ChatRoom, pk=chat_id)
-        if not chat.users.filter(id=self.request.user.id).exists():
+    def list(self, request, *args, **kwargs):
+        params = MessageHistoryQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+        anchor_id = query.get('before') or query.get('after') or query.get('around')
+
+        membership = get_membership_with_anchor(kwargs['pk'], request.user.id, anchor_id)
+        if membership is None:
+            get_object_or_404(ChatRoom, pk=kwargs['pk'])
             raise PermissionDenied("You are not a member of this chat.")
-        return chat.messages.all()
 
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        if not queryset.exists():
-            return Response({
-                "message": "هیچ پیامی در این گفتگو وجود ندارد",
-                "messages": []
-            }, status=status.HTTP_200_OK)
-        return super().list(request, *args, **kwargs)
+        try:
+            page = fetch_history(
+                membership.chat_room_id,
+                anchor_created_at=getattr(membership, 'anchor_created_at', None),
+                before=query.get('before'),
+                after=query.get('after'),
+                around=query.get('around'),
+                limit=query['limit'],
+            )
+        except HistoryAnchorNotFound:
+            return Response({"detail": "Message not found in this chat."}, status=status.HTTP_404_NOT_FOUND)
+
+        page['results'] = self.get_serializer(page['results'], many=True).data
+        if not page['results'] and anchor_id is None:
+            page['message'] = "هیچ پیامی در این گفتگو وجود ندارد"
+        return Response(page, status=status.HTTP_200_OK)
+
+
+class MessageSearchView(generics.GenericAPIView):
+    """
+    جست‌وجوی متن پیام‌ها در روم‌هایی که کاربر عضو آن‌هاست
+    ?q=&room=&limit= و برای صفحه‌ی بعد ?cursor=<next_cursor>
+    """
+    serializer_class = MessageSearchResultSerializer
+    permission_classes = [IsEmployee | IsMainManager]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def get(self, request, *args, **kwargs):
+        params = MessageSearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        query = params.validated_data
+
+        try:
+            page = search_messages(
+                request.user.id,
+                query['q'],
+                room_id=query.get('room'),
+                cursor=query.get('cursor'),
+                limit=query['limit'],
+            )
+        except InvalidSearchCursor:
+            return Response({"detail": "Invalid cursor."}, status=status.HTTP_400_BAD_REQUEST)
+
+        page['results'] = self.get_serializer(page['results'], many=True).data
+        return Response(page, status=status.HTTP_200_OK)
 
 
 class ChatRoomUpdateView(generics.UpdateAPIView):
@@ -0,0 +1,54 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from payments.events import GAME_ORDER, REPAIR_ORDER, STAFF_GROUPS, customer_orders_group
+
+
+class OrderStatusConsumer(AsyncJsonWebsocketConsumer):
+    """
+    تغییر وضعیت سفارش‌ها به‌صورت زنده (به‌جای polling):
+    مشتری فقط سفارش‌های خودش را می‌گیرد، کارمند بر اساس دسترسی سفارش بازی/تعمیر، مدیر اصلی همه را.
+    """
+
+    async def connect(self):
+        self.user = self.scope.get('user')
+        if not self.user or not self.user.is_authenticated:
+            await self.close(code=4401)
+            return
+
+        self.groups_joined = await self.resolve_groups()
+        if not self.groups_joined:
+            await self.close(code=4403)
+            return
+
+        for group in self.groups_joined:
+            await self.channel_layer.group_add(group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        for group in getattr(self, 'groups_joined', []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        if content.get('type') == 'ping':
+            await self.send_json({'type': 'pong'})
+
+    @database_sync_to_async
+    def resolve_groups(self):
+        user = self.user
+        groups = []
+        if hasattr(user, 'customer'):
+            groups.append(customer_orders_group(user.id))
+        if hasattr(user, 'main_manager'):
+            groups.extend(STAFF_GROUPS.values())
+        elif hasattr(user, 'employee'):
+            employee = user.employee
+            if employee.has_access_to_game_orders:
+                groups.append(STAFF_GROUPS[GAME_ORDER])
+            if employee.has_access_to_repair_order:
+                groups.append(STAFF_GROUPS[REPAIR_ORDER])
+        return groups
+
+    # ---------- رویدادهای گروه ----------
+    async def order_status(self, event):
+        await self.send_json(event)
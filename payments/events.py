@@ -0,0 +1,54 @@
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+GAME_ORDER = 'game_order'
+REPAIR_ORDER = 'repair_order'
+
+# گروه کارمندانی که به هر نوع سفارش دسترسی دارند (و مدیر اصلی)
+STAFF_GROUPS = {
+    GAME_ORDER: 'orders.staff.game',
+    REPAIR_ORDER: 'orders.staff.repair',
+}
+
+
+def customer_orders_group(user_id) -> str:
+    return f'orders.customer.{user_id}'
+
+
+def _group_send(group, payload):
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    try:
+        async_to_sync(channel_layer.group_send)(group, payload)
+    except Exception:
+        # قطع بودن Redis نباید ذخیره‌ی سفارش را خراب کند
+        logger.exception("Failed to publish order event to %s", group)
+
+
+def publish_order_status(order, order_kind, previous_status, customer_user_id):
+    """
+    تغییر وضعیت سفارش بعد از commit به مشتری صاحب سفارش و گروه کارمندان فرستاده می‌شود.
+    """
+    payload = {
+        'type': 'order.status',
+        'order_type': order_kind,
+        'order_id': order.pk,
+        'customer_id': order.customer_id,
+        'status': order.status,
+        'status_display': order.get_status_display(),
+        'previous_status': previous_status,
+        'updated_at': order.updated_at.isoformat() if order.updated_at else None,
+    }
+
+    def send():
+        if customer_user_id:
+            _group_send(customer_orders_group(customer_user_id), payload)
+        _group_send(STAFF_GROUPS[order_kind], payload)
+
+    transaction.on_commit(send)
@@ -0,0 +1,7 @@
+from django.urls import path
+
+from payments.consumers import OrderStatusConsumer
+
+websocket_urlpatterns = [
+    path('ws/orders/', OrderStatusConsumer.as_asgi()),
+]
@@ -0,0 +1,31 @@
+# payments/signals.py
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+
+from customers.models import Customer
+from payments.events import GAME_ORDER, REPAIR_ORDER, publish_order_status
+from payments.models import GameOrder, RepairOrder
+
+ORDER_KINDS = {GameOrder: GAME_ORDER, RepairOrder: REPAIR_ORDER}
+
+
+@receiver(post_init, sender=GameOrder)
+@receiver(post_init, sender=RepairOrder)
+def remember_order_status(sender, instance, **kwargs):
+    # وضعیت زمان بارگذاری؛ بدون کوئری اضافه تغییر وضعیت در post_save تشخیص داده می‌شود
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=GameOrder)
+@receiver(post_save, sender=RepairOrder)
+def order_status_changed(sender, instance, created=False, update_fields=None, **kwargs):
+    if update_fields is not None and 'status' not in update_fields:
+        return
+    previous_status = None if created else getattr(instance, '_loaded_status', None)
+    # اگر status موقع بارگذاری defer شده بود، وضعیت قبلی معلوم نیست
+    if not created and (previous_status is None or previous_status == instance.status):
+        return
+    instance._loaded_status = instance.status
+
+    customer_user_id = Customer.objects.filter(pk=instance.customer_id).values_list('user_id', flat=True).first()
+    publish_order_status(instance, ORDER_KINDS[sender], previous_status, customer_user_id)
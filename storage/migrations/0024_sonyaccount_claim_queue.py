@@ -0,0 +1,27 @@
+# Generated by Django 5.2.3 on 2026-10-19 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('employees', '0026_alter_employeehire_resume_file'),
+        ('storage', '0023_sonyaccountstatus_is_available'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sonyaccount',
+            name='claimed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='sonyaccount',
+            index=models.Index(condition=models.Q(('employee__isnull', True), ('is_deleted', False), ('is_owned', False)), fields=['created_at'], name='sonyaccount_unclaimed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sonyaccount',
+            index=models.Index(condition=models.Q(('claimed_at__isnull', False)), fields=['claimed_at'], name='sonyaccount_claimed_at_idx'),
+        ),
+    ]
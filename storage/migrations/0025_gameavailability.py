@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-19 17:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storage', '0024_sonyaccount_claim_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GameAvailability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('region', models.CharField(blank=True, default='', max_length=100)),
+                ('total_accounts', models.PositiveIntegerField(default=0)),
+                ('available_accounts', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability', to='storage.game')),
+            ],
+            options={
+                'unique_together': {('game', 'region')},
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import migrations
+from django.db.models import Count, Q
+
+CHUNK_SIZE = 500
+
+
+def build_game_availability(apps, schema_editor):
+    # ساخت اولیه‌ی جدول خلاصه؛ همان محاسبه‌ی utils.availability با مدل‌های تاریخی
+    Game = apps.get_model('storage', 'Game')
+    GameAvailability = apps.get_model('storage', 'GameAvailability')
+    SonyAccountGame = apps.get_model('storage', 'SonyAccountGame')
+
+    available = Q(sony_account__status__isnull=True) | Q(sony_account__status__is_available=True)
+    game_ids = list(Game.objects.order_by('id').values_list('id', flat=True))
+    GameAvailability.objects.all().delete()
+    for start in range(0, len(game_ids), CHUNK_SIZE):
+        rows = (
+            SonyAccountGame.objects
+            .filter(game_id__in=game_ids[start:start + CHUNK_SIZE], is_deleted=False, sony_account__is_deleted=False)
+            .values('game_id', 'sony_account__region')
+            .annotate(
+                total=Count('sony_account_id', distinct=True),
+                available=Count('sony_account_id', filter=available, distinct=True),
+            )
+            .order_by()
+        )
+        GameAvailability.objects.bulk_create([
+            GameAvailability(
+                game_id=row['game_id'],
+                region=row['sony_account__region'] or '',
+                total_accounts=row['total'],
+                available_accounts=row['available'],
+            )
+            for row in rows
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('storage', '0025_gameavailability'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_game_availability, migrations.RunPython.noop),
+    ]
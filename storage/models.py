@@ -1,5 +1,6 @@
 from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models import Q
 
 from customers.models import Customer
 from employees.models import Employee
@@ -158,6 +159,22 @@ class SonyAccount(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     two_step_secret = models.TextField(null=True, blank=True)
     two_step_enabled = models.BooleanField(default=False)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # صف اکانت‌های آزاد برای EmployeePanelGetNewSonyAccount
+            models.Index(
+                fields=['created_at'],
+                condition=Q(employee__isnull=True, is_deleted=False, is_owned=False),
+                name='sonyaccount_unclaimed_idx',
+            ),
+            models.Index(
+                fields=['claimed_at'],
+                condition=Q(claimed_at__isnull=False),
+                name='sonyaccount_claimed_at_idx',
+            ),
+        ]
 
     def set_totp_secret(self, secret):
         from utils.crypto import encrypt_text
@@ -166,16 +183,10 @@ class SonyAccount(models.Model):
         self.save()
 
     def get_otp(self):
-        from utils.crypto import decrypt_text
-        import pyotp, time
+        from utils.otp import totp_engine
         if not self.two_step_secret:
             return None
-        secret = decrypt_text(self.two_step_secret)
-        totp = pyotp.TOTP(secret)
-        return {
-            "code": totp.now(),
-            "remaining": totp.interval - (int(time.time()) % totp.interval)
-        }
+        return totp_engine.code_for(self.pk, self.two_step_secret)
 
     def __str__(self):
         return self.username
@@ -198,6 +209,24 @@ class SonyAccountGame(models.Model):
         return f"{self.sony_account} - {self.game}"
 
 
+class GameAvailability(models.Model):
+    """
+    خلاصه‌ی تعداد اکانت‌های هر بازی به تفکیک ریجن؛ با utils.availability به‌روز می‌شود.
+    region خالی یعنی اکانت‌هایی که ریجن ندارند.
+    """
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='availability')
+    region = models.CharField(max_length=100, blank=True, default='')
+    total_accounts = models.PositiveIntegerField(default=0)
+    available_accounts = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['game', 'region']
+
+    def __str__(self):
+        return f"{self.game} - {self.region or '-'}: {self.available_accounts}"
+
+
 class DocCategory(models.Model):
     title = models.CharField(max_length=100, unique=True)
     description = models.TextField(max_length=5000, null=True, blank=True)
@@ -1,3 +1,17 @@
 from django.contrib import admin
+from utils import models
+
 
 # Register your models here.
+@admin.register(models.TelegramOutbox)
+class TelegramOutboxAdmin(admin.ModelAdmin):
+    list_display = ('id', 'chat_id', 'sony_account', 'status', 'attempts', 'sent_at', 'created_at')
+    list_filter = ('status',)
+
+
+@admin.register(models.SmsOutbox)
+class SmsOutboxAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'attempts', 'provider_message_id', 'sent_at', 'created_at')
+    list_filter = ('kind', 'status')
+    # متن OTP شامل کد است
+    exclude = ('message',)
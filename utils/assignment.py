@@ -0,0 +1,131 @@
+# utils/assignment.py
+from collections import defaultdict
+
+from django.db import transaction
+
+from payments.models import GameOrder, GameOrderItem
+from storage.models import SonyAccount
+from utils.matching import get_account_game_index, account_availability_q
+
+WAITING_STATUS = 'delivered_to_drgame_and_in_waiting_queue'
+
+# هر بار استفاده‌ی دوباره از یک اکانت در همین برنامه، هزینه‌ی آن را بیشتر می‌کند
+# تا بار بین اکانت‌ها پخش شود
+REUSE_PENALTY = 0.25
+
+
+class AssignmentError(Exception):
+    pass
+
+
+def _waiting_orders(order_ids=None):
+    """
+    سفارش‌های در صف انتظار به همراه بازی‌ها و اکانت‌های فعلی‌شان (سه کوئری).
+    """
+    orders = GameOrder.objects.filter(status=WAITING_STATUS, is_deleted=False)
+    if order_ids is not None:
+        orders = orders.filter(id__in=order_ids)
+    order_ids = list(orders.order_by('created_at').values_list('id', flat=True))
+
+    games = defaultdict(set)
+    for order_id, game_id in GameOrderItem.objects.filter(
+            game_order_id__in=order_ids, is_deleted=False
+    ).values_list('game_order_id', 'game_id'):
+        games[order_id].add(game_id)
+
+    current = defaultdict(set)
+    for order_id, account_id in GameOrder.sony_accounts.through.objects.filter(
+            gameorder_id__in=order_ids
+    ).values_list('gameorder_id', 'sonyaccount_id'):
+        current[order_id].add(account_id)
+
+    return [(order_id, games[order_id], current[order_id]) for order_id in order_ids]
+
+
+def build_assignment_plan(region: str | None = None, available_only: bool = True, order_ids=None) -> list[dict]:
+    """
+    برای همه‌ی سفارش‌های در صف انتظار با set cover وزن‌دار حریصانه اکانت پیشنهاد می‌دهد.
+    در هر قدم اکانتی انتخاب می‌شود که بیشترین بازی پوشش‌داده‌نشده را به ازای هزینه‌اش بدهد؛
+    هزینه‌ی هر اکانت با تعداد دفعات استفاده‌اش در همین برنامه بالا می‌رود.
+    """
+    index = get_account_game_index()
+    load = defaultdict(int)
+    plan = []
+
+    for order_id, order_games, current_accounts in _waiting_orders(order_ids):
+        if not order_games:
+            continue
+        remaining = set(order_games)
+        for account_id in current_accounts:
+            remaining -= index.games_of(account_id)
+
+        candidates = {
+            account_id
+            for game_id in remaining
+            for account_id in index.game_accounts.get(game_id, ())
+            if account_id not in current_accounts
+            and index.is_eligible(account_id, region=region, available_only=available_only)
+        }
+
+        chosen = []
+        while remaining and candidates:
+            best, best_key = None, None
+            for account_id in candidates:
+                gain = len(index.games_of(account_id) & remaining)
+                if not gain:
+                    continue
+                # بازده بیشتر، بعد بازی اضافه‌ی کمتر، بعد id کوچک‌تر
+                key = (gain / (1 + REUSE_PENALTY * load[account_id]),
+                       -len(index.games_of(account_id)), -account_id)
+                if best_key is None or key > best_key:
+                    best, best_key = account_id, key
+            if best is None:
+                break
+            chosen.append(best)
+            candidates.discard(best)
+            remaining -= index.games_of(best)
+            load[best] += 1
+
+        if chosen:
+            plan.append({
+                'order_id': order_id,
+                'account_ids': chosen,
+                'covered_game_ids': sorted(order_games - remaining),
+                'uncovered_game_ids': sorted(remaining),
+            })
+
+    return plan
+
+
+def apply_assignment_plan(plan: list[dict], available_only: bool = True) -> int:
+    """
+    برنامه را به صورت اتمیک اعمال می‌کند؛ اگر سفارشی دیگر در صف انتظار نباشد
+    یا اکانتی حذف/غیرقابل‌استفاده شده باشد هیچ تغییری ذخیره نمی‌شود.
+    """
+    order_ids = {item['order_id'] for item in plan}
+    account_ids = {account_id for item in plan for account_id in item['account_ids']}
+
+    with transaction.atomic():
+        locked = set(
+            GameOrder.objects.select_for_update()
+            .filter(id__in=order_ids, status=WAITING_STATUS, is_deleted=False)
+            .values_list('id', flat=True)
+        )
+        if locked != order_ids:
+            raise AssignmentError(f"سفارش‌های {sorted(order_ids - locked)} دیگر در صف انتظار نیستند")
+
+        accounts = SonyAccount.objects.filter(id__in=account_ids, is_deleted=False)
+        if available_only:
+            accounts = accounts.filter(account_availability_q())
+        valid = set(accounts.values_list('id', flat=True))
+        if valid != account_ids:
+            raise AssignmentError(f"اکانت‌های {sorted(account_ids - valid)} قابل استفاده نیستند")
+
+        through = GameOrder.sony_accounts.through
+        links = [
+            through(gameorder_id=item['order_id'], sonyaccount_id=account_id)
+            for item in plan for account_id in item['account_ids']
+        ]
+        through.objects.bulk_create(links, ignore_conflicts=True)
+
+    return len(links)
@@ -0,0 +1,78 @@
+# utils/availability.py
+from django.db import transaction
+from django.db.models import Count
+
+from storage.models import Game, GameAvailability, SonyAccountGame
+from utils.matching import account_availability_q
+
+REBUILD_CHUNK_SIZE = 500
+
+
+def refresh_game_availability(game_ids) -> int:
+    """
+    ردیف‌های خلاصه‌ی بازی‌های داده‌شده را با یک کوئری گروه‌بندی دوباره حساب می‌کند.
+    خروجی: تعداد ردیف‌های نوشته‌شده
+    """
+    game_ids = {game_id for game_id in game_ids if game_id}
+    if not game_ids:
+        return 0
+
+    rows = (
+        SonyAccountGame.objects
+        .filter(game_id__in=game_ids, is_deleted=False, sony_account__is_deleted=False)
+        .values('game_id', 'sony_account__region')
+        .annotate(
+            total=Count('sony_account_id', distinct=True),
+            available=Count(
+                'sony_account_id',
+                filter=account_availability_q('sony_account__'),
+                distinct=True,
+            ),
+        )
+        .order_by()
+    )
+    summaries = [
+        GameAvailability(
+            game_id=row['game_id'],
+            region=row['sony_account__region'] or '',
+            total_accounts=row['total'],
+            available_accounts=row['available'],
+        )
+        for row in rows
+    ]
+
+    with transaction.atomic():
+        # ریجن‌هایی که دیگر اکانتی ندارند هم باید پاک شوند
+        GameAvailability.objects.filter(game_id__in=game_ids).delete()
+        GameAvailability.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=['game', 'region'],
+            update_fields=['total_accounts', 'available_accounts', 'updated_at'],
+        )
+    return len(summaries)
+
+
+def games_of_accounts(account_ids) -> set:
+    return set(
+        SonyAccountGame.objects.filter(sony_account_id__in=account_ids).values_list('game_id', flat=True)
+    )
+
+
+def games_of_status(status_id) -> set:
+    return set(
+        SonyAccountGame.objects.filter(sony_account__status_id=status_id).values_list('game_id', flat=True)
+    )
+
+
+def rebuild_game_availability() -> int:
+    """
+    بازسازی کامل جدول خلاصه (برای دستور rebuild_game_availability).
+    جدول از قبل خالی نمی‌شود: هر تکه در تراکنش خودش جایگزین می‌شود تا خواننده‌ها وسط بازسازی
+    جدول خالی یا نیمه‌پر نبینند. ردیف بازی‌های حذف‌شده با CASCADE پاک شده‌اند.
+    """
+    game_ids = list(Game.objects.order_by('id').values_list('id', flat=True))
+    written = 0
+    for start in range(0, len(game_ids), REBUILD_CHUNK_SIZE):
+        written += refresh_game_availability(game_ids[start:start + REBUILD_CHUNK_SIZE])
+    return written
@@ -0,0 +1,78 @@
+# utils/claims.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+
+from storage.models import SonyAccount
+from utils.facets import invalidate_sony_account_facets
+from utils.matching import account_availability_q
+
+RELEASE_SWEEP_CACHE_KEY = "sony_claim:sweep"
+RELEASE_SWEEP_INTERVAL = 60
+
+
+def _abandoned_claims(now=None):
+    """
+    اکانت‌هایی که کارمند گرفته ولی تا پایان مهلت هیچ بازی‌ای برایشان ثبت نکرده.
+    """
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=settings.SONY_ACCOUNT_CLAIM_TIMEOUT)
+    return SonyAccount.objects.filter(
+        account_availability_q(),
+        claimed_at__lt=cutoff,
+        employee__isnull=False,
+        is_deleted=False,
+        games__isnull=True,
+    )
+
+
+def release_expired_claims() -> int:
+    """
+    اکانت‌های رها‌شده را به صف برمی‌گرداند و تعدادشان را برمی‌گرداند.
+    """
+    ids = list(_abandoned_claims().values_list('id', flat=True))
+    if not ids:
+        return 0
+    # دوباره شرط مهلت چک می‌شود تا اگر کارمند همین الان بازی ثبت کرد آزاد نشود
+    released = _abandoned_claims().filter(id__in=ids).update(employee=None, claimed_at=None)
+    if released:
+        # update سیگنال post_save نمی‌فرستد؛ کش فیلتر کارمندها دستی باطل می‌شود
+        transaction.on_commit(invalidate_sony_account_facets)
+    return released
+
+
+def _maybe_release_expired_claims():
+    # حداکثر هر دقیقه یک بار، بین همه‌ی پروسس‌ها
+    if cache.add(RELEASE_SWEEP_CACHE_KEY, 1, RELEASE_SWEEP_INTERVAL):
+        release_expired_claims()
+
+
+def _claim_sql() -> str:
+    table = connection.ops.quote_name(SonyAccount._meta.db_table)
+    # SQLite قفل سطری ندارد (کل دیتابیس قفل می‌شود)
+    lock = ' FOR UPDATE SKIP LOCKED' if connection.features.has_select_for_update_skip_locked else ''
+    return (
+        f"UPDATE {table} SET employee_id = %s, claimed_at = %s, updated_at = %s "
+        f"WHERE id = (SELECT id FROM {table} "
+        f"WHERE employee_id IS NULL AND is_deleted = %s AND is_owned = %s "
+        f"ORDER BY created_at LIMIT 1{lock}) "
+        f"RETURNING *"
+    )
+
+
+def claim_sony_account(employee):
+    """
+    قدیمی‌ترین اکانت آزاد را با یک کوئری (UPDATE ... RETURNING) به کارمند می‌دهد.
+    با SKIP LOCKED هر درخواست همزمان یک اکانت متفاوت می‌گیرد و منتظر قفل دیگران نمی‌ماند.
+    """
+    _maybe_release_expired_claims()
+
+    now = connection.ops.adapt_datetimefield_value(timezone.now())
+    account = next(iter(SonyAccount.objects.raw(_claim_sql(), [employee.pk, now, now, False, False])), None)
+    if account is not None:
+        # update سیگنال post_save نمی‌فرستد
+        transaction.on_commit(invalidate_sony_account_facets)
+    return account
@@ -1,9 +1,18 @@
 # utils/crypto.py
+from functools import lru_cache
+
 from cryptography.fernet import Fernet
 from django.conf import settings
 
+
+@lru_cache(maxsize=4)
+def _fernet_for_key(key: str) -> Fernet:
+    return Fernet(key.encode())
+
+
 def _get_fernet() -> Fernet:
-    return Fernet(settings.FERNET_KEY.encode())
+    # ساخت Fernet برای هر درخواست لازم نیست؛ به ازای هر کلید یک بار ساخته می‌شود
+    return _fernet_for_key(settings.FERNET_KEY)
 
 def encrypt_text(plain: str) -> str:
     return _get_fernet().encrypt(plain.encode()).decode()
@@ -0,0 +1,92 @@
+# utils/facets.py
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from storage.models import SonyAccountGame
+
+FACETS_VERSION_KEY = "sony_facets:version"
+FACETS_CACHE_KEY = "sony_facets:{version}:{digest}"
+FACETS_CACHE_TTL = 5 * 60
+TOP_GAMES_FACET_SIZE = 20
+
+
+def _facets_version() -> int:
+    version = cache.get(FACETS_VERSION_KEY)
+    if version is None:
+        cache.add(FACETS_VERSION_KEY, 1, None)
+        version = cache.get(FACETS_VERSION_KEY) or 1
+    return version
+
+
+def invalidate_sony_account_facets() -> None:
+    try:
+        cache.incr(FACETS_VERSION_KEY)
+    except ValueError:
+        cache.set(FACETS_VERSION_KEY, 2, None)
+
+
+def _cache_key(filters: dict) -> str:
+    normalized = json.dumps(filters, sort_keys=True, default=str)
+    digest = hashlib.md5(normalized.encode()).hexdigest()
+    return FACETS_CACHE_KEY.format(version=_facets_version(), digest=digest)
+
+
+def compute_facets(queryset) -> dict:
+    """
+    شمارش هر فیلتر روی نتایج فعلی؛ تعداد کوئری ثابت است (یک کوئری گروه‌بندی برای هر فست).
+    """
+    queryset = queryset.order_by()
+    total = queryset.count()
+
+    region = [
+        {"value": row['region'], "count": row['count']}
+        for row in queryset.values('region').annotate(count=Count('id')).order_by('-count')
+    ]
+    plus = [
+        {"value": row['plus'], "count": row['count']}
+        for row in queryset.values('plus').annotate(count=Count('id')).order_by('-count')
+    ]
+    status = [
+        {"id": row['status_id'], "title": row['status__title'], "count": row['count']}
+        for row in queryset.values('status_id', 'status__title').annotate(count=Count('id')).order_by('-count')
+    ]
+    employee = [
+        {
+            "id": row['employee_id'],
+            "name": f"{row['employee__first_name'] or ''} {row['employee__last_name'] or ''}".strip() or None,
+            "count": row['count'],
+        }
+        for row in queryset.values('employee_id', 'employee__first_name', 'employee__last_name')
+        .annotate(count=Count('id')).order_by('-count')
+    ]
+    games = [
+        {"id": row['game_id'], "title": row['game__title'], "count": row['count']}
+        for row in SonyAccountGame.objects.filter(sony_account__in=queryset.values('id'), is_deleted=False)
+        .values('game_id', 'game__title')
+        .annotate(count=Count('sony_account_id', distinct=True))
+        .order_by('-count', 'game_id')[:TOP_GAMES_FACET_SIZE]
+    ]
+
+    return {
+        "total": total,
+        "region": region,
+        "plus": plus,
+        "status": status,
+        "employee": employee,
+        "games": games,
+    }
+
+
+def get_facets(queryset, filters: dict) -> dict:
+    """
+    فست‌ها را بر اساس فیلترهای درخواست کش می‌کند؛ با تغییر اکانت‌ها یا بازی‌هایشان نسخه عوض می‌شود.
+    """
+    key = _cache_key(filters)
+    facets = cache.get(key)
+    if facets is None:
+        facets = compute_facets(queryset)
+        cache.set(key, facets, FACETS_CACHE_TTL)
+    return facets
@@ -0,0 +1,280 @@
+# utils/importers.py
+import csv
+import io
+import urllib.parse
+import zipfile
+from collections import deque
+from itertools import islice
+
+from django.db import DatabaseError, transaction
+
+from storage.models import Game, SonyAccount, SonyAccountGame, SonyAccountStatus
+from utils.crypto import encrypt_text
+from utils.availability import refresh_game_availability
+from utils.facets import invalidate_sony_account_facets
+from utils.matching import invalidate_account_game_index
+
+BATCH_SIZE = 500
+
+REGION_ALIASES = {
+    'america': 'America', 'us': 'America', 'usa': 'America', 'امریکا': 'America', 'آمریکا': 'America',
+    'europe': 'Europe', 'eu': 'Europe', 'اروپا': 'Europe',
+    'asia': 'Asia', 'آسیا': 'Asia',
+    'mix': 'Mix', 'میکس': 'Mix',
+}
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'بله', 'دارد'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'خیر', 'ندارد'}
+GAME_SEPARATORS = ('|', ';', '،')
+
+
+class ImportFileError(Exception):
+    pass
+
+
+def _iter_csv(file):
+    stream = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.DictReader(stream)
+    finally:
+        stream.detach()
+
+
+def _iter_xlsx(file):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFileError("برای خواندن فایل xlsx پکیج openpyxl لازم است")
+
+    # read_only: ردیف‌ها به صورت استریم خوانده می‌شوند
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if not header:
+            return
+        keys = [str(cell).strip() if cell is not None else '' for cell in header]
+        for values in rows:
+            yield {key: value for key, value in zip(keys, values) if key}
+    finally:
+        workbook.close()
+
+
+def _check_readable(reader, file):
+    # یک بار کل فایل بدون نگه داشتن ردیف‌ها خوانده می‌شود تا خطای decode وسط فایل
+    # پیش از ثبت اولین دسته معلوم شود، نه بعد از commit دسته‌های قبلی
+    try:
+        deque(reader(file), maxlen=0)
+    except (UnicodeDecodeError, csv.Error, zipfile.BadZipFile, KeyError, ValueError):
+        raise ImportFileError("فایل قابل خواندن نیست")
+    file.seek(0)
+
+
+def iter_rows(file):
+    """
+    ردیف‌های فایل را یکی‌یکی به صورت dict برمی‌گرداند (csv یا xlsx).
+    فایل خراب یا با encoding نامعتبر همین‌جا ImportFileError می‌دهد.
+    """
+    name = (getattr(file, 'name', '') or '').lower()
+    if name.endswith('.xlsx'):
+        reader = _iter_xlsx
+    elif name.endswith('.csv') or name.endswith('.txt'):
+        reader = _iter_csv
+    else:
+        raise ImportFileError("فرمت فایل باید csv یا xlsx باشد")
+    _check_readable(reader, file)
+    return reader(file)
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _parse_bool(value):
+    text = _text(value).lower()
+    if not text:
+        return None
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError("مقدار باید بله/خیر باشد")
+
+
+def _parse_secret(value):
+    # هم secret خام و هم URI کامل otpauth:// پذیرفته می‌شود
+    text = _text(value)
+    if text.startswith('otpauth://'):
+        secret = urllib.parse.parse_qs(urllib.parse.urlparse(text).query).get('secret')
+        if not secret:
+            raise ValueError("secret در URI پیدا نشد")
+        text = secret[0]
+    return text.replace(' ', '').upper()
+
+
+class SonyAccountImporter:
+    """
+    ایمپورت استریم اکانت‌های سونی از فایل.
+    ستون‌ها: username, password, region, plus, status, games, two_step_secret
+    بازی‌ها با عنوان و جداکننده‌ی , یا | یا ; یا ، مشخص می‌شوند.
+    """
+
+    def __init__(self, batch_size=BATCH_SIZE):
+        self.batch_size = batch_size
+        self.games = {
+            title.strip().lower(): game_id
+            for game_id, title in Game.objects.filter(is_deleted=False).values_list('id', 'title') if title
+        }
+        self.statuses = {
+            title.strip().lower(): status_id
+            for status_id, title in SonyAccountStatus.objects.filter(is_deleted=False).values_list('id', 'title')
+            if title
+        }
+        self.seen_usernames = set()
+        self.touched_game_ids = set()
+        self.created = 0
+        self.skipped = 0
+        self.errors = []
+
+    def _normalize(self, row):
+        errors = {}
+        data = {key.strip().lower(): value for key, value in row.items() if key}
+
+        username = _text(data.get('username'))
+        password = _text(data.get('password'))
+        if not username:
+            errors['username'] = "نام کاربری الزامی است"
+        if not password:
+            errors['password'] = "رمز عبور الزامی است"
+        # طول بیش از حد در Postgres خطای DataError می‌دهد؛ همین‌جا در گزارش ردیف ثبت می‌شود
+        for field, value in (('username', username), ('password', password)):
+            max_length = SonyAccount._meta.get_field(field).max_length
+            if len(value) > max_length:
+                errors[field] = f"حداکثر {max_length} کاراکتر مجاز است"
+
+        region = None
+        region_text = _text(data.get('region'))
+        if region_text:
+            region = REGION_ALIASES.get(region_text.lower())
+            if not region:
+                errors['region'] = f"ریجن نامعتبر: {region_text}"
+
+        plus = None
+        try:
+            plus = _parse_bool(data.get('plus'))
+        except ValueError as e:
+            errors['plus'] = str(e)
+
+        status_id = None
+        status_text = _text(data.get('status'))
+        if status_text:
+            status_id = self.statuses.get(status_text.lower())
+            if not status_id:
+                errors['status'] = f"وضعیت پیدا نشد: {status_text}"
+
+        game_ids = []
+        games_text = _text(data.get('games'))
+        for separator in GAME_SEPARATORS:
+            games_text = games_text.replace(separator, ',')
+        unknown = []
+        for title in filter(None, (part.strip() for part in games_text.split(','))):
+            game_id = self.games.get(title.lower())
+            if game_id:
+                game_ids.append(game_id)
+            else:
+                unknown.append(title)
+        if unknown:
+            errors['games'] = f"بازی‌های پیدا نشد: {', '.join(unknown)}"
+
+        secret = ''
+        try:
+            secret = _parse_secret(data.get('two_step_secret'))
+        except ValueError as e:
+            errors['two_step_secret'] = str(e)
+
+        if errors:
+            return None, errors
+
+        account = SonyAccount(
+            username=username,
+            password=password,
+            region=region,
+            plus=plus,
+            status_id=status_id,
+        )
+        if secret:
+            account.two_step_secret = encrypt_text(secret)
+            account.two_step_enabled = True
+        return (account, set(game_ids)), None
+
+    def _write_batch(self, batch):
+        """
+        batch: لیست (شماره ردیف، اکانت، id بازی‌ها)
+        """
+        usernames = [account.username for _, account, _ in batch]
+        existing = set(SonyAccount.objects.filter(username__in=usernames).values_list('username', flat=True))
+
+        fresh = []
+        for row_number, account, game_ids in batch:
+            if account.username in existing:
+                self.skipped += 1
+                self.errors.append({"row": row_number, "errors": {"username": "این نام کاربری قبلا ثبت شده"}})
+                continue
+            fresh.append((row_number, account, game_ids))
+        if not fresh:
+            return
+
+        try:
+            with transaction.atomic():
+                accounts = SonyAccount.objects.bulk_create([account for _, account, _ in fresh])
+                SonyAccountGame.objects.bulk_create([
+                    SonyAccountGame(sony_account_id=account.pk, game_id=game_id)
+                    for account, (_, _, game_ids) in zip(accounts, fresh)
+                    for game_id in game_ids
+                ])
+        except DatabaseError:
+            # احتمالا همزمان کسی همین نام کاربری‌ها را ثبت کرده؛ دسته‌های دیگر ادامه می‌دهند
+            for row_number, _, _ in fresh:
+                self.errors.append({"row": row_number, "errors": {"non_field_errors": "خطا در ذخیره‌ی این دسته"}})
+            return
+        self.created += len(fresh)
+        for _, _, game_ids in fresh:
+            self.touched_game_ids.update(game_ids)
+
+    def run(self, rows):
+        # ردیف ۱ هدر فایل است
+        numbered = enumerate(rows, start=2)
+        while True:
+            chunk = list(islice(numbered, self.batch_size))
+            if not chunk:
+                break
+            batch = []
+            for row_number, row in chunk:
+                normalized, errors = self._normalize(row)
+                if errors:
+                    self.errors.append({"row": row_number, "errors": errors})
+                    continue
+                account, game_ids = normalized
+                if account.username in self.seen_usernames:
+                    self.skipped += 1
+                    self.errors.append({"row": row_number, "errors": {"username": "نام کاربری تکراری در فایل"}})
+                    continue
+                self.seen_usernames.add(account.username)
+                batch.append((row_number, account, game_ids))
+            self._write_batch(batch)
+
+        if self.created:
+            # bulk_create سیگنال نمی‌فرستد
+            transaction.on_commit(invalidate_account_game_index)
+            transaction.on_commit(invalidate_sony_account_facets)
+            refresh_game_availability(self.touched_game_ids)
+
+        return {
+            "created": self.created,
+            "skipped": self.skipped,
+            "failed": len(self.errors) - self.skipped,
+            "errors": sorted(self.errors, key=lambda item: item["row"]),
+        }
@@ -0,0 +1,106 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import count
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class FakeIPPanelHandler(BaseHTTPRequestHandler):
+    """
+    شبیه‌ساز POST /v1/api/send با همان ساختار پاسخ IPPanel (meta.status و data.message_outbox_ids).
+    """
+    server_version = "FakeIPPanel/1.0"
+
+    def _reply(self, status_code, body):
+        raw = json.dumps(body).encode()
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _error(self, status_code, message):
+        self._reply(status_code, {"data": None, "meta": {"status": False, "message": message}})
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            payload = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._error(400, "invalid json")
+
+        if server.latency:
+            time.sleep(server.latency)
+        if not self.headers.get("Authorization"):
+            return self._error(401, "unauthorized")
+
+        recipients = (payload.get("params") or {}).get("recipients") or []
+        if not recipients or not payload.get("message"):
+            return self._error(400, "recipients and message are required")
+        if len(recipients) > server.max_recipients:
+            return self._error(400, f"at most {server.max_recipients} recipients")
+        if server.error_rate and random.random() < server.error_rate:
+            return self._error(random.choice((429, 500, 503)), "simulated failure")
+
+        outbox_id = next(server.ids)
+        with server.stats_lock:
+            server.stats["requests"] += 1
+            server.stats["recipients"] += len(recipients)
+        return self._reply(200, {
+            "data": {"message_outbox_ids": [outbox_id]},
+            "meta": {"status": True, "message": "انجام شد", "message_code": "200-1"},
+        })
+
+    def log_message(self, format, *args):
+        if self.server.verbosity > 1:
+            super().log_message(format, *args)
+
+
+def build_server(host='127.0.0.1', port=0, latency=0.0, error_rate=0.0, max_recipients=None, verbosity=1):
+    """
+    سرور جعلی آماده‌ی serve_forever (برای دستور و تست‌ها)؛ port=0 یعنی یک پورت آزاد.
+    """
+    server = ThreadingHTTPServer((host, port), FakeIPPanelHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.error_rate = error_rate
+    server.max_recipients = max_recipients or settings.IPPANEL_MAX_RECIPIENTS
+    server.verbosity = verbosity
+    server.ids = count(1)
+    server.stats = {"requests": 0, "recipients": 0}
+    server.stats_lock = threading.Lock()
+    return server
+
+
+class Command(BaseCommand):
+    help = "سرور جعلی IPPanel برای تست و بار؛ IPPANEL_SEND_URL را به آدرس آن تنظیم کنید"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8899)
+        parser.add_argument('--latency', type=float, default=0.0, help="تأخیر هر پاسخ (ثانیه)")
+        parser.add_argument('--error-rate', type=float, default=0.0, help="نسبت پاسخ‌های 429/5xx تصادفی (0 تا 1)")
+        parser.add_argument('--max-recipients', type=int, default=settings.IPPANEL_MAX_RECIPIENTS)
+
+    def handle(self, *args, **options):
+        server = build_server(
+            options['host'], options['port'],
+            latency=options['latency'],
+            error_rate=options['error_rate'],
+            max_recipients=options['max_recipients'],
+            verbosity=options['verbosity'],
+        )
+
+        self.stdout.write(f"Fake IPPanel on http://{options['host']}:{options['port']}/v1/api/send")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"requests={server.stats['requests']} recipients={server.stats['recipients']}")
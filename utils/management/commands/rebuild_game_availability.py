@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from utils.availability import rebuild_game_availability
+
+
+class Command(BaseCommand):
+    help = "بازسازی کامل جدول خلاصه‌ی موجودی اکانت هر بازی (GameAvailability)"
+
+    def handle(self, *args, **options):
+        written = rebuild_game_availability()
+        self.stdout.write(self.style.SUCCESS(f"{written} ردیف ساخته شد"))
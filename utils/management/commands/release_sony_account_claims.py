@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from utils.claims import release_expired_claims
+
+
+class Command(BaseCommand):
+    help = "اکانت‌های سونی که کارمند گرفته ولی در مهلت چک نکرده را به صف برمی‌گرداند"
+
+    def handle(self, *args, **options):
+        released = release_expired_claims()
+        self.stdout.write(self.style.SUCCESS(f"{released} اکانت به صف برگشت"))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from utils.sms_campaigns import advance_campaigns
+from utils.sms_outbox import process_outbox
+
+
+class Command(BaseCommand):
+    help = "ارسال پیامک‌های صف (OTP و گروهی) از طریق IPPanel"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--concurrency', type=int, default=4, help="تعداد درخواست هم‌زمان به IPPanel")
+        # کوتاه است چون کاربر منتظر کد OTP است
+        parser.add_argument('--idle-sleep', type=float, default=0.5, help="مکث وقتی صف خالی است (ثانیه)")
+        parser.add_argument('--campaign-chunks', type=int, default=1,
+                            help="حداکثر تکه‌ی کمپین که در هر دور در صف گذاشته می‌شود")
+        parser.add_argument('--once', action='store_true', help="فقط یک دسته بفرست و خارج شو")
+
+    def handle(self, *args, **options):
+        while True:
+            queued = advance_campaigns(options['campaign_chunks'])
+            sent, failed = process_outbox(options['batch_size'], concurrency=options['concurrency'])
+            if sent or failed or queued:
+                self.stdout.write(f"sent={sent} failed={failed} campaign_queued={queued}")
+            if options['once']:
+                break
+            if not sent and not failed and not queued:
+                time.sleep(options['idle_sleep'])
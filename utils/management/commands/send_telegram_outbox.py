@@ -0,0 +1,40 @@
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utils.telegram_outbox import (
+    process_outbox, TelegramRateLimiter, WorkerLockLost, hold_worker_lock, release_worker_lock,
+)
+
+
+class Command(BaseCommand):
+    help = "ارسال پیام‌های صف تلگرام با رعایت محدودیت نرخ تلگرام (فقط یک ورکر هم‌زمان)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--idle-sleep', type=float, default=2.0, help="مکث وقتی صف خالی است (ثانیه)")
+        parser.add_argument('--once', action='store_true', help="فقط یک دسته بفرست و خارج شو")
+
+    def handle(self, *args, **options):
+        token = uuid.uuid4().hex
+        if not hold_worker_lock(token):
+            raise CommandError("ورکر دیگری از send_telegram_outbox در حال اجراست.")
+
+        limiter = TelegramRateLimiter()
+        try:
+            while True:
+                sent, failed = process_outbox(options['batch_size'], limiter=limiter,
+                                              heartbeat=lambda: hold_worker_lock(token))
+                if sent or failed:
+                    self.stdout.write(f"sent={sent} failed={failed}")
+                if options['once']:
+                    break
+                if not sent and not failed:
+                    time.sleep(options['idle_sleep'])
+                    if not hold_worker_lock(token):
+                        raise WorkerLockLost("Telegram outbox worker lock lost")
+        except WorkerLockLost as e:
+            raise CommandError(str(e))
+        finally:
+            release_worker_lock(token)
@@ -0,0 +1,148 @@
+# utils/matching.py
+import heapq
+from collections import Counter
+from typing import Iterable
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from storage.models import SonyAccount, SonyAccountGame
+
+INDEX_CACHE_KEY = "sony_match:index"
+INDEX_VERSION_KEY = "sony_match:version"
+INDEX_CACHE_TTL = 60 * 60 * 24
+
+# کپی محلی ایندکس در هر پروسس؛ با نسخه‌ی داخل کش هماهنگ می‌شود
+_local_index = None
+_local_version = None
+
+
+class AccountGameIndex:
+    """
+    ایندکس معکوس بازی ← اکانت‌ها برای پیدا کردن سریع اکانت‌های مناسب یک سفارش.
+    برای هر اکانت مجموعه‌ی id بازی‌ها و (ریجن، در دسترس بودن) نگه داشته می‌شود.
+    """
+
+    def __init__(self, account_games: dict, account_meta: dict):
+        self.account_games = account_games
+        self.account_meta = account_meta
+        self.game_accounts = {}
+        for account_id, game_ids in account_games.items():
+            for game_id in game_ids:
+                self.game_accounts.setdefault(game_id, set()).add(account_id)
+
+    @classmethod
+    def build(cls) -> "AccountGameIndex":
+        account_meta = {
+            account_id: (region, status_id is None or bool(is_available))
+            for account_id, region, status_id, is_available in SonyAccount.objects.filter(
+                is_deleted=False
+            ).values_list('id', 'region', 'status_id', 'status__is_available')
+        }
+        games = {}
+        for account_id, game_id in SonyAccountGame.objects.filter(
+                is_deleted=False, sony_account__is_deleted=False
+        ).values_list('sony_account_id', 'game_id'):
+            games.setdefault(account_id, set()).add(game_id)
+        account_games = {account_id: frozenset(game_ids) for account_id, game_ids in games.items()}
+        return cls(account_games, account_meta)
+
+    def games_of(self, account_id) -> frozenset:
+        return self.account_games.get(account_id, frozenset())
+
+    def is_eligible(self, account_id, region: str | None = None, available_only: bool = True) -> bool:
+        meta = self.account_meta.get(account_id)
+        if meta is None:
+            return False
+        account_region, is_available = meta
+        if available_only and not is_available:
+            return False
+        if region and account_region != region:
+            return False
+        return True
+
+    def top_accounts(self, game_ids: Iterable[int], limit: int = 20, region: str | None = None,
+                     available_only: bool = True) -> list[tuple[int, int]]:
+        """
+        اکانت‌ها را بر اساس تعداد دقیق بازی‌های مشترک با سفارش رتبه‌بندی می‌کند.
+        خروجی: لیست (account_id, matching_games_count) به ترتیب نزولی.
+        در تساوی، اکانتی که بازی‌های اضافه‌ی کمتری دارد جلوتر است.
+        """
+        counts = Counter()
+        for game_id in set(game_ids):
+            for account_id in self.game_accounts.get(game_id, ()):
+                counts[account_id] += 1
+
+        candidates = (
+            (count, -len(self.account_games.get(account_id, ())), -account_id, account_id)
+            for account_id, count in counts.items()
+            if self.is_eligible(account_id, region=region, available_only=available_only)
+        )
+        return [(item[3], item[0]) for item in heapq.nlargest(limit, candidates)]
+
+
+def _current_version() -> int:
+    version = cache.get(INDEX_VERSION_KEY)
+    if version is None:
+        cache.add(INDEX_VERSION_KEY, 1, None)
+        version = cache.get(INDEX_VERSION_KEY) or 1
+    return version
+
+
+def get_account_game_index() -> AccountGameIndex:
+    """
+    ایندکس به‌روز را برمی‌گرداند: اول کپی محلی، بعد کش مشترک، در نهایت ساخت از دیتابیس.
+    """
+    global _local_index, _local_version
+    version = _current_version()
+    if _local_index is not None and _local_version == version:
+        return _local_index
+
+    shared = cache.get(INDEX_CACHE_KEY)
+    if shared and shared[0] == version:
+        index = AccountGameIndex(*shared[1])
+    else:
+        index = AccountGameIndex.build()
+        cache.set(INDEX_CACHE_KEY, (version, (index.account_games, index.account_meta)), INDEX_CACHE_TTL)
+
+    _local_index, _local_version = index, version
+    return index
+
+
+def invalidate_account_game_index() -> None:
+    """
+    بعد از هر تغییر در بازی‌ها/وضعیت اکانت‌ها صدا زده می‌شود تا همه‌ی پروسس‌ها ایندکس را تازه کنند.
+    """
+    try:
+        cache.incr(INDEX_VERSION_KEY)
+    except ValueError:
+        cache.set(INDEX_VERSION_KEY, 2, None)
+
+
+def match_accounts_for_games(game_ids: Iterable[int], limit: int = 20, region: str | None = None,
+                             available_only: bool = True):
+    """
+    top-K اکانت‌های منطبق را با prefetch بازی‌ها و فیلد matching_games_count برمی‌گرداند.
+    """
+    ranked = get_account_game_index().top_accounts(
+        game_ids, limit=limit, region=region, available_only=available_only
+    )
+    if not ranked:
+        return []
+    accounts = SonyAccount.objects.filter(id__in=[account_id for account_id, _ in ranked]) \
+        .select_related('employee').prefetch_related('games').in_bulk()
+    result = []
+    for account_id, count in ranked:
+        account = accounts.get(account_id)
+        if account is None:
+            continue
+        account.matching_games_count = count
+        result.append(account)
+    return result
+
+
+def account_availability_q(prefix: str = '') -> Q:
+    """
+    شرط «در دسترس بودن» اکانت: وضعیت ندارد یا وضعیتش is_available است.
+    """
+    return Q(**{f'{prefix}status__isnull': True}) | Q(**{f'{prefix}status__is_available': True})
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.3 on 2026-10-19 18:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('customers', '0010_alter_customer_balance'),
+        ('employees', '0026_alter_employeehire_resume_file'),
+        ('utils', '0002_smsoutbox'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SmsCampaign',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('message', models.TextField()),
+                ('send_time', models.DateTimeField(blank=True, null=True)),
+                ('customer_ids', models.JSONField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('building', 'در حال صف\u200cبندی'), ('queued', 'در صف ارسال')], default='building', max_length=20)),
+                ('cursor', models.BigIntegerField(default=0)),
+                ('total_recipients', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('queued_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sms_campaigns', to='employees.employee')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='smsoutbox',
+            name='campaign',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='outbox_messages', to='utils.smscampaign'),
+        ),
+        migrations.CreateModel(
+            name='SmsCampaignRecipient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phone', models.CharField(max_length=20)),
+                ('status', models.CharField(choices=[('pending', 'در صف'), ('sent', 'ارسال شده'), ('failed', 'ناموفق')], default='pending', max_length=20)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipients', to='utils.smscampaign')),
+                ('customer', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sms_campaign_entries', to='customers.customer')),
+                ('outbox', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='campaign_recipients', to='utils.smsoutbox')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['campaign', 'status'], name='sms_campaign_recipient_status')],
+                'constraints': [models.UniqueConstraint(fields=('campaign', 'phone'), name='sms_campaign_recipient_unique_phone')],
+            },
+        ),
+    ]
@@ -1,3 +1,142 @@
 from django.db import models
 
+from customers.models import Customer
+from employees.models import Employee
+from storage.models import SonyAccount
+
+
 # Create your models here.
+class TelegramOutbox(models.Model):
+    """
+    صف پیام‌های تلگرام؛ ورکر send_telegram_outbox آن‌ها را با رعایت محدودیت‌های تلگرام می‌فرستد.
+    """
+    chat_id = models.CharField(max_length=100)
+    text = models.TextField()
+    parse_mode = models.CharField(max_length=20, default='HTML')
+    sony_account = models.ForeignKey(SonyAccount, on_delete=models.SET_NULL, null=True, blank=True,
+                                     related_name='telegram_messages')
+    created_by = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='telegram_messages')
+    status = models.CharField(max_length=20, choices=(
+        ('pending', 'در صف'),
+        ('sent', 'ارسال شده'),
+        ('failed', 'ناموفق'),
+    ), default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    telegram_message_id = models.BigIntegerField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['next_attempt_at', 'id'],
+                condition=models.Q(status='pending'),
+                name='telegram_outbox_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'Telegram #{self.id} - {self.status}'
+
+
+class SmsOutbox(models.Model):
+    """
+    صف پیامک‌ها؛ ورکر send_sms_outbox هر ردیف را با یک درخواست به IPPanel می‌فرستد.
+    گیرنده‌های پیامک گروهی هنگام ثبت به دسته‌های IPPANEL_MAX_RECIPIENTS تایی تقسیم می‌شوند.
+    """
+    KIND_CHOICES = (
+        ('otp', 'کد ورود'),
+        ('bulk', 'گروهی'),
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default='bulk')
+    # عدد کمتر زودتر ارسال می‌شود؛ OTP همیشه جلوتر از پیامک گروهی است
+    priority = models.PositiveSmallIntegerField(default=10)
+    recipients = models.JSONField(default=list)
+    message = models.TextField()
+    send_time = models.DateTimeField(null=True, blank=True)
+    # OTP بعد از انقضای کد دیگر ارسال نمی‌شود
+    expires_at = models.DateTimeField(null=True, blank=True)
+    created_by = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='sms_messages')
+    campaign = models.ForeignKey('SmsCampaign', on_delete=models.CASCADE, null=True, blank=True,
+                                 related_name='outbox_messages')
+    status = models.CharField(max_length=20, choices=(
+        ('pending', 'در صف'),
+        ('sent', 'ارسال شده'),
+        ('failed', 'ناموفق'),
+        ('expired', 'منقضی'),
+    ), default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True)
+    provider_message_id = models.CharField(max_length=100, null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['priority', 'next_attempt_at', 'id'],
+                condition=models.Q(status='pending'),
+                name='sms_outbox_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'SMS #{self.id} ({self.kind}) - {self.status}'
+
+
+class SmsCampaign(models.Model):
+    """
+    پیامک گروهی به مشتریان؛ گیرنده‌ها در ورکر send_sms_outbox تکه‌تکه از دیتابیس خوانده و در صف گذاشته می‌شوند.
+    cursor آخرین id مشتری در صف‌رفته است تا بعد از خرابی ورکر از همان‌جا ادامه دهد.
+    """
+    message = models.TextField()
+    send_time = models.DateTimeField(null=True, blank=True)
+    # None یعنی همه‌ی مشتریان
+    customer_ids = models.JSONField(null=True, blank=True)
+    created_by = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True,
+                                   related_name='sms_campaigns')
+    status = models.CharField(max_length=20, choices=(
+        ('building', 'در حال صف‌بندی'),
+        ('queued', 'در صف ارسال'),
+    ), default='building')
+    cursor = models.BigIntegerField(default=0)
+    total_recipients = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    queued_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'Campaign #{self.id} - {self.status}'
+
+
+class SmsCampaignRecipient(models.Model):
+    campaign = models.ForeignKey(SmsCampaign, on_delete=models.CASCADE, related_name='recipients')
+    customer = models.ForeignKey(Customer, on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='sms_campaign_entries')
+    phone = models.CharField(max_length=20)
+    outbox = models.ForeignKey(SmsOutbox, on_delete=models.SET_NULL, null=True, blank=True,
+                               related_name='campaign_recipients')
+    status = models.CharField(max_length=20, choices=(
+        ('pending', 'در صف'),
+        ('sent', 'ارسال شده'),
+        ('failed', 'ناموفق'),
+    ), default='pending')
+    error = models.TextField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['campaign', 'phone'], name='sms_campaign_recipient_unique_phone'),
+        ]
+        indexes = [
+            models.Index(fields=['campaign', 'status'], name='sms_campaign_recipient_status'),
+        ]
+
+    def __str__(self):
+        return f'{self.phone} ({self.status})'
@@ -0,0 +1,98 @@
+# utils/otp.py
+import threading
+import time
+from collections import OrderedDict
+
+import pyotp
+from cryptography.fernet import InvalidToken
+
+from utils.crypto import decrypt_text
+
+TOTP_CACHE_TTL = 10 * 60
+TOTP_CACHE_MAX_SIZE = 2048
+
+
+class OTPError(Exception):
+    pass
+
+
+class _Entry:
+    __slots__ = ('totp', 'expires_at', 'current')
+
+    def __init__(self, totp, expires_at):
+        self.totp = totp
+        self.expires_at = expires_at
+        # (شماره‌ی پنجره، کد) با یک انتساب عوض می‌شود تا بین تردها ناهماهنگ نشود
+        self.current = (None, None)
+
+
+class TOTPEngine:
+    """
+    کش داخل پروسس برای TOTPهای رمزگشایی‌شده.
+    کلید کش (id اکانت، متن رمزشده) است؛ پس اگر secret عوض شود ورودی قبلی خودبه‌خود استفاده نمی‌شود.
+    کد هر پنجره‌ی ۳۰ ثانیه‌ای هم یک بار حساب و نگه داشته می‌شود.
+    """
+
+    def __init__(self, ttl=TOTP_CACHE_TTL, max_size=TOTP_CACHE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_entry(self, account_id, encrypted_secret, now):
+        key = (account_id, encrypted_secret)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                return entry
+
+        try:
+            totp = pyotp.TOTP(decrypt_text(encrypted_secret))
+        except (InvalidToken, ValueError):
+            raise OTPError("secret ذخیره‌شده معتبر نیست")
+        entry = _Entry(totp, now + self.ttl)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def code_for(self, account_id, encrypted_secret, now=None) -> dict:
+        if not encrypted_secret:
+            raise OTPError("2FA is not enabled for this account")
+        now = now if now is not None else time.time()
+        entry = self._get_entry(account_id, encrypted_secret, now)
+        interval = entry.totp.interval
+        window = int(now) // interval
+        cached_window, code = entry.current
+        if cached_window != window:
+            try:
+                code = entry.totp.at(window * interval)
+            except Exception:
+                raise OTPError("secret ذخیره‌شده معتبر نیست")
+            entry.current = (window, code)
+        return {"code": code, "remaining": interval - (int(now) % interval)}
+
+    def codes_for(self, secrets: dict, now=None) -> tuple[dict, dict]:
+        """
+        secrets: {account_id: two_step_secret}
+        خروجی: (کدها، خطاها) هر دو بر اساس id اکانت؛ همه برای یک لحظه‌ی یکسان.
+        """
+        now = now if now is not None else time.time()
+        codes, errors = {}, {}
+        for account_id, encrypted_secret in secrets.items():
+            try:
+                codes[account_id] = self.code_for(account_id, encrypted_secret, now=now)
+            except OTPError as e:
+                errors[account_id] = str(e)
+        return codes, errors
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+totp_engine = TOTPEngine()
@@ -0,0 +1,12 @@
+# utils/redis_client.py
+from django_redis import get_redis_connection
+
+
+def get_redis():
+    """
+    اتصال خام Redis کش پیش‌فرض؛ اگر بک‌اند کش Redis نباشد (مثلا در تست‌ها) None.
+    """
+    try:
+        return get_redis_connection("default")
+    except NotImplementedError:
+        return None
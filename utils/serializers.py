@@ -3,6 +3,8 @@ from rest_framework import serializers
 from employees.serializers import SoftDeleteSerializerMixin
 from payments.models import GameOrder
 from storage.models import SonyAccount
+from utils.models import TelegramOutbox, SmsOutbox, SmsCampaign, SmsCampaignRecipient
+from utils.sms_campaigns import campaign_progress
 
 
 class Set2FAURISerializer(serializers.Serializer):
@@ -14,6 +16,14 @@ class OTPSerializer(serializers.Serializer):
     remaining = serializers.IntegerField()
 
 
+class BatchOTPRequestSerializer(serializers.Serializer):
+    account_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=100)
+
+    def validate_account_ids(self, value):
+        # حذف تکراری‌ها با حفظ ترتیب
+        return list(dict.fromkeys(value))
+
+
 class SonyAccountSerializer(serializers.ModelSerializer):
     class Meta:
         model = SonyAccount
@@ -71,3 +81,69 @@ class SonyAccountCreateSerializer(serializers.ModelSerializer):
 
 class SonyAccountAddFromFileSerializer(serializers.Serializer):
     file = serializers.FileField()
+
+
+class AssignmentPlanItemSerializer(serializers.Serializer):
+    order_id = serializers.IntegerField()
+    account_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+    covered_game_ids = serializers.ListField(child=serializers.IntegerField(), read_only=True)
+    uncovered_game_ids = serializers.ListField(child=serializers.IntegerField(), read_only=True)
+
+
+class ApplyAssignmentPlanSerializer(serializers.Serializer):
+    plan = AssignmentPlanItemSerializer(many=True, allow_empty=False)
+    available_only = serializers.BooleanField(default=True)
+
+    def validate_plan(self, value):
+        order_ids = [item['order_id'] for item in value]
+        if len(order_ids) != len(set(order_ids)):
+            raise serializers.ValidationError("هر سفارش فقط یک بار می‌تواند در برنامه باشد")
+        return value
+
+
+class TelegramBulkPublishSerializer(serializers.Serializer):
+    account_ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=500)
+    chat_id = serializers.CharField(required=False, allow_blank=False)
+
+
+class TelegramOutboxSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TelegramOutbox
+        fields = ['id', 'chat_id', 'sony_account', 'status', 'attempts', 'next_attempt_at', 'last_error',
+                  'telegram_message_id', 'sent_at', 'created_at']
+
+
+class SmsOutboxSerializer(serializers.ModelSerializer):
+    recipients_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SmsOutbox
+        fields = ['id', 'kind', 'recipients_count', 'message', 'send_time', 'status', 'attempts', 'next_attempt_at',
+                  'last_error', 'provider_message_id', 'sent_at', 'created_at']
+
+    def get_recipients_count(self, obj):
+        return len(obj.recipients)
+
+
+class SmsCampaignSerializer(serializers.ModelSerializer):
+    customer_ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_null=True,
+                                         help_text="خالی یعنی همه‌ی مشتریان")
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SmsCampaign
+        fields = ['id', 'message', 'send_time', 'customer_ids', 'status', 'total_recipients', 'progress',
+                  'created_at', 'queued_at']
+        read_only_fields = ['status', 'total_recipients', 'created_at', 'queued_at']
+
+    def get_progress(self, obj):
+        # در لیست محاسبه نمی‌شود تا هر ردیف یک aggregate جدا نزند
+        if not self.context.get('with_progress'):
+            return None
+        return campaign_progress(obj)
+
+
+class SmsCampaignRecipientSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SmsCampaignRecipient
+        fields = ['id', 'customer', 'phone', 'status', 'error', 'updated_at']
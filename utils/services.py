@@ -51,6 +51,25 @@ def fetch_account_with_games(account_id: int) -> SonyAccount:
     )
 
 
+def fetch_accounts_with_games(account_ids: Iterable[int]) -> list[SonyAccount]:
+    """
+    مثل fetch_account_with_games برای چند اکانت، با همان تعداد کوئری ثابت.
+    """
+    return list(
+        SonyAccount.objects
+        .filter(id__in=account_ids, is_deleted=False)
+        .select_related("status", "bank_account", "employee")
+        .prefetch_related(
+            Prefetch(
+                "account_games",
+                queryset=SonyAccountGame.objects.filter(is_deleted=False).select_related("game"),
+                to_attr="account_games_active",
+            ),
+        )
+        .order_by("id")
+    )
+
+
 def build_account_message(account: SonyAccount) -> str:
     """
     پیام HTML-safe برای تلگرام می‌سازد.
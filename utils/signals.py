@@ -0,0 +1,106 @@
+# utils/signals.py
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete
+from django.dispatch import receiver
+
+from storage.models import SonyAccount, SonyAccountGame, SonyAccountStatus
+from utils.availability import refresh_game_availability, games_of_accounts, games_of_status
+from utils.facets import invalidate_sony_account_facets
+from utils.matching import invalidate_account_game_index
+
+# فیلدهایی از اکانت که در ایندکس تطبیق استفاده می‌شوند
+MATCHING_ACCOUNT_FIELDS = {'region', 'status', 'is_deleted'}
+_UNKNOWN = object()
+
+
+def _schedule_invalidation(index=True):
+    # بعد از commit تا پروسس‌های دیگر ایندکس را با داده‌ی قدیمی نسازند
+    if index:
+        transaction.on_commit(invalidate_account_game_index)
+    transaction.on_commit(invalidate_sony_account_facets)
+
+
+# بازی‌هایی که در تراکنش جاری تغییر کرده‌اند و هنوز به‌روز نشده‌اند (هر thread اتصال خودش را دارد)
+_pending = threading.local()
+
+
+def _refresh_pending_availability():
+    """
+    callback بعد از commit؛ همه‌ی بازی‌های جمع‌شده را با هم به‌روز می‌کند و مجموعه را خالی می‌کند.
+    callbackهای بعدی همان تراکنش کاری برای انجام ندارند.
+    """
+    game_ids = getattr(_pending, 'game_ids', None)
+    _pending.game_ids = set()
+    if game_ids:
+        refresh_game_availability(game_ids)
+
+
+def _schedule_availability_refresh(game_ids):
+    if not game_ids:
+        return
+    if getattr(_pending, 'game_ids', None) is None:
+        _pending.game_ids = set()
+    # اگر تراکنش قبلی rollback شده باشد شناسه‌هایش اینجا می‌مانند و فقط یک بار اضافه حساب می‌شوند
+    _pending.game_ids.update(game_ids)
+    transaction.on_commit(_refresh_pending_availability)
+
+
+@receiver([post_save, post_delete], sender=SonyAccountGame)
+def sony_account_game_changed(sender, instance, **kwargs):
+    _schedule_invalidation()
+    _schedule_availability_refresh({instance.game_id})
+
+
+def _matching_values(instance):
+    # فیلدهای defer شده در __dict__ نیستند و «نامعلوم» حساب می‌شوند
+    return tuple(
+        instance.__dict__.get(SonyAccount._meta.get_field(name).attname, _UNKNOWN)
+        for name in sorted(MATCHING_ACCOUNT_FIELDS)
+    )
+
+
+@receiver(post_init, sender=SonyAccount)
+def remember_matching_fields(sender, instance, **kwargs):
+    # مقادیر زمان بارگذاری؛ ذخیره‌هایی که ریجن/وضعیت/حذف را عوض نکرده‌اند ایندکس را باطل نمی‌کنند
+    instance._loaded_matching = _matching_values(instance)
+
+
+@receiver(post_save, sender=SonyAccount)
+def sony_account_saved(sender, instance, created=False, update_fields=None, **kwargs):
+    # اکانت تازه هنوز بازی ندارد؛ ثبت بازی‌هایش ایندکس را باطل می‌کند
+    index_changed = False
+    if not created and (update_fields is None or MATCHING_ACCOUNT_FIELDS & set(update_fields)):
+        previous = getattr(instance, '_loaded_matching', None)
+        current = _matching_values(instance)
+        index_changed = previous is None or _UNKNOWN in previous or previous != current
+    instance._loaded_matching = _matching_values(instance)
+
+    _schedule_invalidation(index=index_changed)
+    if index_changed:
+        _schedule_availability_refresh(games_of_accounts([instance.pk]))
+
+
+@receiver(post_delete, sender=SonyAccount)
+def sony_account_deleted(sender, instance, **kwargs):
+    _schedule_invalidation()
+
+
+@receiver(post_save, sender=SonyAccountStatus)
+def sony_account_status_changed(sender, instance, created=False, **kwargs):
+    _schedule_invalidation()
+    if not created:
+        _schedule_availability_refresh(games_of_status(instance.pk))
+
+
+@receiver(pre_delete, sender=SonyAccountStatus)
+def sony_account_status_deleting(sender, instance, **kwargs):
+    # بعد از حذف، status اکانت‌ها null می‌شود و دیگر نمی‌شود پیدایشان کرد
+    instance._affected_game_ids = games_of_status(instance.pk)
+
+
+@receiver(post_delete, sender=SonyAccountStatus)
+def sony_account_status_deleted(sender, instance, **kwargs):
+    _schedule_invalidation()
+    _schedule_availability_refresh(getattr(instance, '_affected_game_ids', set()))
@@ -0,0 +1,96 @@
+import logging
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class SmsError(Exception):
+    """خطای ارسال پیامک از IPPanel."""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+    @property
+    def is_retryable(self) -> bool:
+        # خطای شبکه، 429 و 5xx دوباره امتحان می‌شوند؛ خطای اعتبارسنجی (4xx) نه
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
+
+
+def get_session() -> requests.Session:
+    """
+    یک Session مشترک با connection pool برای همه‌ی درخواست‌های IPPanel.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)  # سرور جعلی fake_ippanel
+                _session = session
+    return _session
+
+
+def normalize_phone(phone: str) -> str:
+    # 09121234567 -> +989121234567
+    phone = phone.strip()
+    if phone.startswith('+'):
+        return phone
+    if phone.startswith('0'):
+        return '+98' + phone[1:]
+    return '+' + phone
+
+
+def send_sms(recipients: list[str], message: str, send_time=None) -> dict:
+    """
+    ارسال یک پیام به حداکثر IPPANEL_MAX_RECIPIENTS گیرنده در یک درخواست.
+    خروجی: پاسخ JSON سرویس؛ در صورت خطا SmsError.
+    """
+    if not settings.FARAZ_API_KEY:
+        raise SmsError("FARAZ_API_KEY تنظیم نشده است.", status_code=400)
+
+    payload = {
+        "sending_type": "webservice",
+        "from_number": settings.IPPANEL_FROM_NUMBER,
+        "message": message,
+        "params": {
+            "recipients": [normalize_phone(phone) for phone in recipients],
+        },
+    }
+    if send_time:
+        payload["send_time"] = send_time.strftime("%Y-%m-%d %H:%M:%S")
+    headers = {"Authorization": settings.FARAZ_API_KEY}
+
+    try:
+        resp = get_session().post(settings.IPPANEL_SEND_URL, json=payload, headers=headers,
+                                  timeout=settings.IPPANEL_TIMEOUT)
+    except requests.RequestException as e:
+        raise SmsError(f"خطا در ارتباط با سرویس پیامک: {e}") from e
+
+    try:
+        data = resp.json()
+    except ValueError:
+        data = {}
+
+    meta = data.get("meta") or {}
+    if resp.status_code != 200:
+        raise SmsError(f"کد وضعیت نامعتبر از IPPanel: {resp.status_code} {meta.get('message', '')}".strip(),
+                       status_code=resp.status_code)
+    if meta.get("status") is not True:
+        # پاسخ 200 با status=false خطای منطقی است (مثلا اعتبار ناکافی) و تکرارش فایده‌ای ندارد
+        raise SmsError(f"خطا در ارسال پیامک: {meta.get('message', 'نامشخص')}", status_code=400)
+    return data
+
+
+def provider_message_id(data: dict):
+    ids = (data.get("data") or {}).get("message_outbox_ids") or []
+    return str(ids[0]) if ids else None
@@ -0,0 +1,127 @@
+# utils/sms_campaigns.py
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from customers.models import Customer
+from utils.models import SmsCampaign, SmsCampaignRecipient, SmsOutbox
+from utils.sms_outbox import BULK_PRIORITY
+
+# تعداد مشتری‌هایی که در هر مرحله از دیتابیس خوانده می‌شود
+CAMPAIGN_CHUNK_SIZE = 1000
+# تا وقتی این تعداد پیام از یک کمپین در صف مانده، تکه‌ی بعدی خوانده نمی‌شود
+CAMPAIGN_MAX_PENDING = 50
+
+
+def create_campaign(message, customer_ids=None, send_time=None, created_by=None) -> SmsCampaign:
+    return SmsCampaign.objects.create(
+        message=message,
+        customer_ids=sorted(set(customer_ids)) if customer_ids else None,
+        send_time=send_time,
+        created_by=created_by,
+    )
+
+
+def recipients_of(customer_ids=None):
+    """
+    مشتریان دارای شماره؛ بدون customer_ids همه‌ی مشتریان حذف‌نشده.
+    مشتریانی که صریحا انتخاب شده‌اند مثل قبل بدون توجه به is_deleted پیامک می‌گیرند.
+    """
+    queryset = Customer.objects.filter(user__isnull=False).exclude(user__phone='')
+    if customer_ids is None:
+        return queryset.filter(is_deleted=False)
+    return queryset.filter(id__in=customer_ids)
+
+
+def audience(campaign: SmsCampaign):
+    return recipients_of(campaign.customer_ids)
+
+
+def _next_chunk(campaign: SmsCampaign, chunk_size: int) -> list[tuple[int, str]]:
+    # keyset روی id؛ هیچ‌وقت کل مشتری‌ها در حافظه نیستند
+    return list(
+        audience(campaign).filter(id__gt=campaign.cursor)
+        .order_by('id').values_list('id', 'user__phone')[:chunk_size]
+    )
+
+
+def advance_campaign(chunk_size: int = CAMPAIGN_CHUNK_SIZE) -> int:
+    """
+    یک تکه از یک کمپین در حال صف‌بندی را در SmsOutbox می‌گذارد.
+    ردیف‌های صف، گیرنده‌ها و cursor در یک تراکنش ثبت می‌شوند، پس بعد از خرابی نه تکراری داریم نه جاافتاده.
+    خروجی: تعداد گیرنده‌های اضافه‌شده
+    """
+    # FOR UPDATE با GROUP BY مجاز نیست؛ اول کمپین‌های کم‌صف پیدا و بعد یکی قفل می‌شود
+    candidate_ids = list(
+        SmsCampaign.objects.filter(status='building')
+        .annotate(pending=Count('outbox_messages', filter=Q(outbox_messages__status='pending')))
+        .filter(pending__lt=CAMPAIGN_MAX_PENDING)
+        .order_by('id').values_list('id', flat=True)[:10]
+    )
+    if not candidate_ids:
+        return 0
+
+    with transaction.atomic():
+        campaign = (
+            SmsCampaign.objects.select_for_update(skip_locked=True)
+            .filter(id__in=candidate_ids, status='building')
+            .order_by('id')
+            .first()
+        )
+        if campaign is None:
+            return 0
+
+        rows = _next_chunk(campaign, chunk_size)
+        if not rows:
+            campaign.status = 'queued'
+            campaign.queued_at = timezone.now()
+            campaign.save(update_fields=['status', 'queued_at'])
+            return 0
+
+        now = timezone.now()
+        batch_size = settings.IPPANEL_MAX_RECIPIENTS
+        batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+        outbox = SmsOutbox.objects.bulk_create([
+            SmsOutbox(
+                kind='bulk',
+                priority=BULK_PRIORITY,
+                recipients=[phone for _, phone in batch],
+                message=campaign.message,
+                send_time=campaign.send_time,
+                created_by_id=campaign.created_by_id,
+                campaign=campaign,
+                next_attempt_at=now,
+            )
+            for batch in batches
+        ])
+        SmsCampaignRecipient.objects.bulk_create([
+            SmsCampaignRecipient(campaign=campaign, customer_id=customer_id, phone=phone, outbox=message)
+            for message, batch in zip(outbox, batches)
+            for customer_id, phone in batch
+        ])
+
+        campaign.cursor = rows[-1][0]
+        campaign.total_recipients += len(rows)
+        campaign.save(update_fields=['cursor', 'total_recipients'])
+    return len(rows)
+
+
+def advance_campaigns(max_chunks: int = 1, chunk_size: int = CAMPAIGN_CHUNK_SIZE) -> int:
+    added = 0
+    for _ in range(max_chunks):
+        count = advance_campaign(chunk_size)
+        if not count:
+            break
+        added += count
+    return added
+
+
+def campaign_progress(campaign: SmsCampaign) -> dict:
+    counts = campaign.recipients.aggregate(
+        pending=Count('id', filter=Q(status='pending')),
+        sent=Count('id', filter=Q(status='sent')),
+        failed=Count('id', filter=Q(status='failed')),
+    )
+    counts['completed'] = campaign.status == 'queued' and counts['pending'] == 0
+    return counts
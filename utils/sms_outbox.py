@@ -0,0 +1,202 @@
+# utils/sms_outbox.py
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from utils.models import SmsCampaignRecipient, SmsOutbox
+from utils.sms import SmsError, provider_message_id, send_sms
+from utils.telegram_outbox import backoff_delay
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 5
+# OTP عمر کوتاهی دارد؛ بیشتر از این تکرار فایده‌ای ندارد
+OTP_MAX_ATTEMPTS = 3
+# lease هر دسته از اندازه‌ی آن محاسبه می‌شود (claim_lease)؛ این حاشیه برای ثبت نتیجه‌هاست
+CLAIM_MARGIN = 30
+
+FINAL_STATUSES = ('sent', 'failed', 'expired')
+
+OTP_PRIORITY = 0
+BULK_PRIORITY = 10
+
+
+def chunk_recipients(recipients, size=None) -> list[list[str]]:
+    """
+    حذف شماره‌های تکراری (با حفظ ترتیب) و تقسیم به دسته‌های مجاز سرویس.
+    """
+    size = size or settings.IPPANEL_MAX_RECIPIENTS
+    unique = list(dict.fromkeys(phone for phone in recipients if phone))
+    return [unique[i:i + size] for i in range(0, len(unique), size)]
+
+
+def enqueue_sms(recipients, message, send_time=None, created_by=None) -> list[SmsOutbox]:
+    """
+    پیامک گروهی؛ برای هر دسته از گیرنده‌ها یک ردیف در صف.
+    """
+    now = timezone.now()
+    return SmsOutbox.objects.bulk_create([
+        SmsOutbox(
+            kind='bulk',
+            priority=BULK_PRIORITY,
+            recipients=batch,
+            message=message,
+            send_time=send_time,
+            created_by=created_by,
+            next_attempt_at=now,
+        )
+        for batch in chunk_recipients(recipients)
+    ])
+
+
+def enqueue_otp(phone, message, expires_at) -> SmsOutbox:
+    return SmsOutbox.objects.create(
+        kind='otp',
+        priority=OTP_PRIORITY,
+        recipients=[phone],
+        message=message,
+        expires_at=expires_at,
+        next_attempt_at=timezone.now(),
+    )
+
+
+def request_budget() -> float:
+    # timeout برای اتصال و خواندن جدا اعمال می‌شود؛ بدترین حالت یک درخواست دو برابر آن است
+    return 2 * settings.IPPANEL_TIMEOUT
+
+
+def claim_lease(batch_size: int, concurrency: int) -> float:
+    """
+    مدت lease یک دسته: همه‌ی درخواست‌ها در بدترین حالت (timeout) به‌همراه حاشیه.
+    """
+    rounds = math.ceil(batch_size / max(1, concurrency))
+    return rounds * request_budget() + CLAIM_MARGIN
+
+
+def claim_batch(batch_size: int, lease_seconds: float) -> list[SmsOutbox]:
+    """
+    پیام‌های آماده‌ی ارسال (اول OTP) را برمی‌دارد و برای مدت lease از دید ورکرهای دیگر پنهان می‌کند.
+    مقدار next_attempt_at هر نمونه همان lease است و ثبت نتیجه به آن مشروط می‌شود.
+    """
+    now = timezone.now()
+    lease = now + timedelta(seconds=lease_seconds)
+    with transaction.atomic():
+        messages = list(
+            SmsOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('priority', 'next_attempt_at', 'id')[:batch_size]
+        )
+        if messages:
+            SmsOutbox.objects.filter(id__in=[message.id for message in messages]).update(next_attempt_at=lease)
+    for message in messages:
+        message.next_attempt_at = lease
+    return messages
+
+
+def _update_if_held(message: SmsOutbox, **fields) -> bool:
+    # فقط اگر ردیف هنوز با lease همین ورکر قفل است؛ پیامک دوباره فرستاده نمی‌شود و نتیجه رونویسی نمی‌شود
+    if message.kind == 'otp' and fields.get('status') in FINAL_STATUSES:
+        # متن OTP شامل کد است؛ بعد از پایان کار ردیف نگه داشته نمی‌شود
+        fields['message'] = ''
+    updated = SmsOutbox.objects.filter(
+        id=message.id, status='pending', next_attempt_at=message.next_attempt_at,
+    ).update(updated_at=timezone.now(), **fields)
+    return bool(updated)
+
+
+def _send(message: SmsOutbox, deadline: float):
+    """
+    فقط درخواست HTTP؛ بدون دسترسی به دیتابیس تا در thread جدا امن باشد.
+    اگر تا پایان lease وقت یک درخواست کامل نمانده ارسال نمی‌شود (خروجی None).
+    """
+    if time.monotonic() + request_budget() > deadline:
+        return None
+    try:
+        return send_sms(message.recipients, message.message, send_time=message.send_time), None
+    except SmsError as e:
+        return None, e
+
+
+def _record(message: SmsOutbox, data, error) -> bool:
+    attempts = message.attempts + 1
+    if error is not None:
+        max_attempts = OTP_MAX_ATTEMPTS if message.kind == 'otp' else MAX_ATTEMPTS
+        fields = {'attempts': attempts, 'last_error': str(error)}
+        if error.is_retryable and attempts < max_attempts:
+            fields['next_attempt_at'] = timezone.now() + timedelta(seconds=backoff_delay(attempts))
+        else:
+            fields['status'] = 'failed'
+        held = _update_if_held(message, **fields)
+        logger.warning("SMS outbox #%s failed (attempt %s): %s", message.id, attempts, error)
+        if held and fields.get('status') == 'failed':
+            _record_recipients(message, 'failed', fields['last_error'])
+        return False
+
+    held = _update_if_held(
+        message,
+        attempts=attempts,
+        status='sent',
+        sent_at=timezone.now(),
+        last_error=None,
+        provider_message_id=provider_message_id(data),
+    )
+    if held:
+        _record_recipients(message, 'sent', None)
+    else:
+        logger.error("SMS outbox #%s sent after its lease expired", message.id)
+    return True
+
+
+def _record_recipients(message: SmsOutbox, status, error):
+    # نتیجه‌ی هر گیرنده‌ی کمپین همان نتیجه‌ی درخواستی است که در آن ارسال شده
+    if message.campaign_id:
+        SmsCampaignRecipient.objects.filter(outbox=message).update(
+            status=status, error=error, updated_at=timezone.now(),
+        )
+
+
+def _expire(messages: list[SmsOutbox]) -> list[SmsOutbox]:
+    now = timezone.now()
+    expired = [message.id for message in messages if message.expires_at and message.expires_at <= now]
+    if expired:
+        # فقط OTP تاریخ انقضا دارد؛ متن حاوی کد هم پاک می‌شود
+        SmsOutbox.objects.filter(id__in=expired).update(status='expired', message='', updated_at=now)
+    return [message for message in messages if message.id not in expired]
+
+
+def process_outbox(batch_size: int = 50, concurrency: int = 4) -> tuple[int, int]:
+    """
+    یک دسته از صف را می‌فرستد؛ درخواست‌های HTTP هم‌زمان و ثبت نتیجه در همین thread.
+    خروجی: (تعداد موفق، تعداد ناموفق)
+    """
+    lease_seconds = claim_lease(batch_size, concurrency)
+    deadline = time.monotonic() + lease_seconds - CLAIM_MARGIN
+    messages = _expire(claim_batch(batch_size, lease_seconds))
+    if not messages:
+        return 0, 0
+
+    send = partial(_send, deadline=deadline)
+    if concurrency > 1 and len(messages) > 1:
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(messages))) as pool:
+            results = list(pool.map(send, messages))
+    else:
+        results = [send(message) for message in messages]
+
+    sent = failed = 0
+    now = timezone.now()
+    for message, result in zip(messages, results):
+        if result is None:
+            # وقت lease تمام شد؛ بدون انتظار به صف برمی‌گردد
+            _update_if_held(message, next_attempt_at=now)
+        elif _record(message, *result):
+            sent += 1
+        else:
+            failed += 1
+    return sent, failed
@@ -1,12 +1,42 @@
 import logging
+import threading
+
 import requests
 from django.conf import settings
+from requests.adapters import HTTPAdapter
 
 logger = logging.getLogger(__name__)
 
+_session = None
+_session_lock = threading.Lock()
+
+
 class TelegramError(Exception):
     """خطای اختصاصی برای ارسال پیام تلگرام."""
-    pass
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def is_retryable(self) -> bool:
+        # خطای شبکه، 429 و 5xx دوباره امتحان می‌شوند؛ بقیه (مثلا 400) نه
+        return self.status_code is None or self.status_code == 429 or self.status_code >= 500
+
+
+def get_session() -> requests.Session:
+    """
+    یک Session مشترک با connection pool برای همه‌ی درخواست‌های تلگرام.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+                _session = session
+    return _session
 
 
 def send_telegram_message(
@@ -40,19 +70,28 @@ def send_telegram_message(
     }
 
     try:
-        resp = requests.post(url, json=payload, timeout=settings.TELEGRAM_TIMEOUT)
+        resp = get_session().post(url, json=payload, timeout=settings.TELEGRAM_TIMEOUT)
     except requests.RequestException as e:
         logger.exception("ارسال پیام به تلگرام شکست خورد.")
         raise TelegramError(f"خطا در اتصال به تلگرام: {e}") from e
 
+    try:
+        data = resp.json()
+    except ValueError:
+        data = {}
+
     if resp.status_code != 200:
         logger.error("Telegram non-200: %s - %s", resp.status_code, resp.text)
-        raise TelegramError(f"کد وضعیت نامعتبر از تلگرام: {resp.status_code}")
+        retry_after = (data.get("parameters") or {}).get("retry_after")
+        raise TelegramError(
+            f"کد وضعیت نامعتبر از تلگرام: {resp.status_code}",
+            status_code=resp.status_code,
+            retry_after=retry_after,
+        )
 
-    data = resp.json()
     if not data.get("ok"):
         logger.error("Telegram error: %s", data)
         # مثال خطا: {"ok": false, "error_code": 400, "description": "Bad Request: CHAT_ADMIN_REQUIRED"}
-        raise TelegramError(f"ارسال پیام ناموفق: {data}")
+        raise TelegramError(f"ارسال پیام ناموفق: {data}", status_code=data.get("error_code"))
 
     return data
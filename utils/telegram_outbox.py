@@ -0,0 +1,241 @@
+# utils/telegram_outbox.py
+import logging
+import random
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from utils.models import TelegramOutbox
+from utils.services import build_account_message
+from utils.telegram import send_telegram_message, TelegramError
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 2
+BACKOFF_MAX = 15 * 60
+# مدتی که پیام برداشته‌شده برای ورکرهای دیگر قفل می‌ماند؛ قبل از ارسال هر پیام جداگانه تمدید می‌شود
+CLAIM_LEASE = 2 * 60
+MESSAGE_LEASE_MARGIN = 10
+
+# محدودیت‌های تلگرام: حدود ۳۰ پیام در ثانیه برای کل ربات،
+# یک پیام در ثانیه برای هر چت خصوصی و ۲۰ پیام در دقیقه برای گروه/کانال
+GLOBAL_RATE = 30
+PRIVATE_CHAT_RATE = 1
+GROUP_CHAT_RATE = 20 / 60
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.blocked_until = 0.0
+
+    def reserve(self) -> float:
+        """
+        یک توکن رزرو می‌کند و مدت انتظار لازم قبل از ارسال را برمی‌گرداند.
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        self.tokens -= 1
+        wait = 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+        return max(wait, self.blocked_until - now)
+
+    def block(self, seconds: float):
+        # بعد از 429 تا retry_after هیچ پیامی به این چت نمی‌رود
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class TelegramRateLimiter:
+    def __init__(self):
+        self.global_bucket = TokenBucket(GLOBAL_RATE, capacity=GLOBAL_RATE)
+        self.chat_buckets = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _chat_rate(chat_id: str) -> float:
+        # id گروه‌ها و کانال‌ها منفی است یا با @ شروع می‌شود
+        return GROUP_CHAT_RATE if chat_id.startswith(('-', '@')) else PRIVATE_CHAT_RATE
+
+    def _bucket(self, chat_id: str) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self._chat_rate(chat_id))
+        return bucket
+
+    def wait(self, chat_id: str):
+        with self._lock:
+            delay = max(self.global_bucket.reserve(), self._bucket(chat_id).reserve())
+        if delay > 0:
+            time.sleep(delay)
+
+    def block(self, chat_id: str, seconds: float):
+        with self._lock:
+            self._bucket(chat_id).block(seconds)
+
+
+def backoff_delay(attempts: int, retry_after=None) -> float:
+    if retry_after:
+        return float(retry_after)
+    delay = min(BACKOFF_MAX, BACKOFF_BASE ** attempts)
+    return delay + random.uniform(0, delay / 4)
+
+
+def enqueue_accounts(accounts, chat_id=None, created_by=None) -> list[TelegramOutbox]:
+    """
+    برای هر اکانت (با بازی‌های prefetch‌شده) یک پیام در صف ثبت می‌کند.
+    """
+    chat_id = str(chat_id or settings.TELEGRAM_CHANNEL_ID)
+    now = timezone.now()
+    return TelegramOutbox.objects.bulk_create([
+        TelegramOutbox(
+            chat_id=chat_id,
+            text=build_account_message(account),
+            sony_account=account,
+            created_by=created_by,
+            next_attempt_at=now,
+        )
+        for account in accounts
+    ])
+
+
+def claim_batch(batch_size: int) -> list[TelegramOutbox]:
+    """
+    پیام‌های آماده‌ی ارسال را برمی‌دارد و برای مدت CLAIM_LEASE از دید ورکرهای دیگر پنهان می‌کند.
+    مقدار next_attempt_at هر نمونه همان lease است و نوشتن‌های بعدی به آن مشروط می‌شوند.
+    """
+    now = timezone.now()
+    lease = now + timedelta(seconds=CLAIM_LEASE)
+    with transaction.atomic():
+        messages = list(
+            TelegramOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if messages:
+            TelegramOutbox.objects.filter(id__in=[message.id for message in messages]).update(next_attempt_at=lease)
+    for message in messages:
+        message.next_attempt_at = lease
+    return messages
+
+
+def _update_if_held(message: TelegramOutbox, **fields) -> bool:
+    # فقط اگر ردیف هنوز با lease همین ورکر قفل است؛ وگرنه ورکر دیگری آن را برداشته
+    updated = TelegramOutbox.objects.filter(
+        id=message.id, status='pending', next_attempt_at=message.next_attempt_at,
+    ).update(updated_at=timezone.now(), **fields)
+    return bool(updated)
+
+
+def renew_lease(message: TelegramOutbox) -> bool:
+    """
+    درست قبل از ارسال lease فقط برای همین پیام تمدید می‌شود (به اندازه‌ی timeout درخواست).
+    انتظار برای محدودیت نرخ ممکن است از lease دسته بیشتر شود؛ اگر پیام را از دست داده‌ایم ارسال نمی‌شود.
+    """
+    lease = timezone.now() + timedelta(seconds=settings.TELEGRAM_TIMEOUT + MESSAGE_LEASE_MARGIN)
+    if not _update_if_held(message, next_attempt_at=lease):
+        return False
+    message.next_attempt_at = lease
+    return True
+
+
+def release(messages) -> None:
+    # پیام‌های ارسال‌نشده‌ی دسته بدون انتظار تا پایان lease به صف برمی‌گردند
+    now = timezone.now()
+    for message in messages:
+        _update_if_held(message, next_attempt_at=now)
+
+
+def deliver(message: TelegramOutbox, limiter: TelegramRateLimiter) -> bool | None:
+    """
+    خروجی: True ارسال شد، False خطا، None ارسال نشد چون lease از دست رفته بود.
+    """
+    limiter.wait(message.chat_id)
+    if not renew_lease(message):
+        logger.warning("Telegram outbox #%s lease lost; skipped", message.id)
+        return None
+
+    attempts = message.attempts + 1
+    try:
+        data = send_telegram_message(message.text, chat_id=message.chat_id, parse_mode=message.parse_mode)
+    except TelegramError as e:
+        if e.status_code == 429 and e.retry_after:
+            limiter.block(message.chat_id, e.retry_after)
+        fields = {'attempts': attempts, 'last_error': str(e)}
+        if e.is_retryable and attempts < MAX_ATTEMPTS:
+            fields['next_attempt_at'] = timezone.now() + timedelta(seconds=backoff_delay(attempts, e.retry_after))
+        else:
+            fields['status'] = 'failed'
+        _update_if_held(message, **fields)
+        logger.warning("Telegram outbox #%s failed (attempt %s): %s", message.id, attempts, e)
+        return False
+
+    held = _update_if_held(
+        message,
+        attempts=attempts,
+        status='sent',
+        sent_at=timezone.now(),
+        last_error=None,
+        telegram_message_id=(data.get('result') or {}).get('message_id'),
+    )
+    if not held:
+        logger.error("Telegram outbox #%s sent after its lease expired", message.id)
+    return True
+
+
+def process_outbox(batch_size: int = 50, limiter: TelegramRateLimiter | None = None,
+                   heartbeat=None) -> tuple[int, int]:
+    """
+    یک دسته از صف را می‌فرستد. خروجی: (تعداد موفق، تعداد ناموفق)
+    heartbeat قبل از هر پیام صدا زده می‌شود (تمدید قفل ورکر)؛ اگر False برگرداند بقیه‌ی دسته آزاد می‌شود.
+    """
+    limiter = limiter or TelegramRateLimiter()
+    messages = claim_batch(batch_size)
+    sent = failed = 0
+    for index, message in enumerate(messages):
+        if heartbeat is not None and not heartbeat():
+            release(messages[index:])
+            raise WorkerLockLost("Telegram outbox worker lock lost")
+        result = deliver(message, limiter)
+        if result:
+            sent += 1
+        elif result is False:
+            failed += 1
+    return sent, failed
+
+
+# ---------- قفل تک‌ورکر ----------
+# محدودیت نرخ (TelegramRateLimiter) داخل پروسه است؛ دو ورکر هم‌زمان دو برابر نرخ مجاز می‌فرستند.
+# برای همین فقط یک ورکر send_telegram_outbox اجرا می‌شود و این قفل در کش (Redis) آن را تضمین می‌کند.
+WORKER_LOCK_KEY = 'telegram_outbox:worker'
+# بیشتر از طولانی‌ترین انتظار محدودیت نرخ بین دو پیام
+WORKER_LOCK_TTL = 5 * 60
+
+
+class WorkerLockLost(Exception):
+    pass
+
+
+def hold_worker_lock(token: str) -> bool:
+    """
+    قفل را می‌گیرد یا تمدید می‌کند؛ اگر ورکر دیگری آن را دارد False.
+    """
+    if cache.add(WORKER_LOCK_KEY, token, WORKER_LOCK_TTL):
+        return True
+    if cache.get(WORKER_LOCK_KEY) == token:
+        cache.touch(WORKER_LOCK_KEY, WORKER_LOCK_TTL)
+        return True
+    return False
+
+
+def release_worker_lock(token: str) -> None:
+    if cache.get(WORKER_LOCK_KEY) == token:
+        cache.delete(WORKER_LOCK_KEY)
@@ -1,3 +1,135 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
 
-# Create your tests here.
+from django.test import TestCase, SimpleTestCase, override_settings
+from django.utils import timezone
+
+from utils.management.commands.fake_ippanel import build_server
+from utils.sms import SmsError, send_sms
+from utils.sms_outbox import _expire, chunk_recipients, enqueue_otp, enqueue_sms, process_outbox
+
+
+class ChunkRecipientsTests(SimpleTestCase):
+    def test_removes_duplicates_and_empty_keeping_order(self):
+        self.assertEqual(
+            chunk_recipients(['0912', '', '0913', '0912', None, '0914'], size=10),
+            [['0912', '0913', '0914']],
+        )
+
+    def test_splits_by_size(self):
+        self.assertEqual(
+            chunk_recipients([f'09{i}' for i in range(5)], size=2),
+            [['090', '091'], ['092', '093'], ['094']],
+        )
+
+    @override_settings(IPPANEL_MAX_RECIPIENTS=3)
+    def test_default_size_from_settings(self):
+        self.assertEqual([len(chunk) for chunk in chunk_recipients([f'09{i}' for i in range(7)])], [3, 3, 1])
+
+    def test_empty(self):
+        self.assertEqual(chunk_recipients([]), [])
+
+
+class SmsErrorTests(SimpleTestCase):
+    def test_network_error_and_server_errors_are_retryable(self):
+        for status_code in (None, 429, 500, 503):
+            self.assertTrue(SmsError("x", status_code=status_code).is_retryable, status_code)
+
+    def test_client_errors_are_not_retryable(self):
+        for status_code in (400, 401, 403, 422):
+            self.assertFalse(SmsError("x", status_code=status_code).is_retryable, status_code)
+
+
+class ExpireOtpTests(TestCase):
+    def test_expired_otp_is_not_sent(self):
+        now = timezone.now()
+        expired = enqueue_otp('09120000001', 'code', now - timedelta(seconds=1))
+        fresh = enqueue_otp('09120000002', 'code', now + timedelta(minutes=2))
+        bulk = enqueue_sms(['09120000003'], 'hello')[0]
+
+        remaining = _expire([expired, fresh, bulk])
+
+        self.assertEqual([message.id for message in remaining], [fresh.id, bulk.id])
+        expired.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(expired.status, 'expired')
+        self.assertEqual(expired.message, '')
+        self.assertEqual(fresh.status, 'pending')
+        self.assertEqual(fresh.message, 'code')
+
+
+class FakeIPPanelTests(TestCase):
+    """
+    ارسال واقعی HTTP به سرور جعلی fake_ippanel روی یک پورت آزاد.
+    """
+
+    def start_server(self, **kwargs):
+        server = build_server(verbosity=0, **kwargs)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        host, port = server.server_address
+        settings_override = override_settings(
+            IPPANEL_SEND_URL=f"http://{host}:{port}/v1/api/send",
+            FARAZ_API_KEY='test-key',
+            IPPANEL_TIMEOUT=5,
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        return server
+
+    def test_send_returns_provider_response(self):
+        server = self.start_server()
+        data = send_sms(['09120000001', '09120000002'], 'hello')
+        self.assertEqual(data['data']['message_outbox_ids'], [1])
+        self.assertEqual(server.stats, {"requests": 1, "recipients": 2})
+
+    def test_too_many_recipients_is_not_retryable(self):
+        self.start_server(max_recipients=1)
+        with self.assertRaises(SmsError) as ctx:
+            send_sms(['09120000001', '09120000002'], 'hello')
+        self.assertEqual(ctx.exception.status_code, 400)
+        self.assertFalse(ctx.exception.is_retryable)
+
+    def test_provider_failure_is_retryable(self):
+        self.start_server(error_rate=1.0)
+        with self.assertRaises(SmsError) as ctx:
+            send_sms(['09120000001'], 'hello')
+        self.assertTrue(ctx.exception.is_retryable)
+
+    def test_process_outbox_sends_and_skips_expired_otp(self):
+        self.start_server()
+        messages = enqueue_sms([f'0912000{i:04d}' for i in range(5)], 'hello')
+        expired = enqueue_otp('09120000009', 'code', timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(process_outbox(batch_size=10, concurrency=2), (len(messages), 0))
+        for message in messages:
+            message.refresh_from_db()
+            self.assertEqual(message.status, 'sent')
+            self.assertIsNotNone(message.provider_message_id)
+        expired.refresh_from_db()
+        self.assertEqual(expired.status, 'expired')
+
+    def test_sent_otp_text_is_cleared(self):
+        self.start_server()
+        otp = enqueue_otp('09120000001', 'code: 12345', timezone.now() + timedelta(minutes=2))
+        bulk = enqueue_sms(['09120000002'], 'hello')[0]
+
+        self.assertEqual(process_outbox(batch_size=10, concurrency=1), (2, 0))
+        otp.refresh_from_db()
+        bulk.refresh_from_db()
+        self.assertEqual((otp.status, otp.message), ('sent', ''))
+        self.assertEqual((bulk.status, bulk.message), ('sent', 'hello'))
+
+    def test_retryable_failure_is_rescheduled(self):
+        self.start_server(error_rate=1.0)
+        message = enqueue_sms(['09120000001'], 'hello')[0]
+
+        with self.assertLogs('utils.sms_outbox', 'WARNING'):
+            self.assertEqual(process_outbox(batch_size=10, concurrency=1), (0, 1))
+        message.refresh_from_db()
+        self.assertEqual(message.status, 'pending')
+        self.assertEqual(message.attempts, 1)
+        self.assertGreater(message.next_attempt_at, timezone.now())
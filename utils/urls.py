@@ -12,9 +12,13 @@ urlpatterns = [
     path('add-new/file', views.SonyAccountAddFromFile.as_view(), name='add-new-sony-account-from-file'),
     path('<int:pk>/set-2fa-secret/', views.Set2FASecretView.as_view(), name='set-2fa-secret'),
     path('<int:pk>/otp/', views.GetOTPView.as_view(), name='get-otp'),
+    path('otp/batch/', views.BatchOTPView.as_view(), name='get-otp-batch'),
     path('accounts-matched-with-order/<int:order_id>/', views.SonyAccountByGameOrderView.as_view(),
          name='sony-account-by-order-games'),
     path('orders-matched-with-sony-accounts/<int:sony_account_id>/', views.GameOrdersBySonyAccountView.as_view(),
          name='sony-account-by-order-games'),
+    path('batch-assignment/', views.BatchAssignmentView.as_view(), name='sony-account-batch-assignment'),
     path('send-to-tel/<int:pk>/send-to-telegram/', send_to_tel_view, name='send-to-tel'),
+    path('send-to-tel/bulk/', views.TelegramBulkPublishView.as_view(), name='send-to-tel-bulk'),
+    path('telegram-outbox/', views.TelegramOutboxList.as_view(), name='telegram-outbox-list'),
 ]
@@ -1,20 +1,29 @@
+from django.conf import settings
 from django.db.models import Count, Q
 from rest_framework.decorators import action
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, viewsets, generics
+from rest_framework.pagination import LimitOffsetPagination
 
 from accounts.auth import CustomJWTAuthentication
 from accounts.permissions import IsMainManager, IsEmployee
-from payments.models import GameOrder
+from payments.models import GameOrder, GameOrderItem
 from utils.serializers import SonyAccountMatchedSerializer, GameOrderMatchedSerializer, SonyAccountAddFromFileSerializer
+from utils.serializers import AssignmentPlanItemSerializer, ApplyAssignmentPlanSerializer
+from utils.serializers import TelegramBulkPublishSerializer, TelegramOutboxSerializer
 from storage.models import SonyAccount
-from utils.serializers import Set2FAURISerializer, OTPSerializer, SonyAccountSerializer
-from utils.crypto import encrypt_text, decrypt_text
+from utils.serializers import Set2FAURISerializer, OTPSerializer, SonyAccountSerializer, BatchOTPRequestSerializer
+from utils.crypto import encrypt_text
 import urllib.parse
-import pyotp, time
 
-from utils.services import fetch_account_with_games, build_account_message
+from utils.services import fetch_account_with_games, fetch_accounts_with_games, build_account_message
+from utils.models import TelegramOutbox
+from utils.telegram_outbox import enqueue_accounts
+from utils.otp import totp_engine, OTPError
+from utils.matching import match_accounts_for_games, get_account_game_index
+from utils.importers import SonyAccountImporter, iter_rows, ImportFileError
+from utils.assignment import build_assignment_plan, apply_assignment_plan, AssignmentError
 from utils.telegram import send_telegram_message, TelegramError
 
 
@@ -61,26 +70,51 @@ class GetOTPView(APIView):
 
     def get(self, request, pk):
         try:
-            account = SonyAccount.objects.get(pk=pk)
+            account = SonyAccount.objects.only('id', 'two_step_secret').get(pk=pk)
         except SonyAccount.DoesNotExist:
             return Response({"detail": "SonyAccount not found"}, status=status.HTTP_404_NOT_FOUND)
 
         if not account.two_step_secret:
             return Response({"detail": "2FA is not enabled for this account"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # رمزگشایی secret
-        secret = decrypt_text(account.two_step_secret)
-        totp = pyotp.TOTP(secret)
-        otp_data = {
-            "code": totp.now(),
-            "remaining": totp.interval - (int(time.time()) % totp.interval)
-        }
+        try:
+            otp_data = totp_engine.code_for(account.pk, account.two_step_secret)
+        except OTPError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
         serializer = OTPSerializer(data=otp_data)
         serializer.is_valid(raise_exception=True)
         return Response(serializer.data)
 
 
+class BatchOTPView(APIView):
+    """
+    دریافت کد OTP چند حساب با یک درخواست
+    """
+    permission_classes = [IsMainManager | IsEmployee]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def post(self, request):
+        serializer = BatchOTPRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        account_ids = serializer.validated_data['account_ids']
+        secrets = dict(
+            SonyAccount.objects.filter(id__in=account_ids).values_list('id', 'two_step_secret')
+        )
+        codes, errors = totp_engine.codes_for(secrets)
+        for account_id in account_ids:
+            if account_id not in secrets:
+                errors[account_id] = "SonyAccount not found"
+
+        return Response({
+            "codes": [{"id": account_id, **codes[account_id]} for account_id in account_ids if account_id in codes],
+            "errors": [{"id": account_id, "detail": errors[account_id]} for account_id in account_ids
+                       if account_id in errors],
+        }, status=status.HTTP_200_OK)
+
+
 class SonyAccountViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet نمونه برای SonyAccount.
@@ -122,7 +156,59 @@ class SonyAccountViewSet(viewsets.ReadOnlyModelViewSet):
         )
 
 
+class TelegramBulkPublishView(APIView):
+    """
+    چند اکانت را برای ارسال به تلگرام در صف می‌گذارد؛ ارسال توسط ورکر send_telegram_outbox انجام می‌شود.
+    """
+    permission_classes = [IsEmployee | IsMainManager]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def post(self, request):
+        serializer = TelegramBulkPublishSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        chat_id = serializer.validated_data.get('chat_id') or settings.TELEGRAM_CHANNEL_ID
+        if not chat_id:
+            return Response({"detail": "TELEGRAM_CHANNEL_ID یا chat_id خالی است."}, status=status.HTTP_400_BAD_REQUEST)
+
+        account_ids = serializer.validated_data['account_ids']
+        accounts = fetch_accounts_with_games(account_ids)
+        missing = sorted(set(account_ids) - {account.id for account in accounts})
+
+        messages = enqueue_accounts(accounts, chat_id=chat_id, created_by=getattr(request.user, 'employee', None))
+        return Response({
+            "detail": "پیام‌ها در صف ارسال قرار گرفتند.",
+            "queued": len(messages),
+            "outbox_ids": [message.id for message in messages],
+            "missing_account_ids": missing,
+        }, status=status.HTTP_202_ACCEPTED)
+
+
+class TelegramOutboxList(generics.ListAPIView):
+    """
+    وضعیت پیام‌های صف تلگرام (فیلتر با status و sony_account)
+    """
+    serializer_class = TelegramOutboxSerializer
+    permission_classes = [IsEmployee | IsMainManager]
+    authentication_classes = [CustomJWTAuthentication]
+    pagination_class = LimitOffsetPagination
+
+    def get_queryset(self):
+        queryset = TelegramOutbox.objects.order_by('-id')
+        params = self.request.query_params
+        if params.get('status'):
+            queryset = queryset.filter(status=params['status'])
+        if params.get('sony_account'):
+            queryset = queryset.filter(sony_account_id=params['sony_account'])
+        return queryset
+
+
 class SonyAccountByGameOrderView(generics.ListAPIView):
+    """
+    اکانت‌های مناسب یک سفارش بر اساس تعداد دقیق بازی‌های مشترک (top-K).
+    پارامترها: limit (پیش‌فرض ۲۰)، region، available (پیش‌فرض true).
+    """
     serializer_class = SonyAccountMatchedSerializer
     permission_classes = [IsEmployee]
     authentication_classes = [CustomJWTAuthentication]
@@ -130,22 +216,22 @@ class SonyAccountByGameOrderView(generics.ListAPIView):
     def get_queryset(self):
         order_id = self.kwargs['order_id']
 
-        try:
-            order = GameOrder.objects.get(id=order_id, is_deleted=False)
-        except GameOrder.DoesNotExist:
-            return SonyAccount.objects.none()
-
         # فقط ID بازی‌ها رو بگیر
-        selected_games = order.games.values_list('game', flat=True)
-
-        queryset = SonyAccount.objects.filter(
+        selected_games = list(GameOrderItem.objects.filter(
+            game_order_id=order_id,
+            game_order__is_deleted=False,
             is_deleted=False,
-            account_games__game__in=selected_games
-        ).annotate(
-            matching_games_count=Count('games')
-        ).order_by('-matching_games_count')
-
-        return queryset
+        ).values_list('game_id', flat=True))
+        if not selected_games:
+            return []
+
+        params = self.request.query_params
+        return match_accounts_for_games(
+            selected_games,
+            limit=_parse_limit(params.get('limit')),
+            region=params.get('region') or None,
+            available_only=params.get('available', 'true').lower() not in ('false', '0'),
+        )
 
     def get(self, request, *args, **kwargs):
         queryset = self.get_queryset()
@@ -154,31 +240,34 @@ class SonyAccountByGameOrderView(generics.ListAPIView):
 
 
 class GameOrdersBySonyAccountView(generics.ListAPIView):
+    """
+    سفارش‌هایی که بازی مشترک با اکانت دارند، به ترتیب تعداد بازی مشترک.
+    بدون پارامتر limit همه‌ی سفارش‌ها برگردانده می‌شوند (مثل قبل).
+    """
     serializer_class = GameOrderMatchedSerializer
     permission_classes = [IsEmployee]
     authentication_classes = [CustomJWTAuthentication]
 
     def get_queryset(self):
         sony_account_id = self.kwargs['sony_account_id']
-        try:
-            sony_account = SonyAccount.objects.get(id=sony_account_id, is_deleted=False)
-        except SonyAccount.DoesNotExist:
+        if not SonyAccount.objects.filter(id=sony_account_id, is_deleted=False).exists():
             return GameOrder.objects.none()
 
-        selected_games = sony_account.games.all()
+        # بازی‌های اکانت از ایندکس خوانده می‌شود، نه با کوئری جدا
+        selected_games = list(get_account_game_index().games_of(int(sony_account_id)))
+        if not selected_games:
+            return GameOrder.objects.none()
 
+        matching = Q(games__game_id__in=selected_games, games__is_deleted=False)
         queryset = GameOrder.objects.filter(
+            matching,
             is_deleted=False,
-            games__game__in=selected_games  # 👈 اصلاح شد
         ).annotate(
-            matching_games_count=Count(
-                'games',
-                filter=Q(games__game__in=selected_games),
-                distinct=True
-            )
-        ).order_by('-matching_games_count')
+            matching_games_count=Count('games', filter=matching, distinct=True)
+        ).select_related('customer', 'employee').order_by('-matching_games_count', '-created_at')
 
-        return queryset
+        limit = _parse_limit(self.request.query_params.get('limit'), default=None)
+        return queryset[:limit] if limit else queryset
 
     def get(self, request, *args, **kwargs):
         queryset = self.get_queryset()
@@ -186,6 +275,49 @@ class GameOrdersBySonyAccountView(generics.ListAPIView):
         return Response(serializer.data)
 
 
+class BatchAssignmentView(APIView):
+    """
+    GET: برنامه‌ی پیشنهادی اختصاص اکانت به همه‌ی سفارش‌های در صف انتظار (region، available)
+    POST: اعمال اتمیک برنامه
+    """
+    permission_classes = [IsEmployee | IsMainManager]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def get(self, request):
+        plan = build_assignment_plan(
+            region=request.query_params.get('region') or None,
+            available_only=request.query_params.get('available', 'true').lower() not in ('false', '0'),
+        )
+        return Response({
+            "orders_count": len(plan),
+            "accounts_count": len({account_id for item in plan for account_id in item['account_ids']}),
+            "plan": AssignmentPlanItemSerializer(plan, many=True).data,
+        }, status=status.HTTP_200_OK)
+
+    def post(self, request):
+        serializer = ApplyAssignmentPlanSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            assigned = apply_assignment_plan(
+                serializer.validated_data['plan'],
+                available_only=serializer.validated_data['available_only'],
+            )
+        except AssignmentError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
+
+        return Response({"detail": "Plan applied successfully", "assigned": assigned}, status=status.HTTP_200_OK)
+
+
+def _parse_limit(value, default=20, maximum=100):
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(limit, maximum))
+
+
 class SonyAccountAdd(generics.CreateAPIView):
     queryset = SonyAccount.objects.all()
     serializer_class = SonyAccountSerializer
@@ -194,4 +326,22 @@ class SonyAccountAdd(generics.CreateAPIView):
 
 
 class SonyAccountAddFromFile(generics.CreateAPIView):
+    """
+    ثبت گروهی اکانت‌ها از فایل csv/xlsx و برگرداندن گزارش خطای هر ردیف
+    """
     serializer_class = SonyAccountAddFromFileSerializer
+    permission_classes = [IsEmployee | IsMainManager]
+    authentication_classes = [CustomJWTAuthentication]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            rows = iter_rows(serializer.validated_data['file'])
+            report = SonyAccountImporter().run(rows)
+        except ImportFileError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        response_status = status.HTTP_201_CREATED if report['created'] else status.HTTP_200_OK
+        return Response(report, status=response_status)